@@ -0,0 +1,77 @@
+import os
+import time
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from .config import DAEMON_CRAWL_INTERVAL_MINUTES
+from .twitter_user_loader import load_accounts
+
+
+class AccountSchedule:
+    """
+    When each account in twitter_users.txt is due for its next crawl.
+
+    Interval = the account's 2nd column (minutes) or
+    DAEMON_CRAWL_INTERVAL_MINUTES. The file is re-read whenever its
+    mtime changes: new accounts are due at once, removed ones are
+    dropped, and a changed interval applies from the last crawl.
+    """
+
+    def __init__(self, path, default_minutes: float = DAEMON_CRAWL_INTERVAL_MINUTES):
+        self.path = Path(path)
+        self.default_minutes = default_minutes
+
+        self._mtime = None
+        self._intervals = {}   # username → seconds
+        self._last_run = {}    # username → time.monotonic() of the last crawl
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def reload_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime == self._mtime and self._intervals:
+            return False
+        self._mtime = mtime
+
+        intervals = {
+            username: (minutes or self.default_minutes) * 60
+            for username, minutes in load_accounts(self.path)
+        }
+
+        added = intervals.keys() - self._intervals.keys()
+        removed = self._intervals.keys() - intervals.keys()
+        for username in removed:
+            self._last_run.pop(username, None)
+
+        self._intervals = intervals
+        logging.info(
+            f"[+] Accounts loaded | total={len(intervals)} | "
+            f"added={len(added)} | removed={len(removed)}"
+        )
+        return True
+
+    def _due_at(self, username: str) -> float:
+        last = self._last_run.get(username)
+        return 0.0 if last is None else last + self._intervals[username]
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Accounts due now, most overdue first."""
+        now = time.monotonic() if now is None else now
+        due = [u for u in self._intervals if self._due_at(u) <= now]
+        return sorted(due, key=self._due_at)
+
+    def mark_done(self, username: str, now: Optional[float] = None):
+        if username in self._intervals:
+            self._last_run[username] = time.monotonic() if now is None else now
+
+    def seconds_until_next(self, now: Optional[float] = None) -> Optional[float]:
+        if not self._intervals:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._due_at(u) for u in self._intervals) - now)
@@ -0,0 +1,161 @@
+import os
+import csv
+import json
+import re
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from .config import BACKFILL_DB
+from .parser import parse_tweet
+from .sqlite_store import open_db
+from .text_utils import canonical_ioc, get_ioc_type
+from .time_utils import UTC_PLUS_7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    source TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    enriched INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+"""
+
+# ---- STIX 2.x patterns: [ipv4-addr:value = '1.2.3.4'], [file:hashes.'SHA-256' = '…'] ----
+STIX_PATTERN_VALUE = re.compile(
+    r"(?:ipv4-addr:value|url:value|file:hashes\.'?SHA-?256'?)\s*=\s*'([^']+)'",
+    re.IGNORECASE,
+)
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = open_db(BACKFILL_DB, SCHEMA)
+    return _conn
+
+
+# ================= INPUT READERS =================
+
+def _iter_text(path: Path) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield from parse_tweet(line, images=[])["iocs"]
+
+
+def _iter_csv(path: Path) -> Iterator[str]:
+    # ---- Any column may hold IOCs (exports differ per tool) ----
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        for row in csv.reader(f):
+            for cell in row:
+                if cell:
+                    yield from parse_tweet(cell, images=[])["iocs"]
+
+
+def _iter_stix(path: Path) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        bundle = json.load(f)
+
+    objects = bundle.get("objects", []) if isinstance(bundle, dict) else bundle
+
+    for obj in objects:
+        obj_type = obj.get("type")
+
+        if obj_type == "indicator":
+            yield from STIX_PATTERN_VALUE.findall(obj.get("pattern", ""))
+        elif obj_type in ("ipv4-addr", "url") and obj.get("value"):
+            yield obj["value"]
+        elif obj_type == "file":
+            hashes = obj.get("hashes") or {}
+            sha256 = hashes.get("SHA-256") or hashes.get("SHA256")
+            if sha256:
+                yield sha256
+
+
+READERS = {
+    "txt": _iter_text,
+    "csv": _iter_csv,
+    "stix": _iter_stix,
+}
+
+
+def detect_format(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix == ".json":
+        return "stix"
+    return "txt"
+
+
+def iter_backfill_iocs(path, fmt: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (canonical IOC, ioc_type) from a TXT / CSV / STIX 2.x JSON file.
+    Same canonicalization as the crawler path; unsupported types and
+    repeats within the file are dropped.
+    """
+    path = Path(path)
+    reader = READERS[fmt or detect_format(path)]
+    seen = set()
+
+    for raw in reader(path):
+        ioc = canonical_ioc(raw)
+        ioc_type = get_ioc_type(ioc)
+
+        if ioc_type == "unknown" or ioc in seen:
+            continue
+
+        seen.add(ioc)
+        yield ioc, ioc_type
+
+
+# ================= CHECKPOINTS =================
+
+def source_fingerprint(path) -> str:
+    """Size + mtime: a changed file starts over instead of resuming."""
+    st = os.stat(path)
+    return f"{st.st_size}:{int(st.st_mtime)}"
+
+
+def load_checkpoint(path) -> Tuple[int, int]:
+    """(position, enriched) to resume from, (0, 0) for a new / changed file."""
+    source = str(Path(path).resolve())
+    with _lock:
+        row = _db().execute(
+            "SELECT fingerprint, position, enriched FROM checkpoints WHERE source = ?",
+            (source,),
+        ).fetchone()
+
+    if not row or row[0] != source_fingerprint(path):
+        return 0, 0
+    return row[1], row[2]
+
+
+def save_checkpoint(path, position: int, enriched: int):
+    source = str(Path(path).resolve())
+    now = datetime.now(UTC_PLUS_7).strftime("%Y-%m-%d %H:%M:%S")
+
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO checkpoints (source, fingerprint, position, enriched, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    position = excluded.position,
+                    enriched = excluded.enriched,
+                    updated_at = excluded.updated_at
+                """,
+                (source, source_fingerprint(path), position, enriched, now),
+            )
+
+    logging.debug(f"Backfill checkpoint | source={source} | position={position}")
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Optional, Tuple
+
+from .config import SIEM_STATE_DB, SIEM_CHANGES_ONLY, SIEM_DELTA_EVENTS
+from .siem import DATASET_COLUMNS
+from .metrics import OUTPUT_SUPPRESSED
+from .sqlite_store import open_db
+from .time_utils import UTC_PLUS_7
+
+# ---- digest = one 8-hex-char hash per DATASET_COLUMNS entry, in order ----
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS emitted (
+    ioc TEXT PRIMARY KEY,
+    columns TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    sent_at TEXT
+);
+"""
+
+# ---- Always in a delta event, so the SIEM can join it to the full record ----
+IDENTITY_COLUMNS = ("ioc", "ioc_type", "twitter_link", "trace_id")
+
+# ---- Also always in a delta event: severity is derived from them (CEF, SIEM rules) ----
+SEVERITY_COLUMNS = ("vt_malicious_score",)
+
+FIELD_HASH_CHARS = 8
+
+# ---- Column set fingerprint: a changed projection re-sends everything ----
+COLUMNS_ID = hashlib.blake2b(",".join(DATASET_COLUMNS).encode(), digest_size=4).hexdigest()
+
+
+def _field_hash(value) -> str:
+    # str(): a row reloaded from the results file (strings) hashes like the
+    # fresh result (ints) it came from
+    text = "" if value is None else str(value)
+    return hashlib.blake2b(text.encode(), digest_size=FIELD_HASH_CHARS // 2).hexdigest()
+
+
+def event_digest(event: dict) -> str:
+    return "".join(_field_hash(event.get(col, "")) for col in DATASET_COLUMNS)
+
+
+class ChangeFilter:
+    """
+    Remembers a compact content hash of the last event emitted per IOC
+    (over the DATASET_COLUMNS projection) and drops re-enriched records
+    whose content did not change. With SIEM_DELTA_EVENTS, changed records
+    are sent as a delta: identity and severity columns + changed columns +
+    changed_fields. Only the SIEM HTTP sink takes deltas (see SinkFanout);
+    file and syslog sinks keep full records.
+    """
+
+    def __init__(self, path=SIEM_STATE_DB, enabled: bool = SIEM_CHANGES_ONLY, delta: bool = SIEM_DELTA_EVENTS):
+        self.path = path
+        self.enabled = enabled
+        self.delta = delta
+        self._conn = None
+        self._lock = threading.Lock()
+        self.stats = {"sent": 0, "suppressed": 0, "delta": 0}
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_db(self.path, SCHEMA)
+        return self._conn
+
+    def _previous(self, ioc: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            return self._db().execute(
+                "SELECT columns, digest FROM emitted WHERE ioc = ?", (ioc,)
+            ).fetchone()
+
+    def check(self, event: dict) -> Tuple[Optional[dict], str]:
+        """
+        (event to emit or None if unchanged, digest to commit once emitted).
+        New IOCs and IOCs hashed under another column set go out in full.
+        """
+        digest = event_digest(event)
+        if not self.enabled:
+            return event, digest
+
+        previous = self._previous(event["ioc"])
+        if not previous or previous[0] != COLUMNS_ID:
+            return event, digest
+
+        if previous[1] == digest:
+            return None, digest
+
+        if not self.delta:
+            return event, digest
+
+        old = previous[1]
+        changed = [
+            col for i, col in enumerate(DATASET_COLUMNS)
+            if old[i * FIELD_HASH_CHARS:(i + 1) * FIELD_HASH_CHARS]
+            != digest[i * FIELD_HASH_CHARS:(i + 1) * FIELD_HASH_CHARS]
+        ]
+        delta = {col: event.get(col, "") for col in IDENTITY_COLUMNS + SEVERITY_COLUMNS}
+        delta.update({col: event.get(col, "") for col in changed})
+        delta["changed_fields"] = changed
+        return delta, digest
+
+    def commit(self, ioc: str, digest: str):
+        """Record `digest` as the last content emitted for `ioc`."""
+        if not self.enabled:
+            return
+
+        now = datetime.now(UTC_PLUS_7).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            conn = self._db()
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO emitted (ioc, columns, digest, sent_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(ioc) DO UPDATE SET
+                        columns = excluded.columns,
+                        digest = excluded.digest,
+                        sent_at = excluded.sent_at
+                    """,
+                    (ioc, COLUMNS_ID, digest, now),
+                )
+
+    def count(self, emitted: Optional[dict]):
+        with self._lock:
+            if emitted is None:
+                self.stats["suppressed"] += 1
+                OUTPUT_SUPPRESSED.inc()
+            else:
+                self.stats["sent"] += 1
+                if "changed_fields" in emitted:
+                    self.stats["delta"] += 1
+
+    def filter(self, event: dict) -> Optional[dict]:
+        """check() + commit() for senders that never lose an accepted event."""
+        emitted, digest = self.check(event)
+        self.count(emitted)
+
+        if emitted is None:
+            logging.info("Output suppressed (unchanged) | IOC=%s", event["ioc"])
+            return None
+
+        self.commit(event["ioc"], digest)
+        return emitted
+
+
+# ---- Shared by the output fan-out and the durable SIEM stage ----
+CHANGES = ChangeFilter()
@@ -0,0 +1,73 @@
+import time
+import logging
+import threading
+
+
+class ProviderError(Exception):
+    """
+    Raised by a TIP lookup when the provider itself failed
+    (timeout, connection error, 5xx, rate limited, retries exhausted).
+    A plain "not found" is NOT an error and returns None instead.
+    """
+
+
+class CircuitBreaker:
+    """
+    closed    → calls go through, consecutive failures are counted
+    open      → calls are skipped for `reset_timeout` seconds
+    half_open → ONE probe call is let through; success closes,
+                failure re-opens for another `reset_timeout`
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+                logging.info(f"Circuit half-open, probing | provider={self.name}")
+
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+
+            return False
+
+    @property
+    def probing(self) -> bool:
+        return self.state == "half_open"
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logging.info(f"Circuit closed | provider={self.name}")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logging.error(
+                        f"Circuit OPEN | provider={self.name} | failures={self.failures} | "
+                        f"retry in {int(self.reset_timeout)}s"
+                    )
+                self.state = "open"
+                self.opened_at = time.monotonic()
@@ -12,28 +12,149 @@ CT0 = os.getenv("CT0")
 TWITTER_USER_FILE = BASE_DIR / "twitter_users.txt"
 
 # ---- Files ----
-LOG_FILE = BASE_DIR / "logging.log"
+LOG_FILE = BASE_DIR / "twitter_ioc_crawler_log.jsonl"
 IOC_INDEX_FILE = BASE_DIR / "iocs.txt"
 TIP_RESULTS_FILE = BASE_DIR / "tip_results.txt"
+TIP_STATE_DB = BASE_DIR / "tip_state.db"
+WORK_QUEUE_DB = BASE_DIR / "work_queue.db"
+QUOTA_DB = Path(os.getenv("QUOTA_DB", BASE_DIR / "quota.db"))
+BACKFILL_DB = BASE_DIR / "backfill.db"
+SIEM_STATE_DB = BASE_DIR / "siem_state.db"
 
 # ---- SIEM ----
 SIEM_API_URL = os.getenv("SIEM_API_URL")
 SIEM_API_KEY = os.getenv("SIEM_API_KEY")
+SIEM_BATCH_FORMAT = os.getenv("SIEM_BATCH_FORMAT", "ndjson")          # ndjson | json (array)
+SIEM_GZIP = os.getenv("SIEM_GZIP", "true").lower() in ("1", "true", "yes")  # falls back on 415
+SIEM_BATCH_MAX_EVENTS = 500        # flush when this many events are buffered
+SIEM_BATCH_MAX_BYTES = 1_000_000   # ... or the uncompressed payload reaches this size
+SIEM_BATCH_LINGER_SECONDS = 5      # ... or the oldest buffered event is this old
+SIEM_QUEUE_SIZE = 10_000           # in-memory events before spilling to the spool
+SIEM_SPOOL_DIR = BASE_DIR / "siem_spool"
+SIEM_BACKOFF_BASE_SECONDS = 5      # first retry after a failed POST, doubles per failure
+SIEM_BACKOFF_MAX_SECONDS = 600
+SIEM_CHANGES_ONLY = os.getenv("SIEM_CHANGES_ONLY", "true").lower() in ("1", "true", "yes")   # drop unchanged re-sends
+SIEM_DELTA_EVENTS = os.getenv("SIEM_DELTA_EVENTS", "false").lower() in ("1", "true", "yes")  # send changed columns only
+
+# ---- Output sinks (--siem fans each result out to all of them) ----
+# siem = SIEM HTTP collector, syslog = CEF over syslog,
+# ndjson = NDJSON file (data lake), cef_file = CEF lines file
+OUTPUT_SINKS = [s.strip() for s in os.getenv("OUTPUT_SINKS", "siem").split(",") if s.strip()]
+SYSLOG_HOST = os.getenv("SYSLOG_HOST")
+SYSLOG_PORT = int(os.getenv("SYSLOG_PORT", "514"))
+SYSLOG_PROTOCOL = os.getenv("SYSLOG_PROTOCOL", "udp")   # udp | tcp
+NDJSON_SINK_FILE = Path(os.getenv("NDJSON_SINK_FILE", BASE_DIR / "tip_results.ndjson"))
+CEF_SINK_FILE = Path(os.getenv("CEF_SINK_FILE", BASE_DIR / "tip_results.cef"))
+SINK_SPOOL_DIR = BASE_DIR / "sink_spool"   # per-sink spools (siem keeps SIEM_SPOOL_DIR)
+SINK_DEAD_LETTER_DIR = BASE_DIR / "sink_dead_letter"   # per-sink batches refused for good (4xx)
 
 # ---- VirusTotal ----
 VT_API_KEY = os.getenv("VT_API_KEY")
+VT_API_KEYS = [k.strip() for k in os.getenv("VT_API_KEYS", "").split(",") if k.strip()]
 VT_BASE = os.getenv("VT_BASE")
-VT_SLEEP = 20
+VT_SLEEP = 20          # seconds between two calls on the SAME key (public tier: 4/min)
+VT_DAILY_QUOTA = 500   # calls per key per day (public tier)
 
 # ---- AbuseIPDB ----
 ABUSEIPDB_API_KEY = os.getenv("ABUSEIPDB_API_KEY")
 ABUSEIPDB_URL = os.getenv("ABUSEIPDB_URL")
+ABUSEIPDB_BLOCK_URL = os.getenv("ABUSEIPDB_BLOCK_URL")
+ABUSEIPDB_BLOCK_PREFIX = 24   # check-block max on free tier is /24
+ABUSEIPDB_BLOCK_MIN_IPS = 3   # pending IPs in one block before using check-block
 
 # ---- MalwareBazaar ----
 MALWAREBAZAAR_API_KEY = os.getenv("MALWAREBAZAAR_API_KEY")
 MALWAREBAZAAR_URL = os.getenv("MALWAREBAZAAR_URL")
+MALWAREBAZAAR_RECENT_URL = os.getenv("MALWAREBAZAAR_RECENT_URL")
+MALWAREBAZAAR_DUMP_DB = BASE_DIR / "malwarebazaar.db"
 
 # ---- AlienVault OTX ----
 ALIENVAULT_OTX_KEY = os.getenv("ALIENVAULT_OTX_KEY")
 ALIENVAULT_BASE_API = os.getenv("ALIENVAULT_BASE_API")
-ALIENVAULT_BASE_UI = os.getenv("ALIENVAULT_BASE_UI")
\ No newline at end of file
+ALIENVAULT_BASE_UI = os.getenv("ALIENVAULT_BASE_UI")
+ALIENVAULT_PULSES_API = os.getenv("ALIENVAULT_PULSES_API")
+OTX_MIRROR_DB = BASE_DIR / "otx_pulses.db"
+
+# ---- Enrichment scheduler (higher score = enriched first) ----
+SCHEDULER_RECENCY_HALF_LIFE_HOURS = 6
+SCHEDULER_WEIGHTS = {
+    "recency": 4.0,   # 0..1, halves every SCHEDULER_RECENCY_HALF_LIFE_HOURS
+    "type": 1.0,      # SCHEDULER_TYPE_SCORES
+    "account": 1.0,   # SCHEDULER_ACCOUNT_SCORES
+    "mentions": 1.0,  # log2(1 + number of tweets mentioning the IOC)
+}
+SCHEDULER_TYPE_SCORES = {"hash": 2.0, "ip": 1.0, "url": 0.5}
+# e.g. SCHEDULER_ACCOUNT_SCORES="abuse_ch:2,malwrhunterteam:1.5"
+SCHEDULER_ACCOUNT_SCORES = {
+    name.strip().lstrip("@").lower(): float(score)
+    for name, _, score in (
+        item.partition(":") for item in os.getenv("SCHEDULER_ACCOUNT_SCORES", "").split(",")
+    )
+    if name.strip() and score
+}
+
+# ---- Re-enrichment (refresh mode) ----
+REFRESH_TTL_HOURS = {"hash": 7 * 24, "ip": 24, "url": 3 * 24}
+REFRESH_BATCH_SIZE = 25
+
+# ---- TIP providers (circuit breaker) ----
+CIRCUIT_BREAKER_FAILURES = 3          # consecutive failed calls before opening
+CIRCUIT_BREAKER_RESET_SECONDS = 300   # how long a dead provider is skipped before a probe
+
+# ---- Streaming pipeline (crawl → enrich) ----
+ENRICH_WORKERS = 2          # concurrent enrichment workers
+PIPELINE_QUEUE_SIZE = 100   # crawler blocks when this many IOCs wait (backpressure)
+
+# ---- Durable work queue (crawl → enrich → siem) ----
+WORK_QUEUE_VISIBILITY_SECONDS = 300   # claimed job reappears if not acked in time
+WORK_QUEUE_MAX_ATTEMPTS = 5           # then the job is parked as dead
+WORK_QUEUE_POLL_SECONDS = 2           # idle worker poll interval
+
+# ---- Daily quota planner ----
+QUOTA_RESERVE_FRACTION = 0.2   # share of each daily quota kept for fresh IOCs
+QUOTA_FRESH_HOURS = 2          # tweets younger than this may spend the reserve
+
+# ---- Provider fan-out policy (after VirusTotal, in this order) ----
+# escalate_if: query the provider only if ANY listed field of the result so
+# far reaches its threshold; None = always. Unlisted providers always run.
+ENRICHMENT_POLICY = [
+    {"provider": "alienvault", "escalate_if": None},   # mirror first, no daily quota
+    {"provider": "malwarebazaar", "escalate_if": None},   # local dump first, no daily quota
+    {"provider": "abuseipdb", "escalate_if": {"vt_malicious_score": 1, "alienvault_pulse_info_count": 1}},
+]
+
+# ---- Per-IOC latency budget ----
+IOC_DEADLINE_SECONDS = 60   # all provider calls, retries and key waits of ONE IOC
+
+# ---- Bulk backfill (imported IOC lists) ----
+BACKFILL_QUOTA_SHARE = 0.5       # max share of each hour's normal-priority VT budget
+BACKFILL_CHECKPOINT_EVERY = 50   # IOCs between two progress checkpoints
+BACKFILL_THROTTLE_SECONDS = 300  # wait when the share is used up, then re-check
+BACKFILL_MAX_ATTEMPTS = 3        # VT did not answer this many times in a row → stop, resume later
+
+# ---- Daemon mode (--daemon) ----
+DAEMON_CRAWL_INTERVAL_MINUTES = 30   # per account unless twitter_users.txt gives one (2nd column)
+DAEMON_TICK_SECONDS = 30             # max sleep between checks of due accounts / users file
+DAEMON_BACKLOG_MINUTES = 60          # batch pass over IOCs not enriched yet (failed / left over)
+
+# ---- Metrics (Prometheus text format) ----
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))       # serve /metrics on 127.0.0.1:PORT (0 = off)
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")          # node_exporter textfile collector path
+METRICS_TEXTFILE_INTERVAL_SECONDS = 15
+
+# ---- Profiling (--profile) ----
+PROFILE_DIR = BASE_DIR / "profiles"           # one sub-directory per run
+PROFILE_TOP_N = 25                            # functions / allocation sites in summary.txt
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005       # sampling profiler period (all threads)
+
+# ---- Logging ----
+LOG_MAX_BYTES = 10_000_000          # rotate the JSON-lines log at this size ...
+LOG_BACKUP_COUNT = 5                # ... keeping this many old files (.1 ... .5)
+LOG_SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "20"))   # INFO lines per call site per window (0 = no limit)
+LOG_SAMPLE_WINDOW_SECONDS = 10
+
+# ---- Tracing (one trace per IOC, tweet → SIEM) ----
+TRACING = os.getenv("TRACING", "true").lower() in ("1", "true", "yes")
+TRACE_FILE = BASE_DIR / "traces.jsonl"       # OTel-shaped spans, one per line
+TRACE_MAX_BYTES = 50_000_000                 # then rotated to traces.jsonl.1
+TRACE_FLUSH_SECONDS = 2                      # buffered spans are written at least this often (and at exit)
@@ -0,0 +1,54 @@
+import time
+from typing import Optional
+
+from .circuit_breaker import ProviderError
+
+MIN_REQUEST_SECONDS = 1.0   # less budget than this → do not start a request
+
+
+class DeadlineExceeded(ProviderError):
+    """
+    The per-IOC time budget ran out before (or during) a provider call.
+    Not the provider's fault → never counted against its circuit.
+    """
+
+
+class Deadline:
+    """
+    Total time budget for one IOC, shared by every provider call,
+    retry, backoff and key wait made on its behalf.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() < MIN_REQUEST_SECONDS
+
+    def timeout(self, default: float) -> float:
+        """Request timeout capped by the remaining budget."""
+        remaining = self.remaining()
+        if remaining < MIN_REQUEST_SECONDS:
+            raise DeadlineExceeded(f"deadline of {self.seconds:g}s exceeded")
+        return min(default, remaining)
+
+    def sleep(self, seconds: float):
+        """Backoff / pacing wait; gives up if nothing useful is left after it."""
+        if self.remaining() - seconds < MIN_REQUEST_SECONDS:
+            raise DeadlineExceeded(f"no budget left for a retry after {seconds:g}s backoff")
+        time.sleep(seconds)
+
+
+def bounded_timeout(deadline: Optional[Deadline], timeout: float) -> float:
+    return timeout if deadline is None else deadline.timeout(timeout)
+
+
+def bounded_sleep(deadline: Optional[Deadline], seconds: float):
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
@@ -4,6 +4,7 @@ from datetime import datetime
 
 from .config import IOC_INDEX_FILE
 from .time_utils import UTC_PLUS_7
+from .metrics import SAVE_SECONDS
 
 def load_existing_iocs():
     """
@@ -31,6 +32,7 @@ def load_existing_iocs():
 
     return seen
 
+@SAVE_SECONDS.time("ioc_index")
 def save_ioc(ioc: str, ioc_type: str, twitter_link: str):
     """
     Append ONE IOC record to iocs.txt
@@ -61,6 +63,6 @@ def save_ioc(ioc: str, ioc_type: str, twitter_link: str):
             f.write(f"{ioc} | {ioc_type} | {twitter_link}\n")
 
     except Exception as e:
-        logging.error(f"Failed to save IOC={ioc}: {e}", exc_info=True)
+        logging.error("Failed to save IOC=%s: %s", ioc, e, exc_info=True)
 
 
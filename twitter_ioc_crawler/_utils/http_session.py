@@ -0,0 +1,16 @@
+import threading
+import requests
+
+_local = threading.local()
+
+
+def http_session() -> requests.Session:
+    """
+    Per-thread pooled requests.Session: provider lookups reuse their
+    TCP / TLS connections (keep-alive) instead of opening one per call.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
@@ -0,0 +1,14 @@
+from typing import NamedTuple
+
+
+class IocRecord(NamedTuple):
+    """
+    One IOC as handed from the crawler to enrichment.
+    discovered_at = time.time() when the crawler saw it.
+    trace_id = the IOC's trace (_utils.tracing.trace_id_for).
+    """
+    ioc: str
+    ioc_type: str
+    twitter_link: str
+    discovered_at: float
+    trace_id: str = ""
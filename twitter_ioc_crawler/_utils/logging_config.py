@@ -1,15 +1,107 @@
+import json
+import time
+import queue
+import atexit
 import logging
-from .config import LOG_FILE, BASE_DIR
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-# New TXT log file
-TXT_LOG_FILE = BASE_DIR / "twitter_ioc_crawler_log.txt"
+from .config import (
+    LOG_FILE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_SAMPLE_BURST,
+    LOG_SAMPLE_WINDOW_SECONDS,
+)
+
+_LISTENER = None
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Enqueue the record as-is: the stock prepare() formats the message
+    in the calling thread, which is exactly the cost we move off the
+    hot path. The listener thread formats it instead.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class CallSiteSampler(logging.Filter):
+    """
+    Rate-limit per-IOC chatter: at most `burst` records below WARNING
+    per call site (file:line) every `window` seconds. WARNING and up
+    always pass. The first record after a window carries the number
+    dropped (`suppressed`), so the log still says how much was cut.
+    """
+
+    def __init__(self, burst: int = LOG_SAMPLE_BURST, window: float = LOG_SAMPLE_WINDOW_SECONDS):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self._sites = {}   # (pathname, lineno) → [window_start, passed, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if self.burst <= 0 or record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+
+            site[2] += 1
+            return False
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: time, level, thread, msg (+ suppressed, exc)."""
+
+    def format(self, record) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        line = super().format(record)
+        if getattr(record, "suppressed", 0):
+            line += f" | (+{record.suppressed} similar lines suppressed)"
+        return line
 
 
 def setup_logging():
     """
     Centralized logging configuration.
     Call ONCE at app startup.
+
+    Callers only enqueue records (QueueHandler); one listener thread
+    formats and writes them to the console and to ONE rotating
+    JSON-lines file. Per-IOC INFO lines are sampled per call site.
     """
+    global _LISTENER
 
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
@@ -18,22 +110,41 @@ def setup_logging():
     if logger.handlers:
         return
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(message)s"
+    # ---- Rotating JSON-lines file ----
+    file_handler = RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
     )
-
-    # ---- Main LOG file (.log) ----
-    file_handler_log = logging.FileHandler(LOG_FILE, encoding="utf-8")
-    file_handler_log.setFormatter(formatter)
-
-    # ---- TXT copy ----
-    file_handler_txt = logging.FileHandler(TXT_LOG_FILE, encoding="utf-8")
-    file_handler_txt.setFormatter(formatter)
+    file_handler.setFormatter(JsonLinesFormatter())
 
     # ---- Console ----
     stream_handler = logging.StreamHandler()
-    stream_handler.setFormatter(formatter)
+    stream_handler.setFormatter(ConsoleFormatter("%(asctime)s | %(levelname)s | %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _LazyQueueHandler(log_queue)
+    queue_handler.addFilter(CallSiteSampler())
 
-    logger.addHandler(file_handler_log)
-    logger.addHandler(file_handler_txt)
-    logger.addHandler(stream_handler)
\ No newline at end of file
+    logger.addHandler(queue_handler)
+
+    _LISTENER = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _LISTENER.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """
+    Drain the queue and stop the listener thread (runs at exit).
+    Records logged afterwards go straight to the handlers.
+    """
+    global _LISTENER
+    if _LISTENER is None:
+        return
+
+    _LISTENER.stop()
+    logger = logging.getLogger()
+    for handler in list(logger.handlers):
+        if isinstance(handler, _LazyQueueHandler):
+            logger.removeHandler(handler)
+    for handler in _LISTENER.handlers:
+        logger.addHandler(handler)
+    _LISTENER = None
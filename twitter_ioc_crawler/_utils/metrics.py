@@ -0,0 +1,337 @@
+import os
+import time
+import atexit
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from .config import METRICS_PORT, METRICS_TEXTFILE, METRICS_TEXTFILE_INTERVAL_SECONDS
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Timer:
+    """histogram.time(...) — context manager and decorator."""
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self._t0, *self.labels)
+        return False
+
+    def __call__(self, fn):
+        def wrapper(*args, **kwargs):
+            # ---- fresh timer per call: the decorated function may run in several threads ----
+            with _Timer(self.histogram, self.labels):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", key, "", value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """set()/inc()/dec(), or set_function() to read the value at scrape time."""
+
+    TYPE = "gauge"
+
+    def __init__(self, name, help, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set_function(self, fn: Callable[[], float], *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+
+        for key, fn in functions.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+        return [("", key, "", value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], list] = {}   # key → [bucket counts..., sum]
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def time(self, *labels) -> _Timer:
+        return _Timer(self, self._key(labels))
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+
+        out = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                out.append(("_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+            out.append(("_sum", key, "", series[-1]))
+            out.append(("_count", key, "", cumulative))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ================= PIPELINE METRICS =================
+
+# ---- Crawl ----
+CRAWL_TWEETS = REGISTRY.counter(
+    "crawler_tweets_total", "Tweets scanned on account timelines", ["account"])
+CRAWL_IOCS = REGISTRY.counter(
+    "crawler_iocs_total", "New IOCs saved from tweets", ["account", "ioc_type"])
+CRAWL_DURATION = REGISTRY.histogram(
+    "crawler_account_seconds", "Time to crawl one account timeline", ["account"],
+    buckets=(5, 10, 20, 30, 60, 120, 300, 600))
+CRAWL_ERRORS = REGISTRY.counter(
+    "crawler_errors_total", "Account crawls that failed (timeline not loaded, driver error)", ["account"])
+
+# ---- Provider lookups ----
+PROVIDER_HTTP = REGISTRY.counter(
+    "tip_http_responses_total", "HTTP responses from TIP providers by status code", ["provider", "status"])
+PROVIDER_HTTP_SECONDS = REGISTRY.histogram(
+    "tip_http_request_seconds", "TIP provider HTTP request latency (one attempt)", ["provider"])
+PROVIDER_CALLS = REGISTRY.counter(
+    "tip_provider_calls_total", "Provider calls by outcome (local, ok, empty, error, deadline, skipped)",
+    ["provider", "outcome"])
+PROVIDER_CALL_SECONDS = REGISTRY.histogram(
+    "tip_provider_call_seconds", "Provider call latency including retries and pacing", ["provider"])
+
+# ---- Enrichment ----
+IOCS_ENRICHED = REGISTRY.counter(
+    "tip_iocs_enriched_total", "IOCs enriched and saved", ["ioc_type"])
+ENRICH_QUEUE_DEPTH = REGISTRY.gauge(
+    "tip_enrich_queue_depth", "IOCs waiting for an enrichment worker or in the scheduler", ["queue"])
+SAVE_SECONDS = REGISTRY.histogram(
+    "save_seconds", "Time to persist one record", ["target"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+# ---- Output sinks (SIEM, syslog, files) ----
+SINK_EVENTS = REGISTRY.counter(
+    "sink_events_total", "Events delivered per sink", ["sink"])
+SINK_FAILURES = REGISTRY.counter(
+    "sink_delivery_failures_total", "Failed batch deliveries per sink", ["sink"])
+SINK_SPOOLED = REGISTRY.counter(
+    "sink_spooled_events_total", "Events written to the disk spool per sink", ["sink"])
+SINK_DEAD_LETTERED = REGISTRY.counter(
+    "sink_dead_lettered_events_total", "Events refused for good and moved to the dead-letter directory", ["sink"])
+SINK_DELIVERY_SECONDS = REGISTRY.histogram(
+    "sink_delivery_seconds", "Batch delivery latency per sink", ["sink"])
+SINK_LAG_SECONDS = REGISTRY.histogram(
+    "sink_lag_seconds", "Time from publish to delivery (oldest event of a batch)", ["sink"],
+    buckets=(0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+SINK_QUEUE_DEPTH = REGISTRY.gauge(
+    "sink_queue_depth", "Events queued in memory per sink", ["sink"])
+SINK_SPOOL_SEGMENTS = REGISTRY.gauge(
+    "sink_spool_segments", "Spool segments waiting for replay per sink", ["sink"])
+OUTPUT_SUPPRESSED = REGISTRY.counter(
+    "output_suppressed_total", "Re-enriched results not sent because nothing changed")
+
+
+def observe_response(provider: str, resp):
+    """Status code + latency of ONE provider HTTP response."""
+    PROVIDER_HTTP.inc(provider, resp.status_code)
+    PROVIDER_HTTP_SECONDS.observe(resp.elapsed.total_seconds(), provider)
+
+
+# ================= EXPOSITION =================
+
+def start_http_server(port: int, addr: str = "127.0.0.1"):
+    # ---- http.server only loaded when the endpoint is enabled ----
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"[+] Metrics endpoint | http://{addr}:{server.server_port}/metrics")
+    return server
+
+
+def write_textfile(path):
+    """Atomic write for the node_exporter textfile collector."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".metrics-", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+def _textfile_loop(path, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            write_textfile(path)
+        except OSError as e:
+            logging.warning(f"Metrics textfile write failed | path={path} | {e}")
+
+
+def start_metrics(port: Optional[int] = METRICS_PORT, textfile=METRICS_TEXTFILE):
+    """Expose metrics as configured: /metrics endpoint and/or textfile (rewritten periodically and at exit)."""
+    if port:
+        try:
+            start_http_server(port)
+        except OSError as e:
+            logging.warning(f"Metrics endpoint not started | port={port} | {e}")
+
+    if textfile:
+        threading.Thread(
+            target=_textfile_loop,
+            args=(textfile, METRICS_TEXTFILE_INTERVAL_SECONDS),
+            name="metrics-textfile",
+            daemon=True,
+        ).start()
+        atexit.register(write_textfile, textfile)
@@ -0,0 +1,201 @@
+import io
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from .config import PROFILE_DIR, PROFILE_TOP_N, PROFILE_SAMPLE_INTERVAL_SECONDS
+from .time_utils import UTC_PLUS_7
+
+# ---- Where a sample's time went: first category (in this order) with a frame in its files ----
+CATEGORIES = [
+    ("webdriver", ("/selenium/",)),
+    ("http", ("/requests/", "/urllib3/", "/http/client.py", "/ssl.py", "/socket.py")),
+    ("regex", ("/_utils/regex.py", "/_utils/parser.py", "/_utils/text_utils.py", "/re.py", "/re/")),
+    ("save", ("/_utils/file_io.py", "/_utils/tip_file_io.py", "/_utils/tip_state.py", "/_utils/sqlite_store.py")),
+    ("pacing", ("/_utils/tip_vt_keys.py", "/_utils/deadline.py", "/_utils/tip_scheduler.py")),
+    ("output", ("/_utils/sinks.py", "/_utils/sink_spool.py", "/_utils/siem.py")),
+]
+
+# ---- Background thread parked here = idle, not a cost of the stage ----
+_IDLE_FILES = ("/threading.py", "/queue.py", "/selectors.py")
+
+
+def _category(filenames: List[str], main_thread: bool) -> str:
+    paths = [f.replace("\\", "/") for f in filenames]
+
+    if not main_thread and paths and any(paths[0].endswith(f) for f in _IDLE_FILES):
+        return "idle"
+
+    for name, fragments in CATEGORIES:
+        if any(frag in path for path in paths for frag in fragments):
+            return name
+    return "other"
+
+
+class _Sampler:
+    """
+    Wall-clock sampling of ALL threads (cProfile only sees the thread
+    that enabled it). Collapsed stacks: `thread;root;...;leaf count`,
+    the input format of flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self.categories = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        main = threading.main_thread().ident
+        names = {}
+
+        while not self._stop.wait(self.interval):
+            for t in threading.enumerate():
+                names[t.ident] = t.name
+
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+
+                funcs, files = [], []
+                while frame is not None:
+                    code = frame.f_code
+                    funcs.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                    files.append(code.co_filename)
+                    frame = frame.f_back
+
+                thread = names.get(ident, str(ident))
+                self.stacks[";".join([thread] + funcs[::-1])] += 1
+                self.categories[_category(files, ident == main)] += 1
+
+
+class StageProfiler:
+    """
+    Per-stage cProfile + sampling profiler + tracemalloc.
+
+    For each `with profiler.stage("enrich"):` block, writes to out_dir:
+      enrich.pstats   cProfile of the calling thread (python -m pstats / snakeviz)
+      enrich.folded   collapsed stacks of all threads (flamegraph.pl, speedscope)
+    and summary.txt: wall time, time split by category (webdriver, http,
+    regex, save, ...), top-N functions and top-N allocation sites per stage.
+    """
+
+    def __init__(
+        self,
+        out_dir=None,
+        top_n: int = PROFILE_TOP_N,
+        sample_interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS,
+    ):
+        stamp = datetime.now(UTC_PLUS_7).strftime("%Y%m%d-%H%M%S")
+        self.out_dir = Path(out_dir) if out_dir else PROFILE_DIR / stamp
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self.sections: List[str] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+        sampler = _Sampler(self.sample_interval)
+        profile = cProfile.Profile()
+
+        t0 = time.perf_counter()
+        sampler.start()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            sampler.stop()
+            wall = time.perf_counter() - t0
+
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            self._write_stage(name, wall, profile, sampler, before, after, peak)
+
+    def _write_stage(self, name, wall, profile, sampler, before, after, peak):
+        profile.dump_stats(str(self.out_dir / f"{name}.pstats"))
+
+        with open(self.out_dir / f"{name}.folded", "w", encoding="utf-8") as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        lines = [f"==== {name} | wall={wall:.2f}s | peak_traced={peak / 1e6:.1f}MB ===="]
+
+        busy = {cat: n for cat, n in sampler.categories.items() if cat != "idle"}
+        total = sum(busy.values())
+        if total:
+            split = " | ".join(
+                f"{cat}={n * 100 / total:.0f}%" for cat, n in sorted(busy.items(), key=lambda kv: -kv[1])
+            )
+            lines.append(f"Sampled busy time (all threads): {split} | idle samples={sampler.categories['idle']}")
+
+        buf = io.StringIO()
+        pstats.Stats(profile, stream=buf).sort_stats("cumulative").print_stats(self.top_n)
+        lines.append(f"-- Top {self.top_n} functions (cumulative, calling thread) --")
+        lines.append(buf.getvalue().strip())
+
+        lines.append(f"-- Top {self.top_n} allocation sites (growth) --")
+        for stat in after.compare_to(before, "lineno")[:self.top_n]:
+            lines.append(str(stat))
+
+        section = "\n".join(lines)
+        self.sections.append(section)
+        logging.info(f"[+] Profile {name} | wall={wall:.2f}s | peak_traced={peak / 1e6:.1f}MB | out={self.out_dir}")
+
+    def write_summary(self) -> Optional[Path]:
+        if not self.sections:
+            return None
+        path = self.out_dir / "summary.txt"
+        path.write_text("\n\n".join(self.sections) + "\n", encoding="utf-8")
+        logging.info(f"[✓] Profile summary | {path}")
+        return path
+
+
+_PROFILER: Optional[StageProfiler] = None
+
+
+def enable_profiling(out_dir=None) -> StageProfiler:
+    global _PROFILER
+    _PROFILER = StageProfiler(out_dir)
+    return _PROFILER
+
+
+def stage(name: str):
+    """Profile the block if --profile is on; no-op otherwise."""
+    if _PROFILER is None:
+        return nullcontext()
+    return _PROFILER.stage(name)
+
+
+def write_profile_summary():
+    if _PROFILER is not None:
+        _PROFILER.write_summary()
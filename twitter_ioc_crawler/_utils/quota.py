@@ -0,0 +1,167 @@
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from .config import QUOTA_DB, QUOTA_RESERVE_FRACTION
+from .sqlite_store import open_db
+
+# ---- Calls per provider / key / UTC hour (quotas reset at 00:00 UTC) ----
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    provider TEXT NOT NULL,
+    key_id TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, key_id, hour)
+) WITHOUT ROWID;
+"""
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = open_db(QUOTA_DB, SCHEMA)
+    return _conn
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def record_call(provider: str, key_id: str = "default", calls: int = 1):
+    """
+    Count quota-consuming API calls (one row per provider/key/hour).
+    """
+    hour = _utc_now().strftime("%Y-%m-%d %H")
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO quota_usage (provider, key_id, hour, calls) VALUES (?, ?, ?, ?)
+                ON CONFLICT(provider, key_id, hour) DO UPDATE SET calls = calls + excluded.calls
+                """,
+                (provider, key_id, hour, calls),
+            )
+
+
+def used_today(provider: str, key_id: Optional[str] = None, before_hour: bool = False) -> int:
+    """
+    Calls made today (UTC) for a provider, optionally for one key.
+    before_hour=True excludes the current hour.
+    """
+    now = _utc_now()
+    day = now.strftime("%Y-%m-%d")
+    upper = now.strftime("%Y-%m-%d %H") if before_hour else day + " ~"
+
+    sql = "SELECT COALESCE(SUM(calls), 0) FROM quota_usage WHERE provider = ? AND hour >= ? AND hour < ?"
+    args = [provider, day, upper]
+    if key_id is not None:
+        sql += " AND key_id = ?"
+        args.append(key_id)
+
+    with _lock:
+        return _db().execute(sql, args).fetchone()[0]
+
+
+def used_this_hour(provider: str) -> int:
+    return used_today(provider) - used_today(provider, before_hour=True)
+
+
+def usage_today() -> dict:
+    """{provider: {key_id: calls}} for today (UTC)."""
+    day = _utc_now().strftime("%Y-%m-%d")
+    with _lock:
+        rows = _db().execute(
+            """
+            SELECT provider, key_id, SUM(calls) FROM quota_usage
+            WHERE hour >= ? AND hour < ?
+            GROUP BY provider, key_id
+            """,
+            (day, day + " ~"),
+        ).fetchall()
+    out = {}
+    for provider, key_id, calls in rows:
+        out.setdefault(provider, {})[key_id] = calls
+    return out
+
+
+def _hours_left(now: datetime) -> float:
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max((midnight - now).total_seconds() / 3600, 1 / 60)
+
+
+def quota_plan(
+    provider: str,
+    daily_limit: Optional[int],
+    backlog: int = 0,
+    reserve_fraction: float = QUOTA_RESERVE_FRACTION,
+) -> dict:
+    """
+    Spread today's remaining budget over the remaining hours.
+
+    reserve:              calls kept for high-priority (fresh) IOCs
+    hour_cap:             normal-priority share of the current hour
+    hour_budget:          what is left of hour_cap
+    projected_drain_hours: time to work through `backlog` at this pace
+                          (continuing on following days if needed)
+    """
+    if not daily_limit:
+        return {
+            "provider": provider, "daily_limit": None, "used": used_today(provider),
+            "remaining": None, "reserve": 0, "hour_cap": None, "hour_budget": None,
+            "backlog": backlog, "projected_drain_hours": 0.0,
+        }
+
+    now = _utc_now()
+    used = used_today(provider)
+    used_before_hour = used_today(provider, before_hour=True)
+    used_this_hour = used - used_before_hour
+
+    remaining = max(0, daily_limit - used)
+    reserve = int(daily_limit * reserve_fraction)
+    hours_left = _hours_left(now)
+
+    # ---- Current hour's share of the non-reserved budget ----
+    spendable = max(0, daily_limit - reserve - used_before_hour)
+    hours_incl_current = max(1.0, hours_left + now.minute / 60)
+    hour_cap = int(spendable / hours_incl_current)
+    hour_budget = max(0, hour_cap - used_this_hour)
+
+    # ---- Projection: today's spendable first, then full days ----
+    today_capacity = max(0, daily_limit - reserve - used)
+    per_day = max(1, daily_limit - reserve)
+    if backlog <= today_capacity:
+        rate = today_capacity / hours_left if today_capacity else per_day / 24
+        drain_hours = backlog / rate if backlog else 0.0
+    else:
+        drain_hours = hours_left + (backlog - today_capacity) / per_day * 24
+
+    return {
+        "provider": provider,
+        "daily_limit": daily_limit,
+        "used": used,
+        "remaining": remaining,
+        "reserve": reserve,
+        "hour_cap": hour_cap,
+        "hour_budget": hour_budget,
+        "backlog": backlog,
+        "projected_drain_hours": round(drain_hours, 2),
+    }
+
+
+def quota_allows(provider: str, daily_limit: Optional[int], high_priority: bool = False) -> bool:
+    """
+    High priority may use everything left today (including the reserve);
+    normal priority only its share of the current hour.
+    """
+    if not daily_limit:
+        return True
+
+    plan = quota_plan(provider, daily_limit)
+    if high_priority:
+        return plan["remaining"] > 0
+    return plan["hour_budget"] > 0 and plan["remaining"] > plan["reserve"]
@@ -30,6 +30,10 @@ def inject_cookies(driver, username: str):
         "secure": True
     })
 
+    open_profile(driver, username)
+
+def open_profile(driver, username: str):
+    """Navigate an already authenticated driver to an account's timeline."""
     driver.get(f"https://x.com/{username}")
     time.sleep(5)
 
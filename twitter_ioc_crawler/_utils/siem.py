@@ -1,6 +1,7 @@
 import logging
 import requests
 from .config import SIEM_API_KEY, SIEM_API_URL
+from .tracing import trace_id_for
 
 SIEM_HEADERS = {
     "Authorization": SIEM_API_KEY,
@@ -39,26 +40,35 @@ def _build_siem_event(result: dict) -> dict:
     """
     Build a SIEM-safe event aligned with DATASET_COLUMNS.
     Missing fields are sent as empty string.
+    trace_id links the event to the IOC's trace (traces.jsonl).
     """
     event = {}
 
     for col in DATASET_COLUMNS:
         event[col] = result.get(col, "")
 
+    event["trace_id"] = trace_id_for(event["ioc"])
     return event
 
 
-def send_tip_result_to_siem(result: dict):
+def send_tip_result_to_siem(result: dict) -> bool:
     """
     Send ONE newly enriched IOC to SIEM.
     Dataset schema is fixed & normalized.
+    Returns True if the SIEM accepted the event.
+    """
+    return send_siem_event(_build_siem_event(result))
+
+
+def send_siem_event(event: dict) -> bool:
+    """
+    POST ONE already built event (full or delta) to SIEM.
+    Returns True if the SIEM accepted it.
     """
 
     if not SIEM_API_URL or not SIEM_API_KEY:
         logging.warning("SIEM config missing — skipping SIEM send")
-        return
-
-    event = _build_siem_event(result)
+        return False
 
     try:
         res = requests.post(
@@ -70,14 +80,16 @@ def send_tip_result_to_siem(result: dict):
 
         if res.status_code not in (200, 201, 202):
             logging.error(
-                f"SIEM rejected IOC={event.get('ioc')} | "
-                f"status={res.status_code} | body={res.text}"
+                "SIEM rejected IOC=%s | status=%s | body=%s", event.get("ioc"), res.status_code, res.text
             )
-        else:
-            logging.info(f"SIEM accepted IOC={event.get('ioc')}")
+            return False
+
+        logging.info("SIEM accepted IOC=%s", event.get("ioc"))
+        return True
 
     except Exception as e:
         logging.error(
-            f"SIEM error IOC={event.get('ioc')} | {e}",
+            "SIEM error IOC=%s | %s", event.get("ioc"), e,
             exc_info=True
         )
+        return False
@@ -0,0 +1,87 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+class SinkSpool:
+    """
+    On-disk spool of output events that could not be delivered
+    (one spool directory per sink).
+
+    One NDJSON segment file per spooled batch, named after the sequence
+    number of its first event. Sequence numbers grow across runs, so
+    replaying segments in name order replays events in the order they
+    were produced.
+    """
+
+    SUFFIX = ".ndjson"
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def _segments(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{self.SUFFIX}"))
+
+    def __len__(self):
+        """Number of segments waiting (not events)."""
+        with self._lock:
+            return len(self._segments())
+
+    def last_seq(self) -> int:
+        with self._lock:
+            segments = self._segments()
+        return int(segments[-1].stem) if segments else 0
+
+    def write(self, batch: List[Tuple[int, bytes]]):
+        """Persist (seq, event line) pairs as one segment (atomic rename)."""
+        if not batch:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            # ---- Replayed chunks share their segment's seq: next free name keeps the order ----
+            seq = batch[0][0]
+            while (self.directory / f"{seq:020d}{self.SUFFIX}").exists():
+                seq += 1
+            path = self.directory / f"{seq:020d}{self.SUFFIX}"
+            tmp = path.with_suffix(".tmp")
+
+            with open(tmp, "wb") as f:
+                for _, line in batch:
+                    f.write(line + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+
+    def head(self) -> Optional[Tuple[Path, List[bytes]]]:
+        """Oldest segment and its event lines, or None."""
+        with self._lock:
+            segments = self._segments()
+            if not segments:
+                return None
+            path = segments[0]
+            with open(path, "rb") as f:
+                lines = [line.rstrip(b"\n") for line in f if line.strip()]
+        return path, lines
+
+    def remove(self, path: Path):
+        with self._lock:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def replace(self, path: Path, lines: List[bytes]):
+        """Keep only the undelivered tail of a partly replayed segment."""
+        tmp = path.with_suffix(".tmp")
+        with self._lock:
+            with open(tmp, "wb") as f:
+                for line in lines:
+                    f.write(line + b"\n")
+            os.replace(tmp, path)
+        logging.debug(f"Sink spool segment trimmed | segment={path.name} | left={len(lines)}")
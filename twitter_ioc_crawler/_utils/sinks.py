@@ -0,0 +1,615 @@
+import gzip
+import json
+import time
+import atexit
+import socket
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .config import (
+    OUTPUT_SINKS,
+    SIEM_API_KEY,
+    SIEM_API_URL,
+    SIEM_BATCH_FORMAT,
+    SIEM_GZIP,
+    SIEM_BATCH_MAX_EVENTS,
+    SIEM_BATCH_MAX_BYTES,
+    SIEM_BATCH_LINGER_SECONDS,
+    SIEM_QUEUE_SIZE,
+    SIEM_SPOOL_DIR,
+    SIEM_BACKOFF_BASE_SECONDS,
+    SIEM_BACKOFF_MAX_SECONDS,
+    SYSLOG_HOST,
+    SYSLOG_PORT,
+    SYSLOG_PROTOCOL,
+    NDJSON_SINK_FILE,
+    CEF_SINK_FILE,
+    SINK_SPOOL_DIR,
+    SINK_DEAD_LETTER_DIR,
+    TRACING,
+)
+from .siem import _build_siem_event
+from .change_filter import CHANGES, ChangeFilter
+from .sink_spool import SinkSpool
+from .http_session import http_session
+from .tracing import record_span
+from .metrics import (
+    SINK_DEAD_LETTERED,
+    SINK_DELIVERY_SECONDS,
+    SINK_EVENTS,
+    SINK_FAILURES,
+    SINK_LAG_SECONDS,
+    SINK_QUEUE_DEPTH,
+    SINK_SPOOL_SEGMENTS,
+    SINK_SPOOLED,
+)
+
+
+class BatchRejected(Exception):
+    """deliver(): the destination refused the batch for good (e.g. 400) — retrying cannot help."""
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(f"status={status} {message}".strip())
+        self.status = status
+
+
+class BatchTooLarge(BatchRejected):
+    """deliver(): the batch is over the destination's size limit (413) — smaller ones may pass."""
+
+
+class BatchingSink:
+    """
+    One output destination with its own queue, batching, retry and spool.
+
+    add() only puts the (already serialized) event on a bounded in-memory
+    queue; a background worker batches it (`max_events`, `max_bytes`
+    uncompressed, or `linger` seconds after the first event) and hands
+    the batch to deliver().
+
+    When the queue is full or delivery fails, events go to the disk
+    spool instead. While anything is spooled, new batches are spooled
+    too and the spool is replayed oldest first, with exponential backoff
+    between failed attempts — delivery order is kept across outages and
+    restarts.
+
+    A batch the destination refuses for good (BatchRejected) is moved to
+    the dead-letter directory instead, so it never blocks what follows;
+    one refused as too large (BatchTooLarge) is split in halves first.
+
+    Subclasses implement deliver(lines) → bool (False = retry later) and
+    raise BatchRejected / BatchTooLarge.
+    """
+
+    # ---- Takes SIEM_DELTA_EVENTS deltas instead of full records ----
+    accepts_delta = False
+
+    def __init__(
+        self,
+        name: str,
+        max_events: int = SIEM_BATCH_MAX_EVENTS,
+        max_bytes: int = SIEM_BATCH_MAX_BYTES,
+        linger: float = SIEM_BATCH_LINGER_SECONDS,
+        queue_size: int = SIEM_QUEUE_SIZE,
+        spool_dir=None,
+        dead_letter_dir=None,
+        backoff_base: float = SIEM_BACKOFF_BASE_SECONDS,
+        backoff_max: float = SIEM_BACKOFF_MAX_SECONDS,
+    ):
+        self.name = name
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.linger = linger
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.spool = SinkSpool(spool_dir or SINK_SPOOL_DIR / name)
+        self.dead_letter = SinkSpool(dead_letter_dir or SINK_DEAD_LETTER_DIR / name)
+        self.stats = {
+            "events": 0, "batches": 0, "spooled_events": 0, "replayed_events": 0,
+            "overflow_events": 0, "failed_posts": 0, "dead_lettered_events": 0,
+            "raw_bytes": 0, "wire_bytes": 0,
+        }
+
+        self._queue: "queue.Queue[Tuple[int, bytes]]" = queue.Queue(maxsize=queue_size)
+
+        SINK_QUEUE_DEPTH.set_function(self._queue.qsize, name)
+        SINK_SPOOL_SEGMENTS.set_function(self.spool.__len__, name)
+
+        self._failures = 0
+        self._retry_at = 0.0
+
+        self._cond = threading.Condition()
+        self._inflight = 0            # queued or held by the worker, not yet delivered / spooled
+        self._flush_requested = False
+        self._stop = False
+        self._worker = None
+
+    def deliver(self, lines: List[bytes]) -> bool:
+        raise NotImplementedError
+
+    # ---- Producer side (hot path: never blocks on the destination) ----
+
+    def _ensure_worker(self):
+        with self._cond:
+            if self._worker is None or not self._worker.is_alive():
+                self._stop = False
+                self._worker = threading.Thread(target=self._run, name=f"sink-{self.name}", daemon=True)
+                self._worker.start()
+
+    def add(self, seq: int, line: bytes):
+        item = (seq, line)
+
+        self._ensure_worker()
+        with self._cond:
+            self._inflight += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._cond:
+                self._inflight -= 1
+            # ---- Overflow: straight to disk, replayed in seq order ----
+            self.spool.write([item])
+            self.stats["overflow_events"] += 1
+            self.stats["spooled_events"] += 1
+            SINK_SPOOLED.inc(self.name)
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 60) -> bool:
+        """
+        Wait until every queued event was delivered or spooled, and the
+        spool was drained or is backing off. Returns False on timeout.
+        """
+        with self._cond:
+            if self._idle():
+                return True
+
+        self._ensure_worker()
+        deadline = time.monotonic() + timeout
+
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while not self._idle():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.5))
+        return True
+
+    def close(self, timeout: float = 10):
+        """Flush, then stop the worker; leftovers stay in the spool."""
+        self.flush(timeout)
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def _idle(self) -> bool:
+        spool_waiting = len(self.spool) and time.monotonic() >= self._retry_at
+        return self._inflight == 0 and not spool_waiting
+
+    # ---- Worker ----
+
+    def _run(self):
+        while True:
+            if len(self.spool) and time.monotonic() >= self._retry_at:
+                self._replay_head()
+
+            batch = self._gather()
+
+            if batch:
+                try:
+                    if len(self.spool) or time.monotonic() < self._retry_at:
+                        self._to_spool(batch)
+                    else:
+                        done = self._deliver(batch)
+                        if done < len(batch):
+                            self._to_spool(batch[done:])
+                finally:
+                    with self._cond:
+                        self._inflight -= len(batch)
+                        self._cond.notify_all()
+
+            with self._cond:
+                if self._idle():
+                    self._flush_requested = False
+                    self._cond.notify_all()
+                if self._stop and self._queue.empty():
+                    return
+
+    def _gather(self) -> List[Tuple[int, bytes]]:
+        """Block for the first event, then fill a batch until full / linger / flush."""
+        wait = self.linger
+        if len(self.spool):
+            wait = max(0.05, min(wait, self._retry_at - time.monotonic()))
+
+        try:
+            first = self._queue.get(timeout=wait)
+        except queue.Empty:
+            return []
+
+        batch, size = [first], len(first[1]) + 1
+        linger_until = time.monotonic() + self.linger
+
+        while len(batch) < self.max_events and size < self.max_bytes:
+            if self._flush_requested or self._stop:
+                timeout = 0
+            else:
+                timeout = linger_until - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[1]) + 1
+
+        return batch
+
+    def _to_spool(self, batch: List[Tuple[int, bytes]]):
+        self.spool.write(batch)
+        self.stats["spooled_events"] += len(batch)
+        SINK_SPOOLED.inc(self.name, amount=len(batch))
+        logging.warning(f"Sink events spooled | sink={self.name} | events={len(batch)} | segments={len(self.spool)}")
+
+    def _replay_head(self):
+        head = self.spool.head()
+        if head is None:
+            return
+        path, lines = head
+
+        # ---- per-event seq is not kept in the segment: its first seq for all ----
+        seq = int(path.stem)
+        for start in range(0, len(lines), self.max_events):
+            chunk = [(seq, line) for line in lines[start:start + self.max_events]]
+            done = self._deliver(chunk, replayed=True)
+            self.stats["replayed_events"] += done
+            if done < len(chunk):
+                if start + done:
+                    self.spool.replace(path, lines[start + done:])
+                return
+
+        self.spool.remove(path)
+        logging.info(f"Sink spool segment replayed | sink={self.name} | events={len(lines)} | left={len(self.spool)}")
+
+    def _observe_lag(self, seq: int):
+        # ---- seq = publish time in ns (SinkFanout) ----
+        SINK_LAG_SECONDS.observe(max(0.0, time.time() - seq / 1e9), self.name)
+
+    def _trace_delivery(self, items: List[Tuple[int, bytes]], replayed: bool = False):
+        # ---- One span per event, publish (seq) → delivered: the output leg of the IOC's trace ----
+        if not TRACING:
+            return
+        delivered = time.time_ns()
+        for seq, line in items:
+            trace_id = json.loads(line).get("trace_id")
+            if trace_id:
+                record_span(
+                    f"sink.{self.name}", trace_id, seq, delivered,
+                    batch_events=len(items), replayed=replayed or None,
+                )
+
+    def _deliver(self, batch: List[Tuple[int, bytes]], replayed: bool = False) -> int:
+        """
+        Deliver (seq, line) pairs in order. Returns how many leading pairs
+        are done with (delivered or dead-lettered); the rest is to be
+        retried after the backoff.
+        """
+        lines = [line for _, line in batch]
+        try:
+            with SINK_DELIVERY_SECONDS.time(self.name):
+                ok = self.deliver(lines)
+        except BatchTooLarge as e:
+            if len(batch) == 1:
+                self._to_dead_letter(batch, e)
+                return 1
+            # ---- Split until the halves fit (or a single event is refused) ----
+            half = len(batch) // 2
+            done = self._deliver(batch[:half], replayed)
+            if done < half:
+                return done
+            return half + self._deliver(batch[half:], replayed)
+        except BatchRejected as e:
+            self._to_dead_letter(batch, e)
+            return len(batch)
+        except Exception as e:
+            logging.error(f"Sink delivery error | sink={self.name} | events={len(lines)} | {e}")
+            ok = False
+
+        if not ok:
+            self.stats["failed_posts"] += 1
+            SINK_FAILURES.inc(self.name)
+            self._backoff()
+            return 0
+
+        self._failures = 0
+        self._retry_at = 0.0
+        self.stats["events"] += len(lines)
+        self.stats["batches"] += 1
+        SINK_EVENTS.inc(self.name, amount=len(lines))
+        self._observe_lag(batch[0][0])
+        self._trace_delivery(batch, replayed)
+        return len(batch)
+
+    def _to_dead_letter(self, batch: List[Tuple[int, bytes]], error: BatchRejected):
+        self.dead_letter.write(batch)
+        self.stats["dead_lettered_events"] += len(batch)
+        SINK_DEAD_LETTERED.inc(self.name, amount=len(batch))
+        logging.error(
+            f"Sink batch refused — moved to dead letter | sink={self.name} | events={len(batch)} | "
+            f"{error} | dir={self.dead_letter.directory}"
+        )
+
+    def _backoff(self):
+        self._failures += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + delay
+        logging.warning(f"Sink unavailable — retry in {delay:.0f}s | sink={self.name} | failures={self._failures}")
+
+
+# ================= DESTINATIONS =================
+
+class HttpSink(BatchingSink):
+    """
+    POST batches as NDJSON or a JSON array (SIEM HTTP collector),
+    gzip-compressed unless the endpoint answers 415.
+    """
+
+    accepts_delta = True
+
+    def __init__(
+        self,
+        name: str = "siem",
+        url: Optional[str] = SIEM_API_URL,
+        api_key: Optional[str] = SIEM_API_KEY,
+        fmt: str = SIEM_BATCH_FORMAT,
+        use_gzip: bool = SIEM_GZIP,
+        **kwargs,
+    ):
+        super().__init__(name, **kwargs)
+        self.url = url
+        self.api_key = api_key
+        self.fmt = fmt
+        self.use_gzip = use_gzip
+
+    def _payload(self, batch: List[bytes]):
+        if self.fmt == "json":
+            return b"[" + b",".join(batch) + b"]", "application/json"
+        return b"\n".join(batch) + b"\n", "application/x-ndjson"
+
+    def deliver(self, lines: List[bytes]) -> bool:
+        if not self.url or not self.api_key:
+            logging.warning(f"{self.name} config missing — batch not sent | events={len(lines)}")
+            return False
+
+        raw, content_type = self._payload(lines)
+        headers = {"Authorization": self.api_key, "Content-Type": content_type}
+
+        body = raw
+        if self.use_gzip:
+            body = gzip.compress(raw, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        res = http_session().post(self.url, headers=headers, data=body, timeout=30)
+
+        # ---- Endpoint does not take gzip → plain from now on ----
+        if res.status_code == 415 and self.use_gzip:
+            logging.warning(f"{self.name} rejected gzip (415) — sending uncompressed")
+            self.use_gzip = False
+            headers.pop("Content-Encoding")
+            body = raw
+            res = http_session().post(self.url, headers=headers, data=body, timeout=30)
+
+        if res.status_code not in (200, 201, 202):
+            # ---- Only timeouts, throttling and server errors are worth retrying ----
+            if res.status_code == 413:
+                raise BatchTooLarge(res.status_code, res.text[:500])
+            if 400 <= res.status_code < 500 and res.status_code not in (408, 429):
+                raise BatchRejected(res.status_code, res.text[:500])
+            logging.error(
+                f"{self.name} rejected batch | events={len(lines)} | "
+                f"status={res.status_code} | body={res.text[:500]}"
+            )
+            return False
+
+        self.stats["raw_bytes"] += len(raw)
+        self.stats["wire_bytes"] += len(body)
+
+        logging.info(
+            f"{self.name} accepted batch | events={len(lines)} | "
+            f"bytes={len(body)}{' (gzip)' if body is not raw else ''}"
+        )
+        return True
+
+
+def _cef_escape_header(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("|", "\\|")
+
+
+def _cef_escape_ext(value) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace("=", "\\=")
+        .replace("\r", "").replace("\n", "\\n")
+    )
+
+
+# ---- CEF extension keys: standard where one fits, custom labelled otherwise ----
+_CEF_IOC_KEY = {"ip": "dst", "url": "request", "hash": "fileHash"}
+_CEF_FIELDS = [
+    ("cs1", "twitter_link"),
+    ("cn1", "vt_malicious_score"),
+    ("cs2", "vt_last_analysis_date"),
+    ("cn2", "abuseipdb_abuseConfidenceScore"),
+    ("cn3", "alienvault_pulse_info_count"),
+    ("cs3", "malwarebazaar_signature"),
+    ("cs4", "alienvault_link"),
+    ("cs6", "trace_id"),
+]
+
+
+def to_cef(event: dict) -> str:
+    """DATASET_COLUMNS event → one CEF:0 line (severity from VT detections)."""
+    try:
+        score = int(event.get("vt_malicious_score") or 0)
+    except (TypeError, ValueError):
+        score = 0
+    severity = min(10, score)
+    ioc_type = event.get("ioc_type", "")
+
+    header = "|".join(_cef_escape_header(v) for v in (
+        "CEF:0", "cti-project", "twitter_ioc_crawler", "1.0",
+        f"tip-{ioc_type or 'ioc'}", f"TIP enrichment {ioc_type}".strip(), severity,
+    ))
+
+    ext = [f"{_CEF_IOC_KEY.get(ioc_type, 'cs5')}={_cef_escape_ext(event.get('ioc', ''))}"]
+    for key, column in _CEF_FIELDS:
+        value = event.get(column)
+        if value in (None, ""):
+            continue
+        ext.append(f"{key}={_cef_escape_ext(value)}")
+        ext.append(f"{key}Label={column}")
+
+    return header + "|" + " ".join(ext)
+
+
+class SyslogSink(BatchingSink):
+    """CEF over syslog (RFC 3164 framing), UDP datagrams or newline-framed TCP."""
+
+    FACILITY_LOCAL0 = 16
+    SEVERITY_INFO = 6
+
+    def __init__(
+        self,
+        name: str = "syslog",
+        host: Optional[str] = SYSLOG_HOST,
+        port: int = SYSLOG_PORT,
+        protocol: str = SYSLOG_PROTOCOL,
+        **kwargs,
+    ):
+        super().__init__(name, **kwargs)
+        self.host = host
+        self.port = port
+        self.protocol = protocol.lower()
+        self.hostname = socket.gethostname()
+
+    def _message(self, line: bytes) -> bytes:
+        pri = self.FACILITY_LOCAL0 * 8 + self.SEVERITY_INFO
+        stamp = datetime.now(timezone.utc).strftime("%b %d %H:%M:%S")
+        cef = to_cef(json.loads(line))
+        return f"<{pri}>{stamp} {self.hostname} twitter_ioc_crawler: {cef}".encode()
+
+    def deliver(self, lines: List[bytes]) -> bool:
+        if not self.host:
+            logging.warning(f"{self.name} SYSLOG_HOST not set — batch not sent | events={len(lines)}")
+            return False
+
+        messages = [self._message(line) for line in lines]
+
+        if self.protocol == "tcp":
+            with socket.create_connection((self.host, self.port), timeout=10) as sock:
+                sock.sendall(b"\n".join(messages) + b"\n")
+        else:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                for message in messages:
+                    sock.sendto(message, (self.host, self.port))
+
+        return True
+
+
+class FileSink(BatchingSink):
+    """Append events to a local file as NDJSON (data lake drop) or CEF lines."""
+
+    def __init__(self, name: str, path, fmt: str = "ndjson", **kwargs):
+        kwargs.setdefault("linger", 1)
+        super().__init__(name, **kwargs)
+        self.path = Path(path)
+        self.fmt = fmt
+
+    def deliver(self, lines: List[bytes]) -> bool:
+        if self.fmt == "cef":
+            lines = [to_cef(json.loads(line)).encode() for line in lines]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(b"\n".join(lines) + b"\n")
+        return True
+
+
+# ================= FAN-OUT =================
+
+def build_sink(name: str) -> BatchingSink:
+    if name == "siem":
+        return HttpSink("siem", spool_dir=SIEM_SPOOL_DIR)
+    if name == "syslog":
+        return SyslogSink("syslog")
+    if name == "ndjson":
+        return FileSink("ndjson", NDJSON_SINK_FILE, fmt="ndjson")
+    if name == "cef_file":
+        return FileSink("cef_file", CEF_SINK_FILE, fmt="cef")
+    raise ValueError(f"Unknown output sink: {name}")
+
+
+class SinkFanout:
+    """
+    Serialize each record ONCE and hand the bytes to every sink.
+    Per-sink formatting (e.g. CEF), batching and retries run on the
+    sink's own worker, so a sink adds no work to the enrichment loop
+    beyond one queue put.
+    Re-enriched records whose content did not change are dropped before
+    serialization (ChangeFilter), so no sink sees them. A changed record
+    sent as a delta (SIEM_DELTA_EVENTS) is serialized a second time, in
+    full, for the sinks that do not take deltas (files, syslog).
+    """
+
+    def __init__(self, sinks: List[BatchingSink], changes: Optional[ChangeFilter] = None):
+        self.sinks = sinks
+        self.changes = changes
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+
+    def _next_seq(self) -> int:
+        # wall-clock based → keeps growing across restarts (spool order)
+        with self._seq_lock:
+            self._seq = max(self._seq + 1, time.time_ns())
+            return self._seq
+
+    def publish(self, result: dict) -> bool:
+        """Queue `result` on every sink. False if it was suppressed as unchanged."""
+        event = _build_siem_event(result)
+        emitted = event
+        if self.changes is not None:
+            emitted = self.changes.filter(event)
+            if emitted is None:
+                return False
+
+        line = json.dumps(event, separators=(",", ":")).encode()
+        delta_line = line if emitted is event else json.dumps(emitted, separators=(",", ":")).encode()
+        seq = self._next_seq()
+        for sink in self.sinks:
+            sink.add(seq, delta_line if sink.accepts_delta else line)
+        return True
+
+    def flush(self, timeout: float = 60) -> bool:
+        deadline = time.monotonic() + timeout
+        ok = True
+        for sink in self.sinks:
+            ok = sink.flush(max(0.0, deadline - time.monotonic())) and ok
+        return ok
+
+    def close(self, timeout: float = 10):
+        for sink in self.sinks:
+            sink.close(timeout)
+
+    def stats(self) -> dict:
+        return {sink.name: dict(sink.stats) for sink in self.sinks}
+
+
+# ---- Configured sinks (OUTPUT_SINKS); spooled on exit if undelivered ----
+OUTPUT = SinkFanout([build_sink(name) for name in OUTPUT_SINKS], changes=CHANGES)
+atexit.register(OUTPUT.close)
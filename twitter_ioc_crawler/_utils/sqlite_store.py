@@ -0,0 +1,13 @@
+import sqlite3
+
+
+def open_db(path, schema: str) -> sqlite3.Connection:
+    """
+    Open (or create) a local SQLite store and apply its schema.
+    WAL mode keeps readers unblocked while a sync job is writing.
+    """
+    conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    return conn
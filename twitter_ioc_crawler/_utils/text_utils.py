@@ -18,3 +18,21 @@ def get_ioc_type(ioc: str) -> str:
     if URL_REGEX.fullmatch(ioc):
         return "url"
     return "unknown"
+
+def canonical_ioc(ioc: str) -> str:
+    """
+    Canonical form used to detect identical IOCs:
+    hashes lower-case, URL scheme/host lower-case, surrounding spaces removed.
+    """
+    ioc = normalize(ioc.strip())
+    ioc_type = get_ioc_type(ioc)
+
+    if ioc_type == "hash":
+        return ioc.lower()
+
+    if ioc_type == "url":
+        scheme, sep, rest = ioc.partition("://")
+        host, slash, path = rest.partition("/")
+        return f"{scheme.lower()}{sep}{host.lower()}{slash}{path}"
+
+    return ioc
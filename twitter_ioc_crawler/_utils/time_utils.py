@@ -7,3 +7,15 @@ def parse_twitter_time(dt: str):
         return None
     utc = datetime.fromisoformat(dt.replace("Z", "+00:00"))
     return utc.astimezone(UTC_PLUS_7)
+
+# Twitter snowflake IDs embed the creation time (ms since this epoch)
+TWITTER_EPOCH_MS = 1288834974657
+
+def tweet_link_to_timestamp(tweet_link: str):
+    """
+    Return the UNIX timestamp of a tweet from its status link, or None.
+    """
+    tweet_id = tweet_link.rstrip("/").split("/")[-1] if tweet_link else ""
+    if not tweet_id.isdigit():
+        return None
+    return ((int(tweet_id) >> 22) + TWITTER_EPOCH_MS) / 1000
@@ -1,28 +1,60 @@
 import os
-import requests
 import logging
-from .config import ABUSEIPDB_API_KEY, ABUSEIPDB_URL
+import ipaddress
+from .config import (
+    ABUSEIPDB_API_KEY,
+    ABUSEIPDB_URL,
+    ABUSEIPDB_BLOCK_URL,
+    ABUSEIPDB_BLOCK_PREFIX,
+    ABUSEIPDB_BLOCK_MIN_IPS,
+)
 from requests.exceptions import RequestException
+from .quota import record_call
+from .metrics import observe_response
+from .deadline import Deadline, bounded_sleep, bounded_timeout
+from .circuit_breaker import ProviderError
+from .http_session import http_session
 from datetime import datetime
-import time
-from typing import Optional
+from typing import Callable, Optional, Dict, Iterable
 
-def abuseipdb_lookup(ip: str, retries: int = 3) -> Optional[dict]:
+def _headers() -> dict:
+    return {
+        "Accept": "application/json",
+        "Key": ABUSEIPDB_API_KEY,
+        "User-Agent": "CTI-TIP/1.0 (contact: security-research)",
+    }
+
+
+def _normalize_reported_at(last_reported: str) -> str:
+    # ---- Normalize lastReportedAt ----
+    if last_reported:
+        try:
+            last_reported = (
+                datetime.fromisoformat(last_reported.replace("Z", "+00:00"))
+                .strftime("%Y-%m-%d %H:%M:%S")
+            )
+        except Exception:
+            pass  # keep original if parsing fails
+    return last_reported or ""
+
+
+def abuseipdb_lookup(
+    ip: str,
+    timeout: float = 15,
+    retries: int = 3,
+    deadline: Optional[Deadline] = None,
+) -> Optional[dict]:
     """
     Lookup IP reputation from AbuseIPDB.
     Returns a dict with extracted fields or None.
+    Raises ProviderError when every attempt failed,
+    DeadlineExceeded when the IOC budget ran out first.
     """
 
     if not ABUSEIPDB_API_KEY:
         logging.error("ABUSEIPDB_API_KEY not set")
         return None
 
-    headers = {
-        "Accept": "application/json",
-        "Key": ABUSEIPDB_API_KEY,
-        "User-Agent": "CTI-TIP/1.0 (contact: security-research)",
-    }
-
     params = {
         "ipAddress": ip,
         "maxAgeInDays": 90,
@@ -31,16 +63,18 @@ def abuseipdb_lookup(ip: str, retries: int = 3) -> Optional[dict]:
 
     for attempt in range(1, retries + 1):
         try:
-            resp = requests.get(
+            resp = http_session().get(
                 ABUSEIPDB_URL,
-                headers=headers,
+                headers=_headers(),
                 params=params,
-                timeout=15,
+                timeout=bounded_timeout(deadline, timeout),
             )
+            record_call("abuseipdb")
+            observe_response("abuseipdb", resp)
 
             # 🚫 Invalid IP → do NOT retry
             if resp.status_code == 422:
-                logging.warning(f"Invalid IP address | IP={ip}")
+                logging.warning("Invalid IP address | IP=%s", ip)
                 return None
 
             resp.raise_for_status()
@@ -48,33 +82,144 @@ def abuseipdb_lookup(ip: str, retries: int = 3) -> Optional[dict]:
             break
 
         except RequestException as e:
-            logging.warning(
-                f"AbuseIPDB attempt {attempt}/{retries} failed | IP={ip} | {e}"
-            )
-            time.sleep(2 * attempt)  # backoff
+            logging.warning("AbuseIPDB attempt %d/%d failed | IP=%s | %s", attempt, retries, ip, e)
+            if attempt < retries:
+                bounded_sleep(deadline, 2 * attempt)  # backoff
     else:
-        logging.error(f"AbuseIPDB lookup failed after retries | IP={ip}")
-        return None
+        logging.error("AbuseIPDB lookup failed after retries | IP=%s", ip)
+        raise ProviderError(f"AbuseIPDB failed after {retries} attempts")
 
     data = raw.get("data")
     if not data:
         return None
 
-    # ---- Normalize lastReportedAt ----
-    last_reported = data.get("lastReportedAt", "")
-    if last_reported:
-        try:
-            last_reported = (
-                datetime.fromisoformat(last_reported.replace("Z", "+00:00"))
-                .strftime("%Y-%m-%d %H:%M:%S")
-            )
-        except Exception:
-            pass  # keep original if parsing fails
-
     # 🔑 Extract ONLY what TIP needs
     return {
-        "abuseipdb_lastReportedAt": last_reported,
+        "abuseipdb_lastReportedAt": _normalize_reported_at(data.get("lastReportedAt", "")),
         "abuseipdb_abuseConfidenceScore": data.get("abuseConfidenceScore", ""),
         "abuseipdb_totalReports": data.get("totalReports", ""),
         "abuseipdb_domain": data.get("domain", ""),
-    }
\ No newline at end of file
+    }
+
+
+def abuseipdb_check_block(
+    network: str,
+    timeout: float = 15,
+    retries: int = 3,
+    deadline: Optional[Deadline] = None,
+) -> Optional[Dict[str, dict]]:
+    """
+    Lookup a whole network (CIDR) with ONE AbuseIPDB check-block call
+    (the "abuseipdb_block" provider: own daily quota, breaker, pacing).
+    Returns {ip: fields} for every reported address in the block,
+    or None if the network is invalid / not configured.
+    Raises ProviderError when every attempt failed,
+    DeadlineExceeded when the budget ran out first.
+    """
+
+    if not ABUSEIPDB_API_KEY or not ABUSEIPDB_BLOCK_URL:
+        logging.error("ABUSEIPDB_API_KEY / ABUSEIPDB_BLOCK_URL not set")
+        return None
+
+    params = {
+        "network": network,
+        "maxAgeInDays": 90,
+    }
+
+    for attempt in range(1, retries + 1):
+        try:
+            resp = http_session().get(
+                ABUSEIPDB_BLOCK_URL,
+                headers=_headers(),
+                params=params,
+                timeout=bounded_timeout(deadline, timeout),
+            )
+            record_call("abuseipdb_block")
+            observe_response("abuseipdb_block", resp)
+
+            # 🚫 Invalid / too large network → do NOT retry
+            if resp.status_code == 422:
+                logging.warning("Invalid network | NETWORK=%s", network)
+                return None
+
+            resp.raise_for_status()
+            raw = resp.json()
+            break
+
+        except RequestException as e:
+            logging.warning(
+                "AbuseIPDB block attempt %d/%d failed | NETWORK=%s | %s", attempt, retries, network, e
+            )
+            if attempt < retries:
+                bounded_sleep(deadline, 2 * attempt)  # backoff
+    else:
+        logging.error("AbuseIPDB block lookup failed after retries | NETWORK=%s", network)
+        raise ProviderError(f"AbuseIPDB check-block failed after {retries} attempts")
+
+    data = raw.get("data") or {}
+
+    reported = {}
+    for entry in data.get("reportedAddress") or []:
+        ip = entry.get("ipAddress")
+        if not ip:
+            continue
+        reported[ip] = {
+            "abuseipdb_lastReportedAt": _normalize_reported_at(entry.get("mostRecentReport", "")),
+            "abuseipdb_abuseConfidenceScore": entry.get("abuseConfidenceScore", ""),
+            "abuseipdb_totalReports": entry.get("numReports", ""),
+            "abuseipdb_domain": "",  # not returned by check-block
+        }
+
+    return reported
+
+
+def abuseipdb_bulk_lookup(
+    ips: Iterable[str],
+    prefix: int = ABUSEIPDB_BLOCK_PREFIX,
+    min_block_ips: int = ABUSEIPDB_BLOCK_MIN_IPS,
+    check_block: Callable[[str], Optional[Dict[str, dict]]] = abuseipdb_check_block,
+) -> Dict[str, dict]:
+    """
+    Group IPs by /prefix and resolve dense blocks with check-block
+    (`check_block`: the abuseipdb_block provider's call in the
+    enrichment run, so quota, breaker and deadline apply).
+    Returns {ip: fields} ONLY for IPs covered by a successful block query.
+    Sparse IPs (and IPs of failed / skipped blocks) are left out so the
+    caller falls back to per-IP abuseipdb_lookup().
+    """
+
+    blocks: Dict[str, list] = {}
+
+    for ip in set(ips):
+        try:
+            network = ipaddress.ip_network(f"{ip}/{prefix}", strict=False)
+        except ValueError:
+            continue  # invalid IP → per-IP lookup reports it
+        blocks.setdefault(str(network), []).append(ip)
+
+    results = {}
+
+    for network, members in blocks.items():
+        if len(members) < min_block_ips:
+            continue
+
+        logging.info("AbuseIPDB block lookup | NETWORK=%s | ips=%d", network, len(members))
+
+        try:
+            reported = check_block(network)
+        except ProviderError as e:
+            logging.warning("AbuseIPDB block lookup dropped | NETWORK=%s | %s", network, e)
+            continue
+        if reported is None:
+            continue
+
+        # ---- Fan block result out to each IOC ----
+        for ip in members:
+            results[ip] = reported.get(ip) or {
+                "abuseipdb_lastReportedAt": "",
+                "abuseipdb_abuseConfidenceScore": 0,
+                "abuseipdb_totalReports": 0,
+                "abuseipdb_domain": "",
+            }
+
+    return results
@@ -7,6 +7,12 @@ from typing import Optional
 from .regex import HASH_SHA256_REGEX, IP_REGEX, URL_REGEX
 
 from .config import ALIENVAULT_OTX_KEY, ALIENVAULT_BASE_API, ALIENVAULT_BASE_UI
+from .tip_alienvault_mirror import mirror_pulse_count
+from .circuit_breaker import ProviderError
+from .quota import record_call
+from .metrics import observe_response
+from .deadline import Deadline, bounded_timeout
+from .http_session import http_session
 
 IOC_TYPE_MAP = {
     "ip": "IPv4",
@@ -29,19 +35,57 @@ def _detect_ioc_type(ioc: str) -> Optional[str]:
     return None
 
 
-def alienvault_lookup(ioc: str) -> Optional[dict]:
+def _ui_link(ioc: str, ioc_type: str) -> str:
+    if ioc_type == "url":
+        value = ioc if ioc.endswith("/") else ioc + "/"
+        return f"{ALIENVAULT_BASE_UI}/url/{urllib.parse.quote(value, safe='')}"
+    return f"{ALIENVAULT_BASE_UI}/{IOC_TYPE_MAP[ioc_type]}/{ioc}"
+
+
+def alienvault_local_lookup(ioc: str) -> Optional[dict]:
     """
-    Lookup IOC in AlienVault OTX.
-    Returns extracted fields or None.
+    Answer from the local mirror of subscribed pulses (no API key, no
+    network). Returns the same fields as alienvault_lookup, or None on
+    a miss / unsynced mirror.
     """
+    ioc_type = _detect_ioc_type(ioc)
+    if not ioc_type:
+        return None
 
-    if not ALIENVAULT_OTX_KEY:
-        logging.error("ALIENVAULT_OTX_KEY not set")
+    local_count = mirror_pulse_count(ioc, ioc_type)
+    if not local_count:
         return None
 
+    logging.info("AlienVault mirror hit | IOC=%s | pulses=%s", ioc, local_count)
+    return {
+        "alienvault_time": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "alienvault_pulse_info_count": local_count,
+        "alienvault_link": _ui_link(ioc, ioc_type),
+    }
+
+
+def alienvault_lookup(
+    ioc: str,
+    timeout: float = 15,
+    retries: int = 1,
+    deadline: Optional[Deadline] = None,
+) -> Optional[dict]:
+    """
+    Lookup IOC in the live AlienVault OTX API (the local pulse mirror,
+    alienvault_local_lookup, is asked first by the provider).
+    Returns the DATASET_COLUMNS fields (alienvault_time,
+    alienvault_pulse_info_count, alienvault_link) or None.
+    Raises ProviderError when OTX is unreachable / 5xx / rate limited,
+    DeadlineExceeded when the IOC budget ran out first.
+    """
+
     ioc_type = _detect_ioc_type(ioc)
     if not ioc_type:
-        logging.info(f"AlienVault skipped | Unsupported IOC={ioc}")
+        logging.info("AlienVault skipped | Unsupported IOC=%s", ioc)
+        return None
+
+    if not ALIENVAULT_OTX_KEY:
+        logging.error("ALIENVAULT_OTX_KEY not set")
         return None
 
     otx_type = IOC_TYPE_MAP[ioc_type]
@@ -53,6 +97,8 @@ def alienvault_lookup(ioc: str) -> Optional[dict]:
             ioc_value += "/"
         ioc_value = urllib.parse.quote(ioc_value, safe="")
 
+    ui_link = _ui_link(ioc, ioc_type)
+
     api_url = f"{ALIENVAULT_BASE_API}/{otx_type}/{ioc_value}/general"
 
     headers = {
@@ -61,37 +107,40 @@ def alienvault_lookup(ioc: str) -> Optional[dict]:
         "User-Agent": "CTI-TIP/1.0",
     }
 
-    logging.info(f"AlienVault lookup | IOC={ioc}")
+    logging.info("AlienVault lookup | IOC=%s", ioc)
+
+    try:
+        resp = http_session().get(api_url, headers=headers, timeout=bounded_timeout(deadline, timeout))
+        record_call("alienvault")
+        observe_response("alienvault", resp)
+    except requests.RequestException as e:
+        logging.error("AlienVault request failed | IOC=%s | %s", ioc, e)
+        raise ProviderError(str(e)) from e
+
+    if resp.status_code == 429 or resp.status_code >= 500:
+        logging.error("AlienVault request failed | IOC=%s | HTTP %s", ioc, resp.status_code)
+        raise ProviderError(f"OTX HTTP {resp.status_code}")
 
     try:
-        resp = requests.get(api_url, headers=headers, timeout=15)
         resp.raise_for_status()
         raw = resp.json()
     except Exception as e:
-        logging.error(f"AlienVault request failed | IOC={ioc} | {e}")
+        logging.error("AlienVault request failed | IOC=%s | %s", ioc, e)
         return None
 
     pulse_info = raw.get("pulse_info", {})
     pulse_count = pulse_info.get("count", 0)
 
     if pulse_count == 0:
-        logging.info(f"AlienVault not found | IOC={ioc}")
+        logging.info("AlienVault not found | IOC=%s", ioc)
         return None
 
-    # ---- Build UI link ----
-    if ioc_type == "url":
-        ui_link = f"{ALIENVAULT_BASE_UI}/url/{ioc_value}"
-    else:
-        ui_link = f"{ALIENVAULT_BASE_UI}/{otx_type}/{ioc}"
-
     checked_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
-    logging.info(
-        f"AlienVault hit | IOC={ioc} | pulses={pulse_count}"
-    )
+    logging.info("AlienVault hit | IOC=%s | pulses=%s", ioc, pulse_count)
 
     return {
-        "alienvault_checked_at": checked_at,
-        "alienvault_pulse_count": pulse_count,
+        "alienvault_time": checked_at,
+        "alienvault_pulse_info_count": pulse_count,
         "alienvault_link": ui_link,
     }
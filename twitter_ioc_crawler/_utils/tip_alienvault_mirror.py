@@ -0,0 +1,165 @@
+import os
+import logging
+import requests
+import threading
+from typing import Optional
+
+from .config import ALIENVAULT_OTX_KEY, ALIENVAULT_PULSES_API, OTX_MIRROR_DB
+from .sqlite_store import open_db
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pulses (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    modified TEXT
+);
+
+CREATE TABLE IF NOT EXISTS pulse_indicators (
+    indicator TEXT NOT NULL,
+    type TEXT,
+    pulse_id TEXT NOT NULL,
+    PRIMARY KEY (indicator, pulse_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_pulse_indicators_pulse
+    ON pulse_indicators (pulse_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = open_db(OTX_MIRROR_DB, SCHEMA)
+    return _conn
+
+
+def _candidates(ioc: str, ioc_type: str) -> list:
+    """
+    OTX stores URLs with or without trailing slash and hashes lower-case.
+    """
+    if ioc_type == "url":
+        base = ioc.rstrip("/")
+        return [ioc, base, base + "/"]
+    if ioc_type == "hash":
+        return [ioc, ioc.lower()]
+    return [ioc]
+
+
+def mirror_pulse_count(ioc: str, ioc_type: str) -> Optional[int]:
+    """
+    Count subscribed pulses mentioning IOC in the local mirror.
+    Returns None when the mirror has never been synced.
+    """
+    if not os.path.isfile(OTX_MIRROR_DB):
+        return None
+
+    values = list(dict.fromkeys(_candidates(ioc, ioc_type)))
+    marks = ",".join("?" for _ in values)
+
+    with _lock:
+        row = _db().execute(
+            f"SELECT COUNT(DISTINCT pulse_id) FROM pulse_indicators WHERE indicator IN ({marks})",
+            values,
+        ).fetchone()
+
+    return row[0] if row else 0
+
+
+def _save_pulse(conn, pulse: dict):
+    pulse_id = pulse.get("id")
+    if not pulse_id:
+        return
+
+    conn.execute(
+        "INSERT OR REPLACE INTO pulses (id, name, modified) VALUES (?, ?, ?)",
+        (pulse_id, pulse.get("name", ""), pulse.get("modified", "")),
+    )
+
+    # ---- Replace indicator set (pulses are edited in place on OTX) ----
+    conn.execute("DELETE FROM pulse_indicators WHERE pulse_id = ?", (pulse_id,))
+    conn.executemany(
+        "INSERT OR IGNORE INTO pulse_indicators (indicator, type, pulse_id) VALUES (?, ?, ?)",
+        [
+            (ind["indicator"], ind.get("type", ""), pulse_id)
+            for ind in pulse.get("indicators") or []
+            if ind.get("indicator")
+        ],
+    )
+
+
+def sync_otx_pulses(page_size: int = 50) -> int:
+    """
+    Incrementally mirror subscribed OTX pulses into the local index.
+    Uses modified_since paging from the last successful sync.
+    Returns the number of pulses written.
+    """
+
+    if not ALIENVAULT_OTX_KEY or not ALIENVAULT_PULSES_API:
+        logging.error("ALIENVAULT_OTX_KEY / ALIENVAULT_PULSES_API not set")
+        return 0
+
+    conn = _db()
+
+    row = conn.execute(
+        "SELECT value FROM sync_state WHERE key = 'modified_since'"
+    ).fetchone()
+    modified_since = row[0] if row else ""
+
+    headers = {
+        "X-OTX-API-KEY": ALIENVAULT_OTX_KEY,
+        "Accept": "application/json",
+        "User-Agent": "CTI-TIP/1.0",
+    }
+
+    params = {"limit": page_size}
+    if modified_since:
+        params["modified_since"] = modified_since
+
+    logging.info(f"[+] OTX mirror sync | modified_since={modified_since or 'FULL'}")
+
+    url = ALIENVAULT_PULSES_API
+    newest = modified_since
+    synced = 0
+
+    while url:
+        try:
+            resp = requests.get(url, headers=headers, params=params, timeout=60)
+            resp.raise_for_status()
+            raw = resp.json()
+        except Exception as e:
+            # ---- Pages are not ordered by modified → keep old checkpoint ----
+            logging.error(f"OTX mirror sync failed | {e}")
+            return synced
+
+        pulses = raw.get("results") or []
+
+        with _lock, conn:
+            for pulse in pulses:
+                _save_pulse(conn, pulse)
+                newest = max(newest, pulse.get("modified", "") or "")
+
+        synced += len(pulses)
+        logging.info(f"OTX mirror page synced | pulses={len(pulses)} | total={synced}")
+
+        # ---- "next" already carries the query string ----
+        url = raw.get("next")
+        params = None
+
+    # ---- Advance checkpoint only after a complete walk ----
+    if newest:
+        with _lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES ('modified_since', ?)",
+                (newest,),
+            )
+
+    logging.info(f"[✓] OTX mirror sync finished | pulses={synced}")
+    return synced
@@ -1,6 +1,8 @@
 import os
 import logging
+import threading
 from .config import IOC_INDEX_FILE, TIP_RESULTS_FILE
+from .metrics import SAVE_SECONDS
 
 DATASET_COLUMNS = [
     "twitter_link",
@@ -52,6 +54,9 @@ TIP_FIELD_MAPPING = {
     "malwarebazaar_vendor_intel_count": "malwarebazaar_vendor_intel_count",
 }
 
+# ---- save_tip_result rewrites the whole file → one writer at a time ----
+_save_lock = threading.Lock()
+
 def merge_tip_fields(row: dict, result: dict):
     """
     Map provider-specific fields into unified TIP dataset.
@@ -98,11 +103,32 @@ def load_existing_tip_results():
     return seen
 
 
+def load_tip_result(ioc: str):
+    """Saved row of one IOC (DATASET_COLUMNS → value), or None."""
+    if not os.path.isfile(TIP_RESULTS_FILE):
+        return None
+
+    with open(TIP_RESULTS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) > 1 and parts[1] == ioc:
+                return dict(zip(DATASET_COLUMNS, parts))
+    return None
+
+
+@SAVE_SECONDS.time("tip_results")
 def save_tip_result(result: dict):
     """
     Save unified TIP result (VT / AbuseIPDB / AlienVault / MalwareBazaar)
+    Thread-safe (enrichment workers may save concurrently).
     """
+    with _save_lock:
+        _save_tip_result(result)
+
 
+def _save_tip_result(result: dict):
     rows = {}
 
     # ---- Load existing rows ----
@@ -141,7 +167,15 @@ def save_tip_result(result: dict):
         new_vt_date = row.get("vt_last_analysis_date", "")
 
         if new_vt_date and old_vt_date and new_vt_date <= old_vt_date:
-            action = "duplicate"
+            # ---- Same analysis: only fill fields still empty (completed partial result) ----
+            merged = dict(rows[ioc])
+            for k, v in row.items():
+                if v and not merged.get(k):
+                    merged[k] = v
+            if merged != rows[ioc]:
+                row, action = merged, "completed"
+            else:
+                action = "duplicate"
         else:
             # merge with existing row
             for k, v in rows[ioc].items():
@@ -158,5 +192,5 @@ def save_tip_result(result: dict):
             f.write(" | ".join(r.get(c, "") for c in DATASET_COLUMNS) + "\n")
 
     logging.info(
-        f"TIP result {'saved' if action=='new' else 'skipped'} | IOC={ioc} | {action.upper()}"
+        "TIP result %s | IOC=%s | %s", "skipped" if action == "duplicate" else "saved", ioc, action.upper()
     )
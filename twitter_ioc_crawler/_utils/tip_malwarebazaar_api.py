@@ -1,16 +1,28 @@
 import os
-import time
 import logging
 import requests
 from datetime import datetime
 from typing import Optional, Dict
 from .config import MALWAREBAZAAR_API_KEY, MALWAREBAZAAR_URL
+from .circuit_breaker import ProviderError
+from .quota import record_call
+from .metrics import observe_response
+from .deadline import Deadline, bounded_sleep, bounded_timeout
+from .http_session import http_session
 
-def malwarebazaar_lookup(file_hash: str, retries: int = 3) -> Optional[Dict]:
+def malwarebazaar_lookup(
+    file_hash: str,
+    timeout: float = 15,
+    retries: int = 3,
+    deadline: Optional[Deadline] = None,
+) -> Optional[Dict]:
     """
-    Lookup file hash reputation from MalwareBazaar.
-    Supports MD5 / SHA1 / SHA256.
+    Lookup file hash reputation from the MalwareBazaar API.
+    Supports MD5 / SHA1 / SHA256 (known SHA256 hashes are answered from
+    the local dump index first by the provider, no API key needed).
     Returns normalized TIP fields or None.
+    Raises ProviderError when every attempt failed,
+    DeadlineExceeded when the IOC budget ran out first.
     """
 
     if not MALWAREBAZAAR_API_KEY:
@@ -30,23 +42,25 @@ def malwarebazaar_lookup(file_hash: str, retries: int = 3) -> Optional[Dict]:
 
     for attempt in range(1, retries + 1):
         try:
-            resp = requests.post(
+            resp = http_session().post(
                 MALWAREBAZAAR_URL,
                 headers=headers,
                 data=payload,
-                timeout=15,
+                timeout=bounded_timeout(deadline, timeout),
             )
+            record_call("malwarebazaar")
+            observe_response("malwarebazaar", resp)
             resp.raise_for_status()
             raw = resp.json()
 
             # 🚫 Hash not found → HARD STOP (no retry)
             if raw.get("query_status") == "hash_not_found":
-                logging.info(f"MalwareBazaar hash not found | HASH={file_hash}")
+                logging.info("MalwareBazaar hash not found | HASH=%s", file_hash)
                 return None
 
             data = raw.get("data")
             if not data or not isinstance(data, list):
-                logging.warning(f"Malformed MalwareBazaar response | HASH={file_hash}")
+                logging.warning("Malformed MalwareBazaar response | HASH=%s", file_hash)
                 return None
 
             entry = data[0]
@@ -54,13 +68,14 @@ def malwarebazaar_lookup(file_hash: str, retries: int = 3) -> Optional[Dict]:
 
         except requests.RequestException as e:
             logging.warning(
-                f"MalwareBazaar attempt {attempt}/{retries} failed | HASH={file_hash} | {e}"
+                "MalwareBazaar attempt %d/%d failed | HASH=%s | %s", attempt, retries, file_hash, e
             )
-            time.sleep(2 * attempt)
+            if attempt < retries:
+                bounded_sleep(deadline, 2 * attempt)
 
     else:
-        logging.error(f"MalwareBazaar lookup failed after retries | HASH={file_hash}")
-        return None
+        logging.error("MalwareBazaar lookup failed after retries | HASH=%s", file_hash)
+        raise ProviderError(f"MalwareBazaar failed after {retries} attempts")
 
     # ---- Normalize timestamps ----
     def normalize_ts(ts: str) -> str:
@@ -0,0 +1,217 @@
+import io
+import os
+import csv
+import logging
+import zipfile
+import tempfile
+import threading
+import requests
+from typing import Optional, Dict, Iterator
+
+from .config import MALWAREBAZAAR_DUMP_DB, MALWAREBAZAAR_RECENT_URL
+from .regex import HASH_SHA256_REGEX
+from .sqlite_store import open_db
+
+# ---- 32-byte binary SHA256 key, no rowid → compact B-tree ----
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    sha256 BLOB PRIMARY KEY,
+    first_seen TEXT,
+    last_seen TEXT,
+    signature TEXT,
+    vendor_count INTEGER
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# ---- abuse.ch CSV export layout (used if the header comment is missing) ----
+DEFAULT_COLUMNS = [
+    "first_seen_utc", "sha256_hash", "md5_hash", "sha1_hash", "reporter",
+    "file_name", "file_type_guess", "mime_type", "signature", "clamav",
+    "vtpercent", "imphash", "ssdeep", "tlsh",
+]
+
+BATCH_SIZE = 5000
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = open_db(MALWAREBAZAAR_DUMP_DB, SCHEMA)
+    return _conn
+
+
+def _open_dump(path) -> io.TextIOBase:
+    """
+    Open a CSV dump, or the first member of a ZIP dump, as streaming text.
+    """
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        member = archive.namelist()[0]
+        return io.TextIOWrapper(archive.open(member), encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def _iter_rows(f) -> Iterator[dict]:
+    columns = DEFAULT_COLUMNS
+
+    for line in f:
+        if line.startswith("#"):
+            # ---- Header lives in a comment line ----
+            if "sha256_hash" in line:
+                header = next(csv.reader([line.lstrip("# ")], skipinitialspace=True))
+                columns = [c.strip() for c in header]
+            continue
+
+        if not line.strip():
+            continue
+
+        values = next(csv.reader([line], skipinitialspace=True), None)
+        if values:
+            yield dict(zip(columns, (v.strip() for v in values)))
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_malwarebazaar_dump(path, incremental: bool = False) -> int:
+    """
+    Stream an abuse.ch MalwareBazaar CSV/ZIP dump into the local index.
+    incremental=True skips rows older than the newest first_seen
+    already loaded (for the "recent" feed); rows from that same second
+    are kept, the upsert makes re-loading them harmless.
+    Returns the number of rows written.
+    """
+
+    conn = _db()
+
+    row = conn.execute("SELECT value FROM meta WHERE key = 'newest_first_seen'").fetchone()
+    checkpoint = row[0] if (row and incremental) else ""
+    newest = row[0] if row else ""
+
+    written = 0
+    batch = []
+
+    def flush():
+        with _lock, conn:
+            conn.executemany(
+                """
+                INSERT INTO samples (sha256, first_seen, last_seen, signature, vendor_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    last_seen = MAX(last_seen, excluded.last_seen),
+                    signature = COALESCE(NULLIF(excluded.signature, ''), signature),
+                    vendor_count = COALESCE(excluded.vendor_count, vendor_count)
+                """,
+                batch,
+            )
+        batch.clear()
+
+    with _open_dump(path) as f:
+        for r in _iter_rows(f):
+            sha256 = r.get("sha256_hash", "")
+            if not HASH_SHA256_REGEX.fullmatch(sha256):
+                continue
+
+            first_seen = r.get("first_seen_utc", "")
+            if checkpoint and first_seen and first_seen < checkpoint:
+                continue
+
+            signature = r.get("signature", "")
+            if signature.lower() == "n/a":
+                signature = ""
+
+            batch.append((
+                bytes.fromhex(sha256),
+                first_seen,
+                r.get("last_seen_utc") or first_seen,
+                signature,
+                _to_int(r.get("vendor_intel_count")),
+            ))
+            newest = max(newest, first_seen)
+            written += 1
+
+            if len(batch) >= BATCH_SIZE:
+                flush()
+
+    if batch:
+        flush()
+
+    with _lock, conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('newest_first_seen', ?)",
+            (newest,),
+        )
+
+    logging.info(f"[✓] MalwareBazaar dump loaded | file={path} | rows={written}")
+    return written
+
+
+def refresh_malwarebazaar_recent() -> int:
+    """
+    Download the abuse.ch "recent" CSV feed and merge it incrementally.
+    """
+
+    if not MALWAREBAZAAR_RECENT_URL:
+        logging.error("MALWAREBAZAAR_RECENT_URL not set")
+        return 0
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".csv")
+
+    try:
+        with os.fdopen(fd, "wb") as out:
+            resp = requests.get(MALWAREBAZAAR_RECENT_URL, stream=True, timeout=60)
+            resp.raise_for_status()
+            for chunk in resp.iter_content(chunk_size=1 << 16):
+                out.write(chunk)
+
+        return load_malwarebazaar_dump(tmp_path, incremental=True)
+
+    except Exception as e:
+        logging.error(f"MalwareBazaar recent feed refresh failed | {e}")
+        return 0
+
+    finally:
+        os.remove(tmp_path)
+
+
+def malwarebazaar_local_lookup(file_hash: str) -> Optional[Dict]:
+    """
+    Resolve a SHA256 from the local dump index.
+    Returns normalized TIP fields or None on a miss.
+    """
+    if not os.path.isfile(MALWAREBAZAAR_DUMP_DB):
+        return None
+
+    if not HASH_SHA256_REGEX.fullmatch(file_hash):
+        return None
+
+    with _lock:
+        row = _db().execute(
+            "SELECT first_seen, last_seen, signature, vendor_count FROM samples WHERE sha256 = ?",
+            (bytes.fromhex(file_hash),),
+        ).fetchone()
+
+    if not row:
+        return None
+
+    first_seen, last_seen, signature, vendor_count = row
+
+    return {
+        "malwarebazaar_first_seen": first_seen or "",
+        "malwarebazaar_last_seen": last_seen or "",
+        "malwarebazaar_signature": signature or "",
+        "malwarebazaar_vendor_intel_count": "" if vendor_count is None else vendor_count,
+    }
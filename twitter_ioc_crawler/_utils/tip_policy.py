@@ -0,0 +1,58 @@
+import logging
+import threading
+from collections import Counter
+from typing import List, Optional
+
+from .config import ENRICHMENT_POLICY
+from .tip_providers import Provider, providers_for
+
+
+def _as_number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class EnrichmentPolicy:
+    """
+    Declarative fan-out after VirusTotal.
+
+    steps: [{"provider": name, "escalate_if": {field: threshold} | None}]
+    Providers are queried in step order; a step with thresholds only runs
+    if ANY field of the merged result so far reaches its threshold.
+    Skipped calls are counted per provider (calls avoided).
+    """
+
+    def __init__(self, steps: List[dict] = ENRICHMENT_POLICY):
+        self.steps = {step["provider"]: step.get("escalate_if") for step in steps}
+        self.order = [step["provider"] for step in steps]
+        self.avoided = Counter()
+        self._lock = threading.Lock()
+
+    def providers(self, ioc_type: str, exclude=("virustotal",)) -> List[Provider]:
+        """Providers supporting the IOC type, in policy order (unlisted last)."""
+        rank = {name: i for i, name in enumerate(self.order)}
+        candidates = providers_for(ioc_type, exclude=exclude)
+        return sorted(candidates, key=lambda p: rank.get(p.name, len(rank)))
+
+    def should_query(self, provider: Provider, result: dict) -> bool:
+        conditions: Optional[dict] = self.steps.get(provider.name)
+        if not conditions:
+            return True
+
+        if any(_as_number(result.get(field)) >= threshold for field, threshold in conditions.items()):
+            return True
+
+        with self._lock:
+            self.avoided[provider.name] += 1
+        return False
+
+    def summary(self) -> str:
+        with self._lock:
+            if not self.avoided:
+                return "none"
+            return ", ".join(f"{name}={n}" for name, n in sorted(self.avoided.items()))
+
+    def log_summary(self):
+        logging.info(f"[+] Fan-out policy | calls avoided: {self.summary()}")
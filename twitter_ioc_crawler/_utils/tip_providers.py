@@ -0,0 +1,204 @@
+import time
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from .config import CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS
+from .circuit_breaker import CircuitBreaker, ProviderError
+from .deadline import Deadline, DeadlineExceeded, MIN_REQUEST_SECONDS
+from .quota import quota_allows
+from .metrics import PROVIDER_CALLS, PROVIDER_CALL_SECONDS
+from .singleflight import SingleFlight
+from .text_utils import canonical_ioc
+from .tracing import Span
+from .tip_vt_api import vt_lookup
+from .tip_vt_keys import VT_KEY_POOL
+from .tip_alienvault_api import alienvault_lookup, alienvault_local_lookup
+from .tip_malwarebazaar_api import malwarebazaar_lookup
+from .tip_malwarebazaar_dump import malwarebazaar_local_lookup
+from .tip_abuseipdb_api import abuseipdb_lookup, abuseipdb_check_block
+
+
+# ---- One in-flight call per (provider, canonical IOC) ----
+_INFLIGHT = SingleFlight()
+
+
+class Provider:
+    """
+    One TIP provider as seen by the enrichment loop.
+
+    ioc_types:   IOC types the provider is queried for
+    cost:        quota units spent per call
+    daily_quota: provider daily limit (None = unlimited); checked against
+                 the quota ledger before every call
+    rate_per_min: max calls per minute (None = not paced here)
+    timeout:     per-request timeout (seconds)
+    retries:     attempts per call while the circuit is closed
+    local_lookup: local index (mirror / dump) asked first; its hits skip
+                 quota, circuit breaker and pacing, which only guard
+                 the remote `lookup` on a miss
+    """
+
+    def __init__(
+        self,
+        name: str,
+        label: str,
+        lookup: Callable,
+        ioc_types: Tuple[str, ...],
+        cost: int = 1,
+        daily_quota: Optional[int] = None,
+        rate_per_min: Optional[float] = None,
+        timeout: float = 15,
+        retries: int = 1,
+        local_lookup: Optional[Callable] = None,
+    ):
+        self.name = name
+        self.label = label
+        self.lookup = lookup
+        self.ioc_types = ioc_types
+        self.cost = cost
+        self.daily_quota = daily_quota
+        self.rate_per_min = rate_per_min
+        self.timeout = timeout
+        self.retries = retries
+        self.local_lookup = local_lookup
+        self.breaker = CircuitBreaker(name, CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS)
+
+        self._next_call = 0.0
+        self._pace_lock = threading.Lock()
+
+    def supports(self, ioc_type: str) -> bool:
+        return ioc_type in self.ioc_types
+
+    @property
+    def daily_limit(self) -> Optional[int]:
+        # ---- VT: per-key quota × usable keys (pool enforces per key) ----
+        if self.name == "virustotal":
+            return VT_KEY_POOL.daily_limit
+        return self.daily_quota
+
+    def _pace(self, deadline: Optional[Deadline] = None):
+        if not self.rate_per_min:
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_call - now
+            # ---- Do not take a slot we could not use before the deadline ----
+            if deadline is not None and deadline.remaining() - max(0.0, wait) < MIN_REQUEST_SECONDS:
+                raise DeadlineExceeded(f"{self.label} pacing wait exceeds the deadline")
+            self._next_call = max(now, self._next_call) + 60 / self.rate_per_min
+        if wait > 0:
+            time.sleep(wait)
+
+    def call(self, ioc: str, deadline: Optional[Deadline] = None) -> Optional[dict]:
+        """
+        Query the provider through its circuit breaker.
+        Concurrent calls for the same canonical IOC share one request
+        (bounded by the deadline of the caller that started it).
+        Returns the lookup result ({} or None when the provider has no
+        data, see the lookup), or None (provider down / skipped).
+        Raises DeadlineExceeded when the IOC budget ran out.
+        """
+        with Span(f"provider.{self.name}", ioc, provider=self.name) as span:
+            result = _INFLIGHT.do((self.name, canonical_ioc(ioc)), lambda: self._call(ioc, deadline))
+            span.set("data", bool(result))
+
+        # ---- Callers mutate results → each gets its own copy ----
+        return dict(result) if result else result
+
+    def _call(self, ioc: str, deadline: Optional[Deadline] = None) -> Optional[dict]:
+        # ---- Local index: bounded by disk, not by the remote API's pace or circuit ----
+        if self.local_lookup is not None:
+            local = self.local_lookup(ioc)
+            if local:
+                PROVIDER_CALLS.inc(self.name, "local")
+                return local
+
+        # ---- Quota first: allow() may take the half-open probe slot, which
+        # only record_success / record_failure give back ----
+        if self.daily_quota and not quota_allows(self.name, self.daily_quota, high_priority=True):
+            logging.warning("%s skipped (daily quota used up) | IOC=%s", self.label, ioc)
+            PROVIDER_CALLS.inc(self.name, "skipped")
+            return None
+
+        if not self.breaker.allow():
+            logging.info("%s skipped (circuit open) | IOC=%s", self.label, ioc)
+            PROVIDER_CALLS.inc(self.name, "skipped")
+            return None
+
+        # ---- A half-open probe gets ONE attempt, no backoff ----
+        retries = 1 if self.breaker.probing else self.retries
+
+        try:
+            with PROVIDER_CALL_SECONDS.time(self.name):
+                self._pace(deadline)
+                result = self.lookup(ioc, timeout=self.timeout, retries=retries, deadline=deadline)
+
+        except ProviderError as e:
+            # ---- Our budget ran out (or cut the timeout short), not the provider ----
+            if isinstance(e, DeadlineExceeded) or (deadline is not None and deadline.expired()):
+                if self.breaker.probing:
+                    self.breaker.record_failure()  # release the probe slot
+                logging.warning("%s dropped (IOC deadline) | IOC=%s | %s", self.label, ioc, e)
+                PROVIDER_CALLS.inc(self.name, "deadline")
+                raise DeadlineExceeded(str(e)) from e
+
+            self.breaker.record_failure()
+            logging.warning("%s unavailable | IOC=%s | %s", self.label, ioc, e)
+            PROVIDER_CALLS.inc(self.name, "error")
+            return None
+
+        except Exception:
+            # ---- Unexpected error (e.g. malformed response): still frees the probe slot ----
+            self.breaker.record_failure()
+            PROVIDER_CALLS.inc(self.name, "error")
+            raise
+
+        self.breaker.record_success()
+        PROVIDER_CALLS.inc(self.name, "ok" if result else "empty")
+        return result
+
+
+# ---- Registry: order = query order ----
+PROVIDERS: List[Provider] = [
+    Provider(
+        "virustotal", "VT", vt_lookup,
+        ioc_types=("hash", "ip", "url"),
+        # quota + pacing handled per key by VT_KEY_POOL
+        cost=1, daily_quota=None, rate_per_min=None, timeout=20, retries=1,
+    ),
+    Provider(
+        "alienvault", "AlienVault", alienvault_lookup,
+        ioc_types=("hash", "ip", "url"),
+        cost=1, daily_quota=None, rate_per_min=150, timeout=15, retries=1,
+        local_lookup=alienvault_local_lookup,
+    ),
+    Provider(
+        "malwarebazaar", "MalwareBazaar", malwarebazaar_lookup,
+        ioc_types=("hash",),
+        cost=1, daily_quota=None, rate_per_min=60, timeout=15, retries=3,
+        local_lookup=malwarebazaar_local_lookup,
+    ),
+    Provider(
+        "abuseipdb", "AbuseIPDB", abuseipdb_lookup,
+        ioc_types=("ip",),
+        cost=1, daily_quota=1000, rate_per_min=60, timeout=15, retries=3,
+    ),
+    # ---- check-block (one CIDR per call, own daily limit); no IOC type:
+    # only called by abuseipdb_bulk_lookup, never in the per-IOC fan-out ----
+    Provider(
+        "abuseipdb_block", "AbuseIPDB check-block", abuseipdb_check_block,
+        ioc_types=(),
+        cost=1, daily_quota=100, rate_per_min=60, timeout=15, retries=3,
+    ),
+]
+
+PROVIDERS_BY_NAME = {p.name: p for p in PROVIDERS}
+
+
+def get_provider(name: str) -> Provider:
+    return PROVIDERS_BY_NAME[name]
+
+
+def providers_for(ioc_type: str, exclude: Tuple[str, ...] = ()) -> List[Provider]:
+    return [p for p in PROVIDERS if p.supports(ioc_type) and p.name not in exclude]
@@ -0,0 +1,166 @@
+import math
+import time
+import heapq
+import logging
+import itertools
+from typing import Callable, Iterator, Optional, Tuple
+
+from .config import (
+    SCHEDULER_RECENCY_HALF_LIFE_HOURS,
+    SCHEDULER_WEIGHTS,
+    SCHEDULER_TYPE_SCORES,
+    SCHEDULER_ACCOUNT_SCORES,
+    QUOTA_FRESH_HOURS,
+)
+from .time_utils import tweet_link_to_timestamp
+
+
+def tweet_account(tweet_link: str) -> str:
+    """https://x.com/<account>/status/<id> → account (lower-case)"""
+    parts = tweet_link.split("/") if tweet_link else []
+    if "status" in parts:
+        idx = parts.index("status")
+        if idx > 0:
+            return parts[idx - 1].lower()
+    return ""
+
+
+class EnrichmentScheduler:
+    """
+    Priority queue of IOCs waiting for enrichment.
+
+    Score = weighted sum of recency (tweet time), IOC type,
+    source account and number of tweets mentioning the IOC.
+    Adding an IOC again (new tweet) re-scores it in place.
+    """
+
+    def __init__(
+        self,
+        weights: dict = SCHEDULER_WEIGHTS,
+        type_scores: dict = SCHEDULER_TYPE_SCORES,
+        account_scores: dict = SCHEDULER_ACCOUNT_SCORES,
+        half_life_hours: float = SCHEDULER_RECENCY_HALF_LIFE_HOURS,
+    ):
+        self.weights = weights
+        self.type_scores = type_scores
+        self.account_scores = account_scores
+        self.half_life_hours = half_life_hours
+
+        self._heap = []
+        self._items = {}
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, ioc):
+        return ioc in self._items
+
+    def score(self, item: dict, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+
+        recency = 0.0
+        if item["tweet_ts"]:
+            age_hours = max(0.0, now - item["tweet_ts"]) / 3600
+            recency = 0.5 ** (age_hours / self.half_life_hours)
+
+        account = max(
+            (self.account_scores.get(tweet_account(link), 0.0) for link in item["links"]),
+            default=0.0,
+        )
+
+        return (
+            self.weights.get("recency", 0) * recency
+            + self.weights.get("type", 0) * self.type_scores.get(item["ioc_type"], 0.0)
+            + self.weights.get("account", 0) * account
+            + self.weights.get("mentions", 0) * math.log2(1 + len(item["links"]))
+        )
+
+    def add(self, ioc: str, ioc_type: str, tweet_link: str):
+        item = self._items.get(ioc)
+
+        if item is None:
+            item = {"ioc_type": ioc_type, "links": set(), "tweet_link": "", "tweet_ts": None}
+            self._items[ioc] = item
+
+        if tweet_link:
+            item["links"].add(tweet_link)
+
+            # ---- Keep the NEWEST tweet as reference link ----
+            ts = tweet_link_to_timestamp(tweet_link)
+            if not item["tweet_link"] or (ts and ts > (item["tweet_ts"] or 0)):
+                item["tweet_link"] = tweet_link
+                item["tweet_ts"] = ts
+
+        # ---- Lazy re-score: stale heap entries are skipped on pop ----
+        item["score"] = self.score(item)
+        heapq.heappush(self._heap, (-item["score"], next(self._seq), ioc))
+
+    def pop(self) -> Optional[Tuple[str, str, str]]:
+        while self._heap:
+            neg_score, _, ioc = heapq.heappop(self._heap)
+            item = self._items.get(ioc)
+            if item is None or -neg_score != item["score"]:
+                continue
+            del self._items[ioc]
+            return ioc, item["ioc_type"], item["tweet_link"]
+        return None
+
+    def drain(
+        self,
+        deadline: Optional[float] = None,
+        quota: Optional[Callable[[bool], bool]] = None,
+        fresh_hours: float = QUOTA_FRESH_HOURS,
+    ) -> Iterator[Tuple[str, str, str]]:
+        """
+        Yield (ioc, ioc_type, tweet_link) highest score first.
+
+        deadline:    time.time() after which no new IOC is started.
+                     Stops early if the average cost per IOC would overrun it.
+        quota:       callable(high_priority) → True if the provider budget
+                     allows one more call. IOCs tweeted within `fresh_hours`
+                     are high priority; once normal priority is refused only
+                     fresh IOCs are yielded, the rest stay queued.
+        """
+        started = time.time()
+        done = 0
+        deferred = []
+        normal_allowed = True
+
+        try:
+            while self._items:
+                now = time.time()
+
+                if deadline is not None:
+                    avg_cost = (now - started) / done if done else 0.0
+                    if now + avg_cost > deadline:
+                        logging.info(f"Scheduler deadline reached | pending={len(self) + len(deferred)}")
+                        return
+
+                if quota is not None and not quota(True):
+                    logging.warning(f"Scheduler quota exhausted | pending={len(self) + len(deferred)}")
+                    return
+
+                entry = self.pop()
+                if entry is None:
+                    return
+
+                if quota is not None:
+                    ts = tweet_link_to_timestamp(entry[2])
+                    fresh = bool(ts) and now - ts <= fresh_hours * 3600
+
+                    if not fresh and normal_allowed and not quota(False):
+                        normal_allowed = False
+                        logging.info("Scheduler normal-priority budget spent | fresh IOCs only")
+
+                    if not fresh and not normal_allowed:
+                        deferred.append(entry)
+                        continue
+
+                yield entry
+                done += 1
+
+        finally:
+            # ---- Deferred IOCs stay pending for the next run ----
+            for ioc, ioc_type, tweet_link in deferred:
+                self.add(ioc, ioc_type, tweet_link)
@@ -0,0 +1,248 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from .config import TIP_STATE_DB, TIP_RESULTS_FILE
+from .sqlite_store import open_db
+from .tip_file_io import DATASET_COLUMNS
+from .time_utils import UTC_PLUS_7
+from .metrics import SAVE_SECONDS
+
+# ---- fresh_at = our last check (UTC+7); rows seeded from the results file: VT last analysis ----
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ioc_state (
+    ioc TEXT PRIMARY KEY,
+    ioc_type TEXT,
+    twitter_link TEXT,
+    vt_last_analysis_date TEXT,
+    vt_malicious_score INTEGER,
+    checked_at TEXT,
+    fresh_at TEXT,
+    pending_providers TEXT NOT NULL DEFAULT ''
+);
+
+CREATE INDEX IF NOT EXISTS idx_ioc_state_fresh
+    ON ioc_state (ioc_type, fresh_at);
+
+CREATE TABLE IF NOT EXISTS score_history (
+    ioc TEXT NOT NULL,
+    checked_at TEXT NOT NULL,
+    vt_last_analysis_date TEXT,
+    vt_malicious_score INTEGER,
+    delta INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_score_history_ioc
+    ON score_history (ioc, checked_at);
+"""
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _now() -> str:
+    return datetime.now(UTC_PLUS_7).strftime(TIME_FORMAT)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = open_db(TIP_STATE_DB, SCHEMA)
+        _migrate(_conn)
+        _seed_from_results(_conn)
+    return _conn
+
+
+def _migrate(conn):
+    """Add columns introduced after a state DB was created."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(ioc_state)")}
+    with conn:
+        if "pending_providers" not in columns:
+            conn.execute("ALTER TABLE ioc_state ADD COLUMN pending_providers TEXT NOT NULL DEFAULT ''")
+        # ---- Partial index: only incomplete results are in it ----
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ioc_state_pending "
+            "ON ioc_state (checked_at) WHERE pending_providers != ''"
+        )
+
+
+def _seed_from_results(conn):
+    """
+    One-time migration: index rows already present in tip_results.txt.
+    """
+    if conn.execute("SELECT 1 FROM ioc_state LIMIT 1").fetchone():
+        return
+    if not os.path.isfile(TIP_RESULTS_FILE):
+        return
+
+    rows = []
+    with open(TIP_RESULTS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            row = dict(zip(DATASET_COLUMNS, (p.strip() for p in line.split("|"))))
+            vt_date = row.get("vt_last_analysis_date", "")
+            rows.append((
+                row.get("ioc", ""),
+                row.get("ioc_type", ""),
+                row.get("twitter_link", ""),
+                vt_date,
+                _to_int(row.get("vt_malicious_score")),
+                vt_date,
+                vt_date,
+            ))
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO ioc_state (
+                ioc, ioc_type, twitter_link, vt_last_analysis_date,
+                vt_malicious_score, checked_at, fresh_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [r for r in rows if r[0]],
+        )
+
+    logging.info(f"[+] TIP state index seeded from results file | rows={len(rows)}")
+
+
+@SAVE_SECONDS.time("tip_state")
+def record_enrichment(result: dict):
+    """
+    Upsert the staleness index for one enriched IOC
+    and append its VT score (and delta) to the history.
+    result["pending_providers"] flags a partial result.
+    """
+    ioc = result.get("ioc")
+    if not ioc:
+        return
+
+    checked_at = _now()
+    vt_date = result.get("vt_last_analysis_date", "") or ""
+    score = _to_int(result.get("vt_malicious_score"))
+    fresh_at = checked_at
+
+    with _lock:
+        conn = _db()
+        prev = conn.execute(
+            "SELECT vt_malicious_score FROM ioc_state WHERE ioc = ?", (ioc,)
+        ).fetchone()
+
+        delta = None
+        if prev and prev[0] is not None and score is not None:
+            delta = score - prev[0]
+
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO ioc_state (
+                    ioc, ioc_type, twitter_link, vt_last_analysis_date,
+                    vt_malicious_score, checked_at, fresh_at, pending_providers
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(ioc) DO UPDATE SET
+                    ioc_type = excluded.ioc_type,
+                    twitter_link = COALESCE(NULLIF(excluded.twitter_link, ''), twitter_link),
+                    vt_last_analysis_date = excluded.vt_last_analysis_date,
+                    vt_malicious_score = excluded.vt_malicious_score,
+                    checked_at = excluded.checked_at,
+                    fresh_at = excluded.fresh_at,
+                    pending_providers = excluded.pending_providers
+                """,
+                (ioc, result.get("ioc_type", ""), result.get("twitter_link", ""),
+                 vt_date, score, checked_at, fresh_at, result.get("pending_providers", "") or ""),
+            )
+            conn.execute(
+                "INSERT INTO score_history VALUES (?, ?, ?, ?, ?)",
+                (ioc, checked_at, vt_date, score, delta),
+            )
+
+    if delta:
+        logging.info("VT score changed | IOC=%s | delta=%+d | score=%s", ioc, delta, score)
+
+
+def touch_checked(ioc: str):
+    """
+    Mark an IOC as checked now without new data (e.g. VT lookup failed).
+    """
+    now = _now()
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "UPDATE ioc_state SET checked_at = ?, fresh_at = ? WHERE ioc = ?",
+                (now, now, ioc),
+            )
+
+
+def set_pending_providers(ioc: str, pending_providers: str):
+    """Update the providers still missing from a partial result ('' = complete)."""
+    with _lock:
+        conn = _db()
+        with conn:
+            conn.execute(
+                "UPDATE ioc_state SET pending_providers = ? WHERE ioc = ?",
+                (pending_providers, ioc),
+            )
+
+
+def select_incomplete_iocs(limit: int) -> List[Tuple[str, List[str]]]:
+    """
+    Return up to `limit` (ioc, [pending provider names]) of partial
+    results, oldest check first.
+    """
+    if limit <= 0:
+        return []
+
+    with _lock:
+        rows = _db().execute(
+            """
+            SELECT ioc, pending_providers FROM ioc_state
+            WHERE pending_providers != ''
+            ORDER BY checked_at
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+
+    return [(ioc, pending.split(",")) for ioc, pending in rows]
+
+
+def select_stale_iocs(ttl_hours: dict, limit: int) -> List[Tuple[str, str, str]]:
+    """
+    Return up to `limit` (ioc, ioc_type, twitter_link) whose fresh_at is
+    older than the TTL of their type, stalest first.
+    Uses the (ioc_type, fresh_at) index, never a full scan.
+    """
+    if limit <= 0:
+        return []
+
+    now = datetime.now(UTC_PLUS_7)
+    candidates = []
+
+    with _lock:
+        conn = _db()
+        for ioc_type, hours in ttl_hours.items():
+            cutoff = (now - timedelta(hours=hours)).strftime(TIME_FORMAT)
+            candidates.extend(conn.execute(
+                """
+                SELECT fresh_at, ioc, ioc_type, twitter_link FROM ioc_state
+                WHERE ioc_type = ? AND fresh_at < ?
+                ORDER BY fresh_at
+                LIMIT ?
+                """,
+                (ioc_type, cutoff, limit),
+            ).fetchall())
+
+    candidates.sort()
+    return [(ioc, ioc_type, link) for _, ioc, ioc_type, link in candidates[:limit]]
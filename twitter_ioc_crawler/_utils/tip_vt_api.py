@@ -1,16 +1,35 @@
 import base64
+import logging
 import requests
 from datetime import datetime, timezone
 from typing import Optional
 
 from .text_utils import get_ioc_type
-from .config import VT_API_KEY, VT_BASE
+from .config import VT_BASE
 from .time_utils import UTC_PLUS_7
+from .tip_vt_keys import VT_KEY_POOL, ledger_key
+from .quota import record_call
+from .metrics import observe_response
+from .circuit_breaker import ProviderError
+from .deadline import Deadline, DeadlineExceeded, MIN_REQUEST_SECONDS, bounded_timeout
+from .http_session import http_session
 
-HEADERS = {"x-apikey": VT_API_KEY}
 
-
-def vt_lookup(ioc: str) -> Optional[dict]:
+def vt_lookup(
+    ioc: str,
+    timeout: float = 20,
+    retries: int = 1,
+    deadline: Optional[Deadline] = None,
+) -> Optional[dict]:
+    """
+    Lookup IOC in VirusTotal using the next available key of the pool.
+    Blocks until a key is free (per-key pacing, at most until the
+    deadline), returns None if every key is exhausted or disabled for today.
+    Returns {} when VT answered but has no record of the IOC (404): a
+    final answer, unlike None (no answer, worth retrying later).
+    Raises ProviderError on transport errors / 5xx,
+    DeadlineExceeded when no key was free in time.
+    """
     try:
         ioc_type = get_ioc_type(ioc)
 
@@ -24,15 +43,35 @@ def vt_lookup(ioc: str) -> Optional[dict]:
         else:
             return None
 
-        r = requests.get(url, headers=HEADERS, timeout=20)
+        # ---- Key wait (VT_SLEEP pacing) counts against the IOC budget ----
+        wait = deadline.remaining() - MIN_REQUEST_SECONDS if deadline else None
+        api_key = VT_KEY_POOL.acquire(timeout=wait)
+        if not api_key and deadline is not None and VT_KEY_POOL.next_available_in() is not None:
+            raise DeadlineExceeded("no VT key free before the deadline")
+        if not api_key:
+            logging.error("VT no usable API key (quota exhausted / disabled) | IOC=%s", ioc)
+            return None
+
+        r = http_session().get(url, headers={"x-apikey": api_key}, timeout=bounded_timeout(deadline, timeout))
+        record_call("virustotal", ledger_key(api_key))
+        observe_response("virustotal", r)
+        VT_KEY_POOL.report(api_key, r.status_code, r.headers.get("Retry-After"))
+
+        # ---- VT itself failing → count against the circuit ----
+        if r.status_code >= 500:
+            raise ProviderError(f"VT HTTP {r.status_code}")
 
-        # ---- Not found or API error ----
+        # ---- Not known to VT: final ----
+        if r.status_code == 404:
+            return {}
+
+        # ---- Key problem (handled by the key pool): no answer ----
         if r.status_code != 200:
             return None
 
         data = r.json().get("data")
         if not data:
-            return None
+            return {}
 
         attrs = data.get("attributes", {})
         stats = attrs.get("last_analysis_stats", {})
@@ -54,8 +93,11 @@ def vt_lookup(ioc: str) -> Optional[dict]:
             "malicious": stats.get("malicious", 0),
         }
 
-    except requests.RequestException:
-        return None
+    except ProviderError:
+        raise
+
+    except requests.RequestException as e:
+        raise ProviderError(str(e)) from e
 
     except Exception:
         return None
\ No newline at end of file
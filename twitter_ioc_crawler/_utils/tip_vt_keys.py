@@ -0,0 +1,179 @@
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional, List
+
+from .config import VT_API_KEY, VT_API_KEYS, VT_SLEEP, VT_DAILY_QUOTA
+from .quota import used_today
+
+RATE_LIMIT_QUARANTINE = 60        # first 429 → 1 min, doubles on repeat
+MAX_QUARANTINE = 24 * 60 * 60     # never park a key longer than a day
+
+
+def _today() -> str:
+    # VT quota resets at 00:00 UTC
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def key_id(key: str) -> str:
+    # Never log full API keys
+    return f"...{key[-4:]}" if key else "?"
+
+
+def ledger_key(key: str) -> str:
+    """
+    Quota ledger key for an API key: a stable hash of the full key, so
+    two keys ending in the same 4 chars never share a count (key_id is
+    for logs only).
+    """
+    return hashlib.blake2b(key.encode(), digest_size=4).hexdigest()
+
+
+class VTKeyPool:
+    """
+    Rotates VirusTotal API keys with per-key quota tracking.
+
+    - each key is used at most once every `min_interval` seconds
+      and `daily_quota` times per UTC day (counts survive restarts
+      through the quota ledger)
+    - selection prefers the least-recently-limited key
+    - 429 quarantines a key (Retry-After or exponential backoff),
+      401/403 disables it for the rest of the process
+    """
+
+    def __init__(self, keys: List[str], min_interval: float = VT_SLEEP, daily_quota: int = VT_DAILY_QUOTA):
+        self.min_interval = min_interval
+        self.daily_quota = daily_quota
+        self._cond = threading.Condition()
+        self._keys = {
+            key: {
+                "last_used": 0.0,
+                "day": None,   # loaded from the quota ledger on first use
+                "used_today": 0,
+                "limited_at": 0.0,
+                "quarantined_until": 0.0,
+                "strikes": 0,
+                "disabled": False,
+            }
+            for key in dict.fromkeys(keys)
+            if key
+        }
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def daily_limit(self) -> int:
+        """Calls per UTC day across all keys still enabled."""
+        with self._cond:
+            return self.daily_quota * sum(1 for s in self._keys.values() if not s["disabled"])
+
+    def _roll_day(self, state: dict, key: str):
+        today = _today()
+        if state["day"] != today:
+            state["day"] = today
+            # ---- Calls made by earlier runs today still count ----
+            state["used_today"] = used_today("virustotal", ledger_key(key))
+
+    def _ready_at(self, key: str, state: dict) -> Optional[float]:
+        """Monotonic time the key can be used next, None if not today."""
+        self._roll_day(state, key)
+        if state["disabled"] or state["used_today"] >= self.daily_quota:
+            return None
+        return max(state["last_used"] + self.min_interval, state["quarantined_until"])
+
+    def remaining_today(self) -> int:
+        with self._cond:
+            total = 0
+            for key, state in self._keys.items():
+                self._roll_day(state, key)
+                if not state["disabled"]:
+                    total += max(0, self.daily_quota - state["used_today"])
+            return total
+
+    def next_available_in(self) -> Optional[float]:
+        """Seconds until any key is usable, None if all are exhausted today."""
+        with self._cond:
+            ready = [r for r in (self._ready_at(k, s) for k, s in self._keys.items()) if r is not None]
+            if not ready:
+                return None
+            return max(0.0, min(ready) - time.monotonic())
+
+    def acquire(self, block: bool = True, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Reserve one call on the best available key.
+        Returns the key, or None if no key is usable (in time).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                candidates = []
+
+                for key, state in self._keys.items():
+                    ready_at = self._ready_at(key, state)
+                    if ready_at is not None:
+                        candidates.append((ready_at, state["limited_at"], state["last_used"], key))
+
+                if not candidates:
+                    return None
+
+                usable = [c for c in candidates if c[0] <= now]
+                if usable:
+                    # ---- Least-recently-limited, then least-recently-used ----
+                    _, _, _, key = min(usable, key=lambda c: (c[1], c[2]))
+                    state = self._keys[key]
+                    state["last_used"] = now
+                    state["used_today"] += 1
+                    return key
+
+                if not block:
+                    return None
+
+                wait = min(c[0] for c in candidates) - now
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                    if wait <= 0:
+                        return None
+
+                self._cond.wait(wait)
+
+    def report(self, key: str, status_code: int, retry_after: Optional[str] = None):
+        """
+        Feed the HTTP status of a call back into the pool.
+        """
+        with self._cond:
+            state = self._keys.get(key)
+            if state is None:
+                return
+
+            if status_code in (401, 403):
+                state["disabled"] = True
+                logging.error(f"VT key disabled | key={key_id(key)} | status={status_code}")
+
+            elif status_code == 429:
+                state["strikes"] += 1
+                state["limited_at"] = time.monotonic()
+
+                try:
+                    backoff = float(retry_after)
+                except (TypeError, ValueError):
+                    backoff = RATE_LIMIT_QUARANTINE * (2 ** (state["strikes"] - 1))
+
+                backoff = min(backoff, MAX_QUARANTINE)
+                state["quarantined_until"] = state["limited_at"] + backoff
+
+                logging.warning(
+                    "VT key rate limited | key=%s | quarantine=%ds", key_id(key), backoff
+                )
+
+            else:
+                state["strikes"] = 0
+
+            self._cond.notify_all()
+
+
+VT_KEY_POOL = VTKeyPool(VT_API_KEYS or [VT_API_KEY])
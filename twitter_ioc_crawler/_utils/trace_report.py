@@ -0,0 +1,196 @@
+import json
+import math
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import TRACE_FILE
+
+# ---- Spans that mean "the SOC has it" (first one after discovery ends the trace) ----
+DELIVERY_SPANS = ("sink.siem", "sink.syslog", "siem.send")
+
+ROOT_SPAN = "crawl.discover"
+QUEUED = "(queued)"
+MIN_GAP_NS = 1_000_000   # shorter gaps between spans are not listed on the path
+
+
+def load_spans(path=TRACE_FILE) -> Dict[str, List[dict]]:
+    """traceId → spans, from the trace file and its rotated `.1`."""
+    traces = defaultdict(list)
+    for p in (Path(f"{path}.1"), Path(path)):
+        if not p.exists():
+            continue
+        with open(p, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue   # torn line (crash mid-write)
+                traces[span["traceId"]].append(span)
+    return traces
+
+
+def _start(span: dict) -> int:
+    return span["startTimeUnixNano"]
+
+
+def _end(span: dict) -> int:
+    return span["endTimeUnixNano"]
+
+
+def _tweet_ns(root: dict) -> Optional[int]:
+    created = root.get("attributes", {}).get("tweet_created_at")
+    if not created:
+        return None
+    try:
+        return int(datetime.fromisoformat(created.replace("Z", "+00:00")).timestamp() * 1e9)
+    except ValueError:
+        return None
+
+
+def critical_path(spans: List[dict], root: dict, delivery: dict) -> List[Tuple[str, int, int]]:
+    """
+    Walk back from the delivery span over leaf spans (no children): each
+    step takes the leaf that ended last before the current one started.
+    Gaps are charged to the innermost span covering them (e.g. `enrich`
+    self time) or to (queued) when none does (waiting in a queue, the
+    batch pass not having reached the IOC yet, ...).
+    Returns [(name, start_ns, end_ns)] in time order.
+    """
+    parents = {s.get("parentSpanId") for s in spans}
+    end_at = _end(delivery)
+    leaves = [
+        s for s in spans
+        if s["spanId"] not in parents and _end(s) <= end_at and _start(s) >= _start(root)
+    ]
+
+    def covering(start: int, end: int) -> str:
+        inside = [s for s in spans if s["spanId"] in parents and _start(s) <= start and _end(s) >= end]
+        return max(inside, key=_start)["name"] if inside else QUEUED
+
+    path = [(delivery["name"], _start(delivery), _end(delivery))]
+    t = _start(delivery)
+
+    while True:
+        before = [s for s in leaves if _end(s) <= t and s is not delivery]
+        if not before:
+            break
+        step = max(before, key=_end)
+        if t - _end(step) >= MIN_GAP_NS:
+            path.append((covering(_end(step), t), _end(step), t))
+        path.append((step["name"], _start(step), _end(step)))
+        t = _start(step)
+
+    if t - _start(root) >= MIN_GAP_NS:
+        path.append((covering(_start(root), t), _start(root), t))
+
+    return path[::-1]
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))   # nearest rank
+    return ordered[rank - 1]
+
+
+def trace_report(path=TRACE_FILE, slowest: int = 5) -> dict:
+    """
+    Discovery → SIEM latency (p50 / p95) over crawled IOCs that reached
+    a DELIVERY_SPANS span, tweet → SIEM when the tweet time is known,
+    and where the time went: share of the summed critical paths per
+    span name, plus the critical path of the slowest traces.
+    """
+    traces = load_spans(path)
+
+    discovery_s, tweet_s = [], []
+    share = defaultdict(float)
+    per_trace = []
+    not_delivered = 0
+
+    for trace_id, spans in traces.items():
+        roots = [s for s in spans if s["name"] == ROOT_SPAN]
+        if not roots:
+            continue   # backfill / imported IOCs: no discovery
+        root = min(roots, key=_start)
+
+        deliveries = [s for s in spans if s["name"] in DELIVERY_SPANS and _end(s) >= _start(root)]
+        deliveries = [s for s in deliveries if s.get("status", {}).get("code") != "ERROR"
+                      and s.get("attributes", {}).get("accepted", True)]
+        if not deliveries:
+            not_delivered += 1
+            continue
+        delivery = min(deliveries, key=_end)
+
+        total = (_end(delivery) - _start(root)) / 1e9
+        discovery_s.append(total)
+        tweet = _tweet_ns(root)
+        if tweet:
+            tweet_s.append((_end(delivery) - tweet) / 1e9)
+
+        path = critical_path(spans, root, delivery)
+        for name, start, end in path:
+            share[name] += (end - start) / 1e9
+
+        per_trace.append((total, trace_id, root.get("attributes", {}).get("ioc", ""), path))
+
+    path_total = sum(share.values()) or 1.0
+    per_trace.sort(key=lambda item: -item[0])
+
+    return {
+        "traces": len(traces),
+        "crawled_not_delivered": not_delivered,
+        "delivered": len(discovery_s),
+        "discovery_to_siem_s": {
+            "p50": _percentile(discovery_s, 50), "p95": _percentile(discovery_s, 95),
+            "max": max(discovery_s) if discovery_s else None,
+        },
+        "tweet_to_siem_s": {
+            "count": len(tweet_s), "p50": _percentile(tweet_s, 50), "p95": _percentile(tweet_s, 95),
+        },
+        "critical_path_share": {
+            name: round(seconds / path_total, 4)
+            for name, seconds in sorted(share.items(), key=lambda kv: -kv[1])
+        },
+        "slowest": [
+            {
+                "trace_id": trace_id,
+                "ioc": ioc,
+                "seconds": round(total, 3),
+                "critical_path": [
+                    {"span": name, "offset_s": round((start - path[0][1]) / 1e9, 3),
+                     "seconds": round((end - start) / 1e9, 3)}
+                    for name, start, end in path
+                ],
+            }
+            for total, trace_id, ioc, path in per_trace[:slowest]
+        ],
+    }
+
+
+def _fmt(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds:.1f}s"
+
+
+def format_trace_report(report: dict) -> str:
+    d, t = report["discovery_to_siem_s"], report["tweet_to_siem_s"]
+    lines = [
+        f"Traces: {report['traces']} | delivered to SIEM: {report['delivered']} | "
+        f"crawled, not delivered yet: {report['crawled_not_delivered']}",
+        f"Discovery → SIEM   p50={_fmt(d['p50'])}  p95={_fmt(d['p95'])}  max={_fmt(d['max'])}",
+        f"Tweet → SIEM       p50={_fmt(t['p50'])}  p95={_fmt(t['p95'])}  (tweets with a timestamp: {t['count']})",
+        "",
+        "Critical path share (all delivered traces):",
+    ]
+    for name, fraction in report["critical_path_share"].items():
+        lines.append(f"  {name:<28} {fraction * 100:5.1f}%")
+
+    for trace in report["slowest"]:
+        lines.append("")
+        lines.append(f"Slow trace {trace['trace_id']} | {trace['seconds']:.1f}s | {trace['ioc']}")
+        for step in trace["critical_path"]:
+            lines.append(f"  +{step['offset_s']:>9.3f}s  {step['span']:<28} {step['seconds']:.3f}s")
+
+    return "\n".join(lines)
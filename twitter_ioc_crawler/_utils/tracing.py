@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from typing import List, Optional
+
+from .config import TRACING, TRACE_FILE, TRACE_MAX_BYTES, TRACE_FLUSH_SECONDS
+
+SERVICE_NAME = "twitter_ioc_crawler"
+
+
+# ================= IDS =================
+
+def trace_id_for(ioc: str) -> str:
+    """
+    One trace per IOC, derived from the IOC itself (W3C / OTel 32 hex
+    chars): the crawler, the enrichment workers, a `--worker siem`
+    process and the batch pass of a later run all land in the same
+    trace without passing an ID through iocs.txt or the work queue.
+    """
+    return hashlib.blake2b(ioc.encode(), digest_size=16).hexdigest()
+
+
+def root_span_id(trace_id: str) -> str:
+    """Span ID of crawl.discover, the parent of every other span of the trace."""
+    return hashlib.blake2b(trace_id.encode(), digest_size=8, person=b"root").hexdigest()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+# ================= EXPORT =================
+
+class SpanExporter:
+    """
+    Append spans to a JSON-lines file, one span per line, OTLP field
+    names (traceId, spanId, parentSpanId, startTimeUnixNano, ...);
+    attributes are a flat object instead of OTLP's key/value list.
+
+    Spans are buffered and written in one append per flush (whole lines
+    only, so a `--worker` process can share the file), every
+    TRACE_FLUSH_SECONDS and at exit. The file is rotated to `.1` at
+    TRACE_MAX_BYTES.
+    """
+
+    def __init__(self, path=TRACE_FILE, max_bytes: int = TRACE_MAX_BYTES, interval: float = TRACE_FLUSH_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.interval = interval
+
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def export(self, span: dict):
+        line = json.dumps(span, separators=(",", ":"), ensure_ascii=False)
+        with self._lock:
+            self._buffer.append(line)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="trace-flush", daemon=True)
+                self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._buffer:
+                return
+            data = ("\n".join(self._buffer) + "\n").encode("utf-8")
+            self._buffer = []
+
+            try:
+                if os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+            except FileNotFoundError:
+                pass
+
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+
+
+EXPORTER = SpanExporter()
+atexit.register(EXPORTER.flush)
+
+
+# ================= SPANS =================
+
+_local = threading.local()
+
+
+def _stack() -> list:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def record_span(
+    name: str,
+    trace_id: str,
+    start_ns: int,
+    end_ns: int,
+    parent_id: Optional[str] = None,
+    span_id: Optional[str] = None,
+    error: Optional[str] = None,
+    **attributes,
+):
+    """
+    Export a span measured by the caller (e.g. the crawler, which only
+    learns a tweet's IOCs after timing it). Parent defaults to the
+    trace's root span.
+    """
+    if not TRACING:
+        return
+
+    status = {"code": "ERROR", "message": error} if error else {"code": "OK"}
+    EXPORTER.export({
+        "traceId": trace_id,
+        "spanId": span_id or _new_span_id(),
+        "parentSpanId": parent_id if parent_id is not None else root_span_id(trace_id),
+        "name": name,
+        "startTimeUnixNano": start_ns,
+        "endTimeUnixNano": end_ns,
+        "attributes": {k: v for k, v in attributes.items() if v is not None},
+        "status": status,
+        "resource": {"service.name": SERVICE_NAME},
+    })
+
+
+class Span:
+    """
+    `with Span("enrich", ioc): ...` — times the block as a child of the
+    innermost open span of the same trace on this thread (or of the
+    root span). Without `ioc`, joins the innermost open span's trace;
+    with no open span it records nothing.
+    """
+
+    __slots__ = ("name", "ioc", "attributes", "trace_id", "span_id", "parent_id", "_start")
+
+    def __init__(self, name: str, ioc: Optional[str] = None, **attributes):
+        self.name = name
+        self.ioc = ioc
+        self.attributes = attributes
+        self.trace_id = None
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        if not TRACING:
+            return self
+
+        stack = _stack()
+        current = stack[-1] if stack else None
+
+        if self.ioc is not None:
+            self.trace_id = trace_id_for(self.ioc)
+            same_trace = current is not None and current.trace_id == self.trace_id
+            self.parent_id = current.span_id if same_trace else root_span_id(self.trace_id)
+        elif current is not None:
+            self.trace_id = current.trace_id
+            self.parent_id = current.span_id
+        else:
+            return self
+
+        self.span_id = _new_span_id()
+        stack.append(self)
+        self._start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace_id is None:
+            return False
+
+        end = time.time_ns()
+        _stack().pop()
+        record_span(
+            self.name, self.trace_id, self._start, end,
+            parent_id=self.parent_id, span_id=self.span_id,
+            error=f"{exc_type.__name__}: {exc}" if exc_type else None,
+            **self.attributes,
+        )
+        return False
@@ -1,16 +1,38 @@
-def load_usernames(file_path):
-    usernames = []
+from typing import List, Optional, Tuple
+
+
+def load_accounts(file_path) -> List[Tuple[str, Optional[float]]]:
+    """
+    Read twitter_users.txt: one account per line, optionally followed by
+    its crawl interval in minutes (daemon mode), e.g. `@abuse_ch 15`.
+    Returns [(username, interval_minutes or None)].
+    """
+    accounts = []
 
     if not file_path.exists():
-        return usernames
+        return accounts
 
     with open(file_path, "r", encoding="utf-8") as f:
         for line in f:
-            u = line.strip()
-            if not u:
+            parts = line.split()
+            if not parts or parts[0].startswith("#"):
                 continue
+
+            u = parts[0]
             if u.startswith("@"):
                 u = u[1:]
-            usernames.append(u)
 
-    return usernames
+            interval = None
+            if len(parts) > 1:
+                try:
+                    interval = float(parts[1])
+                except ValueError:
+                    interval = None
+
+            accounts.append((u, interval))
+
+    return accounts
+
+
+def load_usernames(file_path):
+    return [u for u, _ in load_accounts(file_path)]
@@ -0,0 +1,153 @@
+import json
+import time
+import logging
+import threading
+from typing import Optional
+
+from .config import WORK_QUEUE_DB, WORK_QUEUE_VISIBILITY_SECONDS, WORK_QUEUE_MAX_ATTEMPTS
+from .sqlite_store import open_db
+
+# ---- status: ready → (claimed) → done | dead ----
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    job_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'ready',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    visible_at REAL NOT NULL,
+    claimed_by TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (stage, job_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_ready
+    ON jobs (stage, status, visible_at, id);
+"""
+
+
+class WorkQueue:
+    """
+    Crash-safe work queue between pipeline stages, backed by SQLite.
+
+    - enqueue() is idempotent per (stage, job_key)
+    - claim() hides a job for `visibility` seconds; if the worker dies
+      without ack/nack the job becomes visible again and is retried
+    - ack() finishes a job, nack() schedules a retry with backoff;
+      after `max_attempts` the job is parked as 'dead'
+
+    Several processes can share the same database file (SQLite locking);
+    separate hosts need it on storage with working file locks.
+    """
+
+    def __init__(
+        self,
+        path=WORK_QUEUE_DB,
+        visibility: float = WORK_QUEUE_VISIBILITY_SECONDS,
+        max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS,
+    ):
+        self.visibility = visibility
+        self.max_attempts = max_attempts
+        self._conn = open_db(path, SCHEMA)
+        self._lock = threading.Lock()
+
+    def enqueue(self, stage: str, job_key: str, payload: dict) -> bool:
+        """Returns False if the job already exists for this stage."""
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                """
+                INSERT OR IGNORE INTO jobs (stage, job_key, payload, visible_at, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (stage, job_key, json.dumps(payload), now, now),
+            )
+        return cur.rowcount == 1
+
+    def claim(self, stage: str, worker: str) -> Optional[dict]:
+        """
+        Take the oldest visible job of a stage, or None.
+        Expired claims (crashed workers) are visible again.
+        """
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE → no other process can claim the same row
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    """
+                    SELECT id, job_key, payload, attempts FROM jobs
+                    WHERE stage = ? AND status IN ('ready', 'claimed') AND visible_at <= ?
+                    ORDER BY visible_at, id
+                    LIMIT 1
+                    """,
+                    (stage, now),
+                ).fetchone()
+
+                if not row:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                job_id, job_key, payload, attempts = row
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET status = 'claimed', claimed_by = ?,
+                        attempts = attempts + 1, visible_at = ?
+                    WHERE id = ?
+                    """,
+                    (worker, now + self.visibility, job_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return {
+            "id": job_id,
+            "stage": stage,
+            "key": job_key,
+            "payload": json.loads(payload),
+            "attempts": attempts + 1,
+        }
+
+    def ack(self, job: dict):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = 'done' WHERE id = ?", (job["id"],))
+
+    def nack(self, job: dict, error: str = "", delay: Optional[float] = None):
+        """Retry later (exponential backoff), or park as dead."""
+        if job["attempts"] >= self.max_attempts:
+            status, visible_at = "dead", time.time()
+            logging.error(
+                f"Job dead after {job['attempts']} attempts | stage={job['stage']} | key={job['key']} | {error}"
+            )
+        else:
+            delay = delay if delay is not None else min(3600, 30 * 2 ** (job["attempts"] - 1))
+            status, visible_at = "ready", time.time() + delay
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, visible_at = ?, last_error = ? WHERE id = ?",
+                (status, visible_at, error[:500], job["id"]),
+            )
+
+    def extend(self, job: dict, seconds: Optional[float] = None):
+        """Keep a long-running job hidden (heartbeat)."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET visible_at = ? WHERE id = ? AND status = 'claimed'",
+                (time.time() + (seconds or self.visibility), job["id"]),
+            )
+
+    def counts(self) -> dict:
+        """{stage: {status: n}} — queue depth per stage."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status"
+            ).fetchall()
+        out = {}
+        for stage, status, n in rows:
+            out.setdefault(stage, {})[status] = n
+        return out
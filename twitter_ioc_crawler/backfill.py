@@ -0,0 +1,123 @@
+import time
+import logging
+from pathlib import Path
+from typing import Optional
+
+from tip import enrich_ioc, publish_result, flush_siem
+from _utils.config import (
+    BACKFILL_QUOTA_SHARE,
+    BACKFILL_CHECKPOINT_EVERY,
+    BACKFILL_THROTTLE_SECONDS,
+    BACKFILL_MAX_ATTEMPTS,
+)
+from _utils.backfill_io import iter_backfill_iocs, load_checkpoint, save_checkpoint
+from _utils.quota import quota_plan, record_call, used_this_hour
+from _utils.text_utils import canonical_ioc
+from _utils.tip_file_io import load_existing_tip_results
+from _utils.tip_policy import EnrichmentPolicy
+from _utils.tip_providers import Provider, get_provider
+
+
+def _backfill_allowed(vt: Provider) -> bool:
+    """
+    Backfill is the lowest priority: it never touches the fresh-IOC reserve
+    and takes at most BACKFILL_QUOTA_SHARE of each hour's normal VT budget,
+    so the live crawl keeps the rest.
+    """
+    limit = vt.daily_limit
+    if not limit:
+        return True
+
+    plan = quota_plan(vt.name, limit)
+    if plan["hour_budget"] <= 0 or plan["remaining"] <= plan["reserve"]:
+        return False
+
+    return used_this_hour("backfill") < plan["hour_cap"] * BACKFILL_QUOTA_SHARE
+
+
+def backfill_main(path: str, fmt: Optional[str] = None, send_to_siem: bool = False):
+    """
+    Enrich an imported IOC list (TXT / CSV / STIX 2.x JSON) with the same
+    canonicalization and enrichment as the crawler path.
+    Progress is checkpointed (backfill.db); running it again on the same
+    file resumes where it stopped.
+
+    IOCs VirusTotal does not know are final and skipped. When VT does not
+    answer (circuit open, keys exhausted, deadline), the same IOC is
+    retried after BACKFILL_THROTTLE_SECONDS; after BACKFILL_MAX_ATTEMPTS
+    the run stops with the checkpoint ON that IOC, so the next run
+    starts with it.
+    """
+    source = Path(path)
+    position, enriched = load_checkpoint(source)
+    # ---- Same canonical form as the IOCs read below (hashes lower-case) ----
+    seen = {canonical_ioc(ioc) for ioc in load_existing_tip_results()}
+    policy = EnrichmentPolicy()
+    vt = get_provider("virustotal")
+    link = f"backfill:{source.name}"
+
+    logging.info(f"[✓] START - Backfill | source={source} | resume_at={position} | enriched={enriched}")
+
+    skipped = 0
+
+    try:
+        for idx, (ioc, ioc_type) in enumerate(iter_backfill_iocs(source, fmt)):
+            if idx < position:
+                continue
+
+            if ioc in seen:
+                skipped += 1
+            else:
+                result = None
+                for attempt in range(1, BACKFILL_MAX_ATTEMPTS + 1):
+                    # ---- Throttle: wait for the next slice of budget ----
+                    while not _backfill_allowed(vt):
+                        logging.info(
+                            f"Backfill throttled (quota share used) | position={idx} | "
+                            f"retry in {BACKFILL_THROTTLE_SECONDS}s"
+                        )
+                        save_checkpoint(source, idx, enriched)
+                        time.sleep(BACKFILL_THROTTLE_SECONDS)
+
+                    result = enrich_ioc(ioc, ioc_type, link, policy=policy)
+                    if result is not None:
+                        # ---- VT answered: one call of the backfill share spent ----
+                        record_call("backfill")
+                        break
+
+                    if attempt < BACKFILL_MAX_ATTEMPTS:
+                        logging.warning(
+                            f"Backfill: VT did not answer | IOC={ioc} | position={idx} | "
+                            f"attempt={attempt} | retry in {BACKFILL_THROTTLE_SECONDS}s"
+                        )
+                        save_checkpoint(source, idx, enriched)
+                        time.sleep(BACKFILL_THROTTLE_SECONDS)
+
+                if result is None:
+                    # ---- Not enriched yet: stop here, the next run starts with this IOC ----
+                    logging.error(
+                        f"Backfill stopped: VT did not answer {BACKFILL_MAX_ATTEMPTS} times | "
+                        f"IOC={ioc} | position={idx} — run again to resume"
+                    )
+                    break
+
+                if result:
+                    publish_result(result, send_to_siem)
+                    seen.add(ioc)
+                    enriched += 1
+
+            position = idx + 1
+            if position % BACKFILL_CHECKPOINT_EVERY == 0:
+                save_checkpoint(source, position, enriched)
+                logging.info(f"[+] Backfill progress | position={position} | enriched={enriched}")
+
+    finally:
+        save_checkpoint(source, position, enriched)
+
+    policy.log_summary()
+    if send_to_siem:
+        flush_siem()
+    logging.info(
+        f"[✓] FINISH - Backfill | processed={position} | enriched={enriched} | "
+        f"already_enriched={skipped}"
+    )
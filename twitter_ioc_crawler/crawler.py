@@ -1,10 +1,10 @@
 import time
 import os
 import logging
+from typing import Callable, Optional
 from selenium.webdriver.common.by import By
 
-from _utils.logging_config import setup_logging
-from _utils.config import IOC_INDEX_FILE, TWITTER_USER_FILE
+from _utils.config import IOC_INDEX_FILE, TWITTER_USER_FILE, TRACING
 from _utils.selenium_driver import (
     create_driver,
     inject_cookies,
@@ -18,12 +18,165 @@ from _utils.file_io import (
 )
 
 from _utils.twitter_user_loader import load_usernames
+from _utils.ioc_record import IocRecord
+from _utils.metrics import CRAWL_DURATION, CRAWL_ERRORS, CRAWL_IOCS, CRAWL_TWEETS
+from _utils.tracing import record_span, root_span_id, trace_id_for
+
+
+def _tweet_time(tweet) -> Optional[str]:
+    """Posting time of the tweet (ISO 8601 from its <time> element), if shown."""
+    try:
+        return tweet.find_element(By.XPATH, ".//time").get_attribute("datetime")
+    except Exception:
+        return None
+
+
+def _trace_new_ioc(ioc: str, ioc_type: str, username: str, tweet_link: str, tweet_time, marks: dict):
+    """
+    Spans of the crawl side of the IOC's trace (times measured before
+    the IOC was known): crawl.discover is the root, from the tweet
+    showing up in the timeline to the IOC being handed to enrichment.
+    """
+    trace_id = trace_id_for(ioc)
+    record_span(
+        "crawl.discover", trace_id, marks["seen"], marks["done"],
+        parent_id="", span_id=root_span_id(trace_id),
+        ioc=ioc, ioc_type=ioc_type, account=username,
+        tweet_link=tweet_link, tweet_created_at=tweet_time,
+    )
+    record_span("crawl.extract", trace_id, marks["extract"], marks["extracted"])
+    record_span("crawl.filter", trace_id, marks["filter"], marks["save"])
+    record_span("crawl.save", trace_id, marks["save"], marks["saved"])
+    if "handoff" in marks:
+        record_span("crawl.handoff", trace_id, marks["handoff"], marks["done"])
+
+
+# ================= ONE ACCOUNT ===================
+def crawl_account(
+    driver,
+    username: str,
+    max_tweets: int,
+    seen_ioc: set,
+    on_ioc: Optional[Callable[[IocRecord], None]] = None,
+):
+    """
+    Scroll the timeline the driver has open and save new IOCs.
+    seen_ioc is updated in place (shared across accounts / cycles).
+    Returns (ioc_tweets_seen, new_ioc_count).
+    """
+    started = time.monotonic()
+    ioc_tweets_seen = 0
+    new_ioc_count = 0
+
+    processed_tweet_ids = set()
+    no_new_rounds = 0
+    MAX_IDLE_ROUNDS = 3
+
+    while ioc_tweets_seen < max_tweets and no_new_rounds < MAX_IDLE_ROUNDS:
+
+        tweets = driver.find_elements(By.XPATH, "//article")
+        new_seen_this_round = False
+
+        for t in tweets:
+
+            tweet_link = ""
+            tweet_id = ""
+
+            try:
+                link_elem = t.find_element(
+                    By.XPATH,
+                    ".//a[contains(@href, '/status/')]"
+                )
+                href = link_elem.get_attribute("href")
+
+                if href:
+                    tweet_link = href.split("?")[0]
+                    tweet_id = tweet_link.split("/")[-1]
+
+            except Exception:
+                pass
+
+            if not tweet_id or tweet_id in processed_tweet_ids:
+                continue
+
+            processed_tweet_ids.add(tweet_id)
+            new_seen_this_round = True
+            CRAWL_TWEETS.inc(username)
+            marks = {"seen": time.time_ns()}
+
+            try:
+                t.find_element(By.XPATH, ".//*[text()='Pinned']")
+                continue
+            except Exception:
+                pass
+
+            marks["extract"] = time.time_ns()
+            text = t.text.strip()
+
+            if not text or not has_ioc(text):
+                continue
+
+            ioc_tweets_seen += 1
+
+            parsed = parse_tweet(text, images=[])
+            marks["extracted"] = time.time_ns()
+
+            if not parsed["iocs"]:
+                continue
+
+            tweet_time = None
+
+            for ioc in parsed["iocs"]:
+                marks["filter"] = time.time_ns()
+
+                if ioc in seen_ioc:
+                    logging.info("Duplicate IOC skipped | IOC=%s", ioc)
+                    continue
+
+                ioc_type = get_ioc_type(ioc)
+                marks["save"] = time.time_ns()
+
+                save_ioc(ioc, ioc_type, tweet_link)
+
+                seen_ioc.add(ioc)
+                new_ioc_count += 1
+                CRAWL_IOCS.inc(username, ioc_type)
+                marks["saved"] = time.time_ns()
+
+                if on_ioc:
+                    marks["handoff"] = marks["saved"]
+                    on_ioc(IocRecord(ioc, ioc_type, tweet_link, time.time(), trace_id_for(ioc)))
+
+                if TRACING:
+                    marks["done"] = time.time_ns()
+                    if tweet_time is None:
+                        tweet_time = _tweet_time(t)
+                    _trace_new_ioc(ioc, ioc_type, username, tweet_link, tweet_time, marks)
+
+                logging.info("New IOC collected | type=%s | ioc=%s", ioc_type, ioc)
+
+            if ioc_tweets_seen >= max_tweets:
+                break
+
+        if not new_seen_this_round:
+            no_new_rounds += 1
+        else:
+            no_new_rounds = 0
+
+        driver.execute_script("window.scrollBy(0, 800);")
+        time.sleep(2)
 
+    CRAWL_DURATION.observe(time.monotonic() - started, username)
+    return ioc_tweets_seen, new_ioc_count
 
-setup_logging()
 
 # ================= MAIN ===================
-def crawler_main(max_tweets: int = 3):
+def crawler_main(max_tweets: int = 3, on_ioc: Optional[Callable[[IocRecord], None]] = None):
+    """
+    Crawl every configured account and save new IOCs to iocs.txt.
+    on_ioc (optional) is called with each new IocRecord as soon as it is
+    saved, e.g. to stream it to enrichment workers.
+    """
 
     logging.info("[✓] START CRAWLING")
 
@@ -44,96 +197,14 @@ def crawler_main(max_tweets: int = 3):
             wait_for_tweets(driver)
         except Exception:
             logging.error(f"Tweets did not load for @{username}")
+            CRAWL_ERRORS.inc(username)
             driver.quit()
             continue
 
-        # ---- Existing IOC DB ----
-        seen_ioc = load_existing_iocs()
-
-        ioc_tweets_seen = 0
-        new_ioc_count = 0
-
-        processed_tweet_ids = set()
-        no_new_rounds = 0
-        MAX_IDLE_ROUNDS = 3
-
-        while ioc_tweets_seen < max_tweets and no_new_rounds < MAX_IDLE_ROUNDS:
-
-            tweets = driver.find_elements(By.XPATH, "//article")
-            new_seen_this_round = False
-
-            for t in tweets:
-
-                tweet_link = ""
-                tweet_id = ""
-
-                try:
-                    link_elem = t.find_element(
-                        By.XPATH,
-                        ".//a[contains(@href, '/status/')]"
-                    )
-                    href = link_elem.get_attribute("href")
-
-                    if href:
-                        tweet_link = href.split("?")[0]
-                        tweet_id = tweet_link.split("/")[-1]
-
-                except Exception:
-                    pass
-
-                if not tweet_id or tweet_id in processed_tweet_ids:
-                    continue
-
-                processed_tweet_ids.add(tweet_id)
-                new_seen_this_round = True
-
-                try:
-                    t.find_element(By.XPATH, ".//*[text()='Pinned']")
-                    continue
-                except Exception:
-                    pass
-
-                text = t.text.strip()
-
-                if not text or not has_ioc(text):
-                    continue
-
-                ioc_tweets_seen += 1
-
-                parsed = parse_tweet(text, images=[])
-
-                if not parsed["iocs"]:
-                    continue
-
-                for ioc in parsed["iocs"]:
-
-                    if ioc in seen_ioc:
-                        logging.info(f"Duplicate IOC skipped | IOC={ioc}")
-                        continue
-
-                    ioc_type = get_ioc_type(ioc)
-
-                    save_ioc(ioc, ioc_type, tweet_link)
-
-                    seen_ioc.add(ioc)
-                    new_ioc_count += 1
-
-                    logging.info(
-                        f"New IOC collected | "
-                        f"type={ioc_type} | "
-                        f"ioc={ioc}"
-                    )
-
-                if ioc_tweets_seen >= max_tweets:
-                    break
-
-            if not new_seen_this_round:
-                no_new_rounds += 1
-            else:
-                no_new_rounds = 0
+        # ---- Existing IOC DB (bare IOCs: crawl_account checks the IOC, not the link) ----
+        seen_ioc = {ioc for ioc, _ in load_existing_iocs()}
 
-            driver.execute_script("window.scrollBy(0, 800);")
-            time.sleep(2)
+        ioc_tweets_seen, new_ioc_count = crawl_account(driver, username, max_tweets, seen_ioc, on_ioc)
 
         driver.quit()
 
@@ -1,13 +1,19 @@
+import sys
+import json
 import argparse
 
-from crawler import crawler_main
-from tip import tip_main
+from _utils.logging_config import setup_logging
+from _utils.metrics import start_metrics
+from _utils.profiling import enable_profiling, stage, write_profile_summary
+
+# ---- Heavy modules (Selenium via crawler, requests + providers via tip)
+# are imported inside the command that needs them: `enrich`, `send` and
+# `stats` never load Selenium, and --help loads neither. ----
+
+SUBCOMMANDS = ("crawl", "enrich", "send", "stats", "traces")
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Twitter IOC Crawler + TIP Enrichment"
-    )
 
+def _add_crawl_args(parser):
     parser.add_argument(
         "--tweets",
         type=int,
@@ -15,20 +21,336 @@ def main():
         help="Number of tweets to crawl (default: 3)",
     )
 
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Enrich IOCs while crawling (bounded queue + worker threads) instead of after"
+    )
+
+    parser.add_argument(
+        "--durable",
+        action="store_true",
+        help="Like --stream, but through the on-disk work queue (resumes after a crash)"
+    )
+
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep running: crawl each account on its interval and enrich continuously (browser and caches stay warm)"
+    )
+
+
+def _add_enrich_args(parser):
+    parser.add_argument(
+        "--sync-otx",
+        action="store_true",
+        help="Sync subscribed OTX pulses into the local mirror before enrichment"
+    )
+
+    parser.add_argument(
+        "--mb-dump",
+        metavar="PATH",
+        help="Load a local MalwareBazaar CSV/ZIP dump into the local index before enrichment"
+    )
+
+    parser.add_argument(
+        "--refresh-mb",
+        action="store_true",
+        help="Merge the MalwareBazaar recent feed into the local index before enrichment"
+    )
+
+    parser.add_argument(
+        "--enrich-minutes",
+        type=float,
+        default=None,
+        help="Stop starting new enrichments after N minutes (highest priority IOCs go first)"
+    )
+
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-enrich a small batch of stale IOCs (per-type TTL) after enrichment"
+    )
+
+    parser.add_argument(
+        "--backfill",
+        metavar="PATH",
+        help="Enrich an imported IOC list (TXT, CSV or STIX 2.x JSON) instead of crawling; resumes where it stopped"
+    )
+
+    parser.add_argument(
+        "--backfill-format",
+        choices=["txt", "csv", "stix"],
+        help="Input format of --backfill (default: from the file extension)"
+    )
+
+
+def _add_siem_arg(parser):
     parser.add_argument(
         "--siem",
         action="store_true",
         help="Send enriched results to SIEM"
     )
 
-    args = parser.parse_args()
+
+def _add_profile_args(parser):
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each stage (cProfile, sampling profiler, tracemalloc); output in profiles/<run>/"
+    )
+
+    parser.add_argument(
+        "--profile-dir",
+        metavar="DIR",
+        help="Write --profile output to DIR instead of profiles/<run>/"
+    )
+
+
+def build_legacy_parser() -> argparse.ArgumentParser:
+    """Flat flags of the one-shot CLI (crawl + enrich in one run)."""
+    parser = argparse.ArgumentParser(
+        description="Twitter IOC Crawler + TIP Enrichment",
+        epilog=f"Subcommands: {', '.join(SUBCOMMANDS)} (python3 main.py <command> --help)",
+    )
+
+    _add_crawl_args(parser)
+    _add_siem_arg(parser)
+    _add_enrich_args(parser)
+
+    parser.add_argument(
+        "--worker",
+        choices=["enrich", "siem"],
+        help="Only run ONE stage of the durable queue (e.g. in a separate process) and exit when idle"
+    )
+
+    parser.add_argument(
+        "--quota",
+        action="store_true",
+        help="Print today's quota usage per provider and the projected backlog drain time, then exit"
+    )
+
+    _add_profile_args(parser)
+
+    return parser
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Twitter IOC Crawler + TIP Enrichment",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    crawl = sub.add_parser("crawl", help="Crawl accounts and save new IOCs (optionally enriching as they arrive)")
+    _add_crawl_args(crawl)
+    _add_siem_arg(crawl)
+    crawl.add_argument(
+        "--refresh",
+        action="store_true",
+        help="With --daemon: also re-enrich stale IOCs on every backlog pass"
+    )
+
+    enrich = sub.add_parser("enrich", help="Enrich IOCs not enriched yet (no crawling, no Selenium)")
+    _add_siem_arg(enrich)
+    _add_enrich_args(enrich)
+
+    send = sub.add_parser("send", help="Deliver spooled output events and queued durable SIEM jobs, then exit")
+
+    sub.add_parser("stats", help="Print quota usage, work queue depth, output spool backlog and dead letters as JSON")
+
+    traces = sub.add_parser("traces", help="Report discovery → SIEM latency (p50/p95) and its critical path from traces.jsonl")
+    traces.add_argument("--file", metavar="PATH", help="Trace file (default: traces.jsonl)")
+    traces.add_argument("--slowest", type=int, default=5, help="Show the critical path of the N slowest IOCs (default: 5)")
+    traces.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    for command in (crawl, enrich, send):
+        _add_profile_args(command)
+
+    return parser
+
+
+# ================= COMMANDS =================
+# Every command does its imports first and its work inside stage(): the
+# first stage marks the end of startup (tip_tests/startup_budget.py).
+
+def _prepare_local_indexes(args):
+    """Local TIP indexes first, so streaming workers can use them."""
+    if args.sync_otx:
+        from _utils.tip_alienvault_mirror import sync_otx_pulses
+        with stage("sync_otx"):
+            sync_otx_pulses()
+
+    if args.mb_dump:
+        from _utils.tip_malwarebazaar_dump import load_malwarebazaar_dump
+        with stage("mb_dump"):
+            load_malwarebazaar_dump(args.mb_dump)
+
+    if args.refresh_mb:
+        from _utils.tip_malwarebazaar_dump import refresh_malwarebazaar_recent
+        with stage("refresh_mb"):
+            refresh_malwarebazaar_recent()
+
+
+def _crawl(args, refresh: bool = False) -> bool:
+    """Run the crawl mode. Returns True if enrichment already ran to the end (daemon)."""
+    if args.daemon:
+        from pipeline import daemon_main
+        with stage("daemon"):
+            daemon_main(max_tweets=args.tweets, send_to_siem=args.siem, refresh=refresh)
+        return True
+
+    if args.durable:
+        from pipeline import durable_pipeline_main
+        with stage("durable"):
+            durable_pipeline_main(max_tweets=args.tweets, send_to_siem=args.siem)
+    elif args.stream:
+        from pipeline import pipeline_main
+        with stage("stream"):
+            pipeline_main(max_tweets=args.tweets, send_to_siem=args.siem)
+    else:
+        from crawler import crawler_main
+        with stage("crawl"):
+            crawler_main(max_tweets=args.tweets)
+    return False
+
+
+def _enrich(args):
+    if args.backfill:
+        from backfill import backfill_main
+        with stage("backfill"):
+            backfill_main(args.backfill, fmt=args.backfill_format, send_to_siem=args.siem)
+        return
+
+    from tip import tip_main, tip_refresh_main
+
+    # ---- Batch pass: leftovers (stream mode) or everything (batch mode) ----
+    with stage("enrich"):
+        tip_main(send_to_siem=args.siem, deadline_minutes=args.enrich_minutes)
+
+    if args.refresh:
+        with stage("refresh"):
+            tip_refresh_main(send_to_siem=args.siem)
+
+
+def cmd_crawl(args):
+    _crawl(args, refresh=args.refresh)
+
+
+def cmd_enrich(args):
+    _prepare_local_indexes(args)
+    _enrich(args)
+
+
+def cmd_send(args):
+    from pipeline import run_stage_worker
+    from tip import flush_siem
+
+    with stage("send"):
+        flush_siem()
+        run_stage_worker("siem", send_to_siem=True)
+
+
+def cmd_stats(args):
+    from tip import quota_report
+    from _utils.sinks import OUTPUT
+    from _utils.work_queue import WorkQueue
+
+    with stage("stats"):
+        print(json.dumps({
+            "quota": quota_report(),
+            "work_queue": WorkQueue().counts(),
+            "spooled_segments": {sink.name: len(sink.spool) for sink in OUTPUT.sinks},
+            "dead_letter_segments": {sink.name: len(sink.dead_letter) for sink in OUTPUT.sinks},
+        }, indent=2))
+
+
+def cmd_traces(args):
+    from _utils.trace_report import trace_report, format_trace_report
+    from _utils.config import TRACE_FILE
+
+    with stage("traces"):
+        report = trace_report(args.file or TRACE_FILE, slowest=args.slowest)
+        print(json.dumps(report, indent=2) if args.json else format_trace_report(report))
+
+
+COMMANDS = {
+    "crawl": cmd_crawl,
+    "enrich": cmd_enrich,
+    "send": cmd_send,
+    "stats": cmd_stats,
+    "traces": cmd_traces,
+}
+
+
+def _run(command, args):
+    """Run a command; with --profile, profile its stages and write summary.txt at the end."""
+    if not getattr(args, "profile", False):
+        command(args)
+        return
+
+    enable_profiling(args.profile_dir)
+    try:
+        command(args)
+    finally:
+        write_profile_summary()
+
+
+def _legacy_run(args):
+    _prepare_local_indexes(args)
+
+    if args.worker:
+        from pipeline import run_stage_worker
+        with stage(args.worker):
+            run_stage_worker(args.worker, send_to_siem=args.siem)
+        return
+
+    if args.backfill:
+        _enrich(args)
+        return
+
+    if _crawl(args, refresh=args.refresh):
+        return
+
+    _enrich(args)
+
+
+def legacy_main(argv):
+    parser = build_legacy_parser()
+    args = parser.parse_args(argv)
 
     if args.tweets <= 0:
         parser.error("--tweets must be greater than 0")
 
-    crawler_main(max_tweets=args.tweets)
-    tip_main(send_to_siem=args.siem)
+    setup_logging()
+    start_metrics()
+
+    if args.quota:
+        from tip import quota_report
+        print(json.dumps(quota_report(), indent=2))
+        return
+
+    _run(_legacy_run, args)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    # ---- No subcommand: the original flat CLI (crawl + enrich) ----
+    if not argv or argv[0] not in SUBCOMMANDS:
+        legacy_main(argv)
+        return
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if getattr(args, "tweets", 1) <= 0:
+        parser.error("--tweets must be greater than 0")
+
+    setup_logging()
+    start_metrics()
+    _run(COMMANDS[args.command], args)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,414 @@
+import os
+import queue
+import signal
+import socket
+import logging
+import threading
+import time
+
+from tip import enrich_ioc, publish_result, flush_siem, tip_main, tip_refresh_main
+from _utils.account_schedule import AccountSchedule
+from _utils.tip_policy import EnrichmentPolicy
+from _utils.config import (
+    ENRICH_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    WORK_QUEUE_POLL_SECONDS,
+    TWITTER_USER_FILE,
+    DAEMON_TICK_SECONDS,
+    DAEMON_BACKLOG_MINUTES,
+)
+from _utils.file_io import load_existing_iocs
+from _utils.ioc_record import IocRecord
+from _utils.metrics import CRAWL_ERRORS, ENRICH_QUEUE_DEPTH
+from _utils.change_filter import CHANGES
+from _utils.siem import _build_siem_event, send_siem_event
+from _utils.tip_file_io import load_existing_tip_results
+from _utils.tracing import Span
+from _utils.work_queue import WorkQueue
+
+_STOP = None  # sentinel, one per worker
+
+
+def _enrich_worker(
+    worker_id: int,
+    q: queue.Queue,
+    seen: set,
+    seen_lock: threading.Lock,
+    send_to_siem: bool,
+    stats: dict,
+    policy: EnrichmentPolicy,
+):
+    while True:
+        record = q.get()
+        try:
+            if record is _STOP:
+                return
+
+            # ---- Claim IOC so two workers never enrich the same one ----
+            with seen_lock:
+                if record.ioc in seen:
+                    logging.info("Skipping IOC=%s (already enriched)", record.ioc)
+                    continue
+                seen.add(record.ioc)
+
+            result = enrich_ioc(record.ioc, record.ioc_type, record.twitter_link, policy=policy)
+            if not result:
+                with seen_lock:
+                    seen.discard(record.ioc)  # let the batch pass retry it later
+                continue
+
+            publish_result(result, send_to_siem)
+
+            with seen_lock:
+                stats["enriched"] += 1
+
+            logging.info(
+                "Enriched IOC=%s | worker=%s | tweet_to_result=%.1fs | trace=%s",
+                record.ioc, worker_id, time.time() - record.discovered_at, record.trace_id,
+            )
+
+        except Exception as e:
+            logging.error("Enrichment worker error | IOC=%s | %s", getattr(record, "ioc", "?"), e, exc_info=True)
+
+        finally:
+            q.task_done()
+
+
+def pipeline_main(
+    max_tweets: int = 3,
+    send_to_siem: bool = False,
+    workers: int = ENRICH_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+):
+    """
+    Crawl and enrich concurrently.
+    The crawler pushes each new IocRecord onto a bounded queue (it blocks
+    when the queue is full), enrichment workers consume it in parallel.
+    """
+    logging.info(f"[✓] START - Streaming pipeline | workers={workers} | queue={queue_size}")
+
+    q: "queue.Queue[IocRecord]" = queue.Queue(maxsize=queue_size)
+    ENRICH_QUEUE_DEPTH.set_function(q.qsize, "stream")
+    seen = load_existing_tip_results()
+    seen_lock = threading.Lock()
+    stats = {"enriched": 0}
+    policy = EnrichmentPolicy()
+
+    threads = [
+        threading.Thread(
+            target=_enrich_worker,
+            args=(i, q, seen, seen_lock, send_to_siem, stats, policy),
+            name=f"enrich-{i}",
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+
+    from crawler import crawler_main   # Selenium: only loaded by modes that crawl
+
+    try:
+        crawler_main(max_tweets=max_tweets, on_ioc=q.put)
+    finally:
+        # ---- Drain: workers exit after the queued records ----
+        for _ in threads:
+            q.put(_STOP)
+        for t in threads:
+            t.join()
+
+    policy.log_summary()
+    if send_to_siem:
+        flush_siem()
+    logging.info(f"[✓] FINISH - Streaming pipeline | enriched={stats['enriched']}")
+
+
+# ================= DURABLE MODE =================
+
+def _worker_name(stage: str, idx: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{stage}-{idx}"
+
+
+def _handle_enrich(wq: WorkQueue, payload: dict, send_to_siem: bool) -> bool:
+    result = enrich_ioc(payload["ioc"], payload["ioc_type"], payload["twitter_link"])
+    if result is None:
+        return False   # VT did not answer: retry later
+    if not result:
+        return True    # not known to VT: nothing to publish, do not spend retries on it
+
+    publish_result(result, send_to_siem=False)
+
+    # ---- SIEM is its own stage: a SIEM outage never re-runs enrichment ----
+    if send_to_siem:
+        wq.enqueue("siem", f"{result['ioc']}|{result.get('vt_last_analysis_date', '')}", result)
+
+    return True
+
+
+def _handle_siem(wq: WorkQueue, payload: dict, send_to_siem: bool) -> bool:
+    event = _build_siem_event(payload)
+    emitted, digest = CHANGES.check(event)
+    CHANGES.count(emitted)
+
+    if emitted is None:
+        logging.info("SIEM suppressed (unchanged) | IOC=%s", event["ioc"])
+        return True
+
+    # ---- Hash only after the SIEM accepted it: a failed send is retried in full ----
+    with Span("siem.send", event["ioc"]) as span:
+        accepted = send_siem_event(emitted)
+        span.set("accepted", accepted)
+    if not accepted:
+        return False
+
+    CHANGES.commit(event["ioc"], digest)
+    return True
+
+
+STAGE_HANDLERS = {
+    "enrich": _handle_enrich,
+    "siem": _handle_siem,
+}
+
+
+def _stage_worker(wq: WorkQueue, stage: str, worker: str, send_to_siem: bool, stop: threading.Event):
+    """
+    Claim → handle → ack/nack until `stop` is set and the stage is idle.
+    """
+    handler = STAGE_HANDLERS[stage]
+
+    while True:
+        job = wq.claim(stage, worker)
+
+        if job is None:
+            if stop.is_set():
+                return
+            time.sleep(WORK_QUEUE_POLL_SECONDS)
+            continue
+
+        try:
+            ok = handler(wq, job["payload"], send_to_siem)
+        except Exception as e:
+            logging.error("%s job failed | key=%s | %s", stage, job["key"], e, exc_info=True)
+            wq.nack(job, str(e))
+            continue
+
+        if ok:
+            wq.ack(job)
+        else:
+            wq.nack(job, f"{stage} handler returned no result")
+
+
+def run_stage_worker(stage: str, send_to_siem: bool = False, workers: int = 1, exit_when_idle: bool = True):
+    """
+    Run ONE stage against the shared queue database, e.g. in a separate
+    process: `python3 main.py --worker enrich`.
+    """
+    wq = WorkQueue()
+    stop = threading.Event()
+    if exit_when_idle:
+        stop.set()
+
+    logging.info(f"[✓] START - {stage} worker(s) | workers={workers} | queue={wq.counts().get(stage, {})}")
+
+    threads = [
+        threading.Thread(
+            target=_stage_worker,
+            args=(wq, stage, _worker_name(stage, i), send_to_siem, stop),
+            name=f"{stage}-{i}",
+        )
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if stage == "siem":
+        logging.info(f"[+] SIEM changes only | sent={CHANGES.stats['sent']} | suppressed={CHANGES.stats['suppressed']}")
+    logging.info(f"[✓] FINISH - {stage} worker(s) | queue={wq.counts().get(stage, {})}")
+
+
+def durable_pipeline_main(
+    max_tweets: int = 3,
+    send_to_siem: bool = False,
+    workers: int = ENRICH_WORKERS,
+):
+    """
+    Crawl → enrich → SIEM through the on-disk work queue.
+    Every stage acknowledges its jobs, so after a crash the next run
+    resumes with whatever was queued or in flight.
+    """
+    wq = WorkQueue()
+    logging.info(f"[✓] START - Durable pipeline | backlog={wq.counts()}")
+
+    def on_ioc(record: IocRecord):
+        wq.enqueue("enrich", record.ioc, record._asdict())
+
+    crawl_done = threading.Event()
+    enrich_done = threading.Event()
+
+    enrich_threads = [
+        threading.Thread(
+            target=_stage_worker,
+            args=(wq, "enrich", _worker_name("enrich", i), send_to_siem, crawl_done),
+            name=f"enrich-{i}",
+        )
+        for i in range(workers)
+    ]
+    siem_threads = [
+        threading.Thread(
+            target=_stage_worker,
+            args=(wq, "siem", _worker_name("siem", 0), send_to_siem, enrich_done),
+            name="siem-0",
+        )
+    ] if send_to_siem else []
+
+    for t in enrich_threads + siem_threads:
+        t.start()
+
+    from crawler import crawler_main
+
+    try:
+        crawler_main(max_tweets=max_tweets, on_ioc=on_ioc)
+    finally:
+        crawl_done.set()
+        for t in enrich_threads:
+            t.join()
+        enrich_done.set()
+        for t in siem_threads:
+            t.join()
+
+    logging.info(f"[✓] FINISH - Durable pipeline | queue={wq.counts()}")
+
+
+# ================= DAEMON MODE =================
+
+class _WarmBrowser:
+    """One Chrome session reused across accounts and cycles (re-created if it dies)."""
+
+    def __init__(self):
+        self.driver = None
+
+    def open(self, username: str):
+        from _utils.selenium_driver import create_driver, inject_cookies, open_profile
+
+        if self.driver is None:
+            self.driver = create_driver()
+            inject_cookies(self.driver, username)
+        else:
+            open_profile(self.driver, username)
+        return self.driver
+
+    def reset(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+
+def daemon_main(
+    max_tweets: int = 3,
+    send_to_siem: bool = False,
+    refresh: bool = False,
+    workers: int = ENRICH_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+):
+    """
+    Long-running crawl + enrich loop (instead of cron + one-shot runs).
+    Browser, HTTP sessions, the crawled-IOC set and the enriched-IOC set
+    stay in memory; each account is crawled on its own interval
+    (AccountSchedule, twitter_users.txt reloaded on change) and new IOCs
+    are enriched continuously by the worker threads. Every
+    DAEMON_BACKLOG_MINUTES the batch pass (and --refresh) catches up on
+    IOCs the workers could not enrich. Stops on SIGTERM / Ctrl+C.
+    """
+    from crawler import crawl_account
+    from _utils.selenium_driver import wait_for_tweets
+
+    stop = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    schedule = AccountSchedule(TWITTER_USER_FILE)
+    browser = _WarmBrowser()
+
+    q: "queue.Queue[IocRecord]" = queue.Queue(maxsize=queue_size)
+    ENRICH_QUEUE_DEPTH.set_function(q.qsize, "stream")
+    seen = load_existing_tip_results()
+    seen_lock = threading.Lock()
+    seen_ioc = {ioc for ioc, _ in load_existing_iocs()}   # crawl_account checks bare IOCs
+    stats = {"enriched": 0}
+    policy = EnrichmentPolicy()
+
+    threads = [
+        threading.Thread(
+            target=_enrich_worker,
+            args=(i, q, seen, seen_lock, send_to_siem, stats, policy),
+            name=f"enrich-{i}",
+            daemon=True,
+        )
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+
+    logging.info(f"[✓] START - Daemon | workers={workers} | backlog pass every {DAEMON_BACKLOG_MINUTES}m")
+
+    next_backlog = 0.0
+    cycles = 0
+
+    try:
+        while not stop.is_set():
+            schedule.reload_if_changed()
+
+            for username in schedule.due():
+                if stop.is_set():
+                    break
+
+                logging.info(f"[+] Crawling @{username}")
+                try:
+                    driver = browser.open(username)
+                    wait_for_tweets(driver)
+                    ioc_tweets_seen, new_ioc_count = crawl_account(driver, username, max_tweets, seen_ioc, q.put)
+                    logging.info(
+                        f"[✓] FINISH @{username} | ioc_tweets_seen={ioc_tweets_seen} | new_ioc={new_ioc_count}"
+                    )
+                except Exception as e:
+                    logging.error(f"Crawl failed for @{username} | {e}")
+                    CRAWL_ERRORS.inc(username)
+                    browser.reset()
+
+                # ---- Failed crawls wait for the next interval too (no hot loop) ----
+                schedule.mark_done(username)
+                cycles += 1
+
+            # ---- Catch-up: wait for the workers, then the batch pass ----
+            if time.monotonic() >= next_backlog and not stop.is_set():
+                q.join()
+                tip_main(send_to_siem=send_to_siem)
+                with seen_lock:
+                    seen.update(load_existing_tip_results())
+                if refresh:
+                    tip_refresh_main(send_to_siem=send_to_siem)
+                next_backlog = time.monotonic() + DAEMON_BACKLOG_MINUTES * 60
+
+            wait = schedule.seconds_until_next()
+            stop.wait(DAEMON_TICK_SECONDS if wait is None else min(wait, DAEMON_TICK_SECONDS))
+
+    except KeyboardInterrupt:
+        logging.info("Daemon interrupted")
+
+    finally:
+        browser.reset()
+        for _ in threads:
+            q.put(_STOP)
+        for t in threads:
+            t.join()
+
+    policy.log_summary()
+    if send_to_siem:
+        flush_siem()
+    logging.info(f"[✓] FINISH - Daemon | crawls={cycles} | enriched={stats['enriched']}")
@@ -1,48 +1,118 @@
 import time
 import logging
+from typing import List, Optional
 
-from _utils.siem import send_tip_result_to_siem
-from _utils.logging_config import setup_logging
-from _utils.config import VT_SLEEP
-from _utils.tip_vt_api import vt_lookup
-from _utils.tip_abuseipdb_api import abuseipdb_lookup
-from _utils.tip_malwarebazaar_api import malwarebazaar_lookup
-from _utils.tip_alienvault_api import alienvault_lookup
+from _utils.sinks import OUTPUT
+from _utils.change_filter import CHANGES
+from _utils.metrics import ENRICH_QUEUE_DEPTH, IOCS_ENRICHED
+from _utils.quota import quota_plan, quota_allows
+from _utils.tip_scheduler import EnrichmentScheduler
+from _utils.tip_abuseipdb_api import abuseipdb_bulk_lookup
+from _utils.deadline import Deadline, DeadlineExceeded
+from _utils.tip_providers import PROVIDERS, PROVIDERS_BY_NAME, Provider, get_provider
+from _utils.tip_policy import EnrichmentPolicy
+from _utils.tracing import Span
+from _utils.config import REFRESH_TTL_HOURS, REFRESH_BATCH_SIZE, IOC_DEADLINE_SECONDS
+from _utils.tip_state import (
+    record_enrichment,
+    select_incomplete_iocs,
+    select_stale_iocs,
+    set_pending_providers,
+    touch_checked,
+)
 from _utils.tip_file_io import (
     load_ioc_index,
     load_existing_tip_results,
+    load_tip_result,
     save_tip_result,
 )
 
-setup_logging()
+# ---- Used when the caller does not track its own calls avoided ----
+_DEFAULT_POLICY = EnrichmentPolicy()
 
-def tip_main(send_to_siem: bool = False):
-    logging.info("[✓] START - Cheking to Threat Intelligence Tools")
 
-    indexed_iocs = load_ioc_index()
-    seen_results = load_existing_tip_results()
+def _query_providers(
+    ioc: str,
+    result: dict,
+    providers: List[Provider],
+    deadline: Deadline,
+    policy: Optional[EnrichmentPolicy] = None,
+    abuse_prefetched: Optional[dict] = None,
+) -> List[str]:
+    """
+    Merge provider data into `result` in order.
+    Returns the providers dropped because the IOC deadline ran out.
+    """
+    pending = []
 
-    logging.info(f"[+] Loaded {len(indexed_iocs)} IOCs from index")
-    logging.info(f"[+] Loaded {len(seen_results)} existing VT results")
+    for provider in providers:
+        if provider.name == "abuseipdb" and abuse_prefetched and ioc in abuse_prefetched:
+            data = abuse_prefetched[ioc]
+        elif policy is not None and not policy.should_query(provider, result):
+            logging.info("%s skipped (below policy threshold) | IOC=%s", provider.label, ioc)
+            continue
+        elif deadline.expired():
+            pending.append(provider.name)
+            continue
+        else:
+            logging.info("%s lookup | IOC=%s", provider.label, ioc)
+            try:
+                data = provider.call(ioc, deadline)
+            except DeadlineExceeded:
+                pending.append(provider.name)
+                continue
 
-    new_count = 0
+        if data:
+            result.update(data)
+            logging.info("%s enriched | IOC=%s", provider.label, ioc)
+        else:
+            logging.warning("%s no data | IOC=%s", provider.label, ioc)
 
-    for ioc, ioc_type, tweet_link in indexed_iocs:
-        if ioc in seen_results:
-            logging.info(f"Skipping IOC={ioc} (already enriched)")
-            continue
+    return pending
+
+
+def enrich_ioc(
+    ioc: str,
+    ioc_type: str,
+    tweet_link: str,
+    abuse_prefetched: Optional[dict] = None,
+    policy: Optional[EnrichmentPolicy] = None,
+    deadline: Optional[Deadline] = None,
+) -> Optional[dict]:
+    """
+    Enrich ONE IOC: VirusTotal first, then the providers supporting its
+    type in fan-out policy order, skipping quota-limited ones when the
+    signals so far are below the policy thresholds.
 
+    Every call, retry and wait shares one deadline (IOC_DEADLINE_SECONDS).
+    Providers dropped because it ran out are listed in
+    result["pending_providers"] and completed later by --refresh.
+    Returns the merged result, {} if VirusTotal has no record of the
+    IOC (final), or None if VirusTotal could not answer (circuit open,
+    keys exhausted, deadline, errors: worth retrying later).
+    Traced as the `enrich` span of the IOC's trace.
+    """
+    with Span("enrich", ioc, ioc_type=ioc_type):
+        policy = policy or _DEFAULT_POLICY
+        deadline = deadline or Deadline(IOC_DEADLINE_SECONDS)
 
         # ---- VirusTotal (IP, Url, Hash) ----
-        logging.info(f"VT lookup | IOC={ioc}")
-        result = vt_lookup(ioc)
+        logging.info("VT lookup | IOC=%s", ioc)
+        try:
+            result = get_provider("virustotal").call(ioc, deadline)
+        except DeadlineExceeded:
+            logging.warning("Skipped IOC=%s (VT not reached within %gs)", ioc, deadline.seconds)
+            return None
 
+        if result == {}:
+            logging.info("Skipped IOC=%s (not found in VT)", ioc)
+            return {}
         if not result:
-            logging.warning(f"Skipped IOC={ioc} (unsupported type)")
-            continue
+            logging.warning("Skipped IOC=%s (no VT result)", ioc)
+            return None
         if "error" in result:
-            logging.error(f"Error enriching IOC={ioc}: {result['error']}")
-            continue
+            logging.error("Error enriching IOC=%s: %s", ioc, result["error"])
+            return None
 
         # ---- Normalize VirusTotal fields ----
         result["vt_last_analysis_date"] = result.get("last_analysis_date", "")
@@ -52,55 +122,217 @@ def tip_main(send_to_siem: bool = False):
         result["ioc_type"] = ioc_type
         result["twitter_link"] = tweet_link
 
-        # ---- AlienVault OTX (IP / URL / HASH) ----
-        logging.info(f"AlienVault lookup | IOC={ioc}")
-        alien = alienvault_lookup(ioc)
-        if alien:
-            result.update(alien)
-            logging.info(f"AlienVault enriched | IOC={ioc}")
-        else:
-            logging.warning(f"AlienVault no data | IOC={ioc}")
-
-        # ---- MalwareBazaar (HASH Only) ----
-        if ioc_type == "hash":
-            logging.info(f"MalwareBazaar lookup | IOC={ioc}")
-
-            mb = malwarebazaar_lookup(ioc)
-            if mb:
-                result.update(mb)
-                logging.info(f"MalwareBazaar enriched | IOC={ioc}")
-            else:
-                logging.warning(f"MalwareBazaar no data | IOC={ioc}")
-
-        # ---- AbuseIPDB (IP Only) ----
-        if ioc_type == "ip":
-            logging.info(f"AbuseIPDB lookup | IOC={ioc}")
-
-            abuse = abuseipdb_lookup(ioc)
-            if abuse:
-                result.update(abuse)
-                logging.info(f"AbuseIPDB enriched | IOC={ioc}")
-            else:
-                logging.warning(f"AbuseIPDB no data | IOC={ioc}")
- 
-        # ---- SAVE RESULT ----
+        # ---- Other providers (supported IOC types, policy order) ----
+        pending = _query_providers(
+            ioc, result, policy.providers(ioc_type), deadline, policy, abuse_prefetched
+        )
+
+        result["pending_providers"] = ",".join(pending)
+        if pending:
+            logging.warning("Partial result | IOC=%s | pending=%s", ioc, result["pending_providers"])
+
+        return result
+
+
+def complete_ioc(ioc: str, pending_providers: List[str]) -> Optional[dict]:
+    """
+    Query only the providers a partial result is missing and merge them
+    into the saved row (no new VT call).
+    """
+    row = load_tip_result(ioc)
+    if not row:
+        return None
+
+    deadline = Deadline(IOC_DEADLINE_SECONDS)
+    providers = [get_provider(name) for name in pending_providers if name in PROVIDERS_BY_NAME]
+
+    result = dict(row)
+    with Span("enrich.complete", ioc):
+        pending = _query_providers(ioc, result, providers, deadline)
+    result["pending_providers"] = ",".join(pending)
+
+    return result
+
+
+def publish_result(result: dict, send_to_siem: bool = False):
+    """
+    Persist an enriched result (results file + staleness index)
+    and optionally queue it for the output sinks (SIEM, syslog, files).
+    """
+    ioc = result["ioc"]
+
+    # ---- SAVE RESULT ----
+    with Span("save", ioc):
         save_tip_result(result)
-        seen_results.add(ioc)
+        record_enrichment(result)
+    IOCS_ENRICHED.inc(result.get("ioc_type", ""))
 
-        # ---- OPTIONAL SIEM SEND ----
-        if send_to_siem:
-            try:
-                send_tip_result_to_siem(result)
-                logging.info(f"SIEM sent | IOC={ioc}")
-            except Exception as e:
-                logging.error(f"SIEM send failed | IOC={ioc} | err={e}")
+    # ---- OPTIONAL SIEM SEND ----
+    if send_to_siem:
+        _send_to_siem(result)
 
-        new_count += 1
 
+def _send_to_siem(result: dict):
+    ioc = result["ioc"]
+    try:
+        with Span("output.publish", ioc) as span:
+            queued = OUTPUT.publish(result)
+            span.set("suppressed", not queued)
+        if queued:
+            logging.info("Output queued | IOC=%s", ioc)
+    except Exception as e:
+        logging.error("Output queue failed | IOC=%s | err=%s", ioc, e)
+
+
+def flush_siem():
+    """Wait for queued output events to be delivered or spooled (end of a run)."""
+    OUTPUT.flush()
+    for name, stats in OUTPUT.stats().items():
+        if stats["events"] or stats["spooled_events"] or stats["dead_lettered_events"]:
+            logging.info(
+                f"[+] Sink {name} | batches={stats['batches']} | events={stats['events']} | "
+                f"spooled={stats['spooled_events']} | replayed={stats['replayed_events']} | "
+                f"dead_lettered={stats['dead_lettered_events']} | "
+                f"bytes raw={stats['raw_bytes']} wire={stats['wire_bytes']}"
+            )
+
+    if CHANGES.stats["suppressed"]:
         logging.info(
-            f"Enriched IOC={ioc}"
+            f"[+] Output changes only | sent={CHANGES.stats['sent']} | "
+            f"suppressed={CHANGES.stats['suppressed']} | delta={CHANGES.stats['delta']}"
         )
 
-        time.sleep(VT_SLEEP)
 
-    logging.info(f"[✓] FINISH - Cheking to Threat Intelligence Tools | new={new_count}")
+def tip_main(send_to_siem: bool = False, deadline_minutes: Optional[float] = None):
+    logging.info("[✓] START - Cheking to Threat Intelligence Tools")
+
+    indexed_iocs = load_ioc_index()
+    seen_results = load_existing_tip_results()
+
+    logging.info(f"[+] Loaded {len(indexed_iocs)} IOCs from index")
+    logging.info(f"[+] Loaded {len(seen_results)} existing VT results")
+
+    # ---- Priority queue: fresh / high-value IOCs first ----
+    scheduler = EnrichmentScheduler()
+    for ioc, ioc_type, tweet_link in indexed_iocs:
+        if ioc not in seen_results:
+            scheduler.add(ioc, ioc_type, tweet_link)
+
+    logging.info(f"[+] Scheduled {len(scheduler)} IOCs | already enriched={len(seen_results)}")
+    ENRICH_QUEUE_DEPTH.set_function(scheduler.__len__, "scheduler")
+
+    vt = get_provider("virustotal")
+    plan = quota_plan(vt.name, vt.daily_limit, backlog=len(scheduler))
+    logging.info(
+        f"[+] VT budget | used={plan['used']}/{plan['daily_limit']} | reserve={plan['reserve']} | "
+        f"this hour={plan['hour_budget']} | projected drain={plan['projected_drain_hours']}h"
+    )
+
+    # ---- AbuseIPDB: resolve clustered IPs per block up front ----
+    pending_ips = [
+        ioc for ioc, ioc_type, _ in indexed_iocs
+        if ioc_type == "ip" and ioc in scheduler
+    ]
+    abuse_block = get_provider("abuseipdb_block")
+    abuse_prefetched = abuseipdb_bulk_lookup(
+        pending_ips,
+        check_block=lambda network: abuse_block.call(network, Deadline(IOC_DEADLINE_SECONDS)),
+    ) if pending_ips else {}
+    policy = EnrichmentPolicy()
+
+    if abuse_prefetched:
+        logging.info(f"[+] AbuseIPDB block lookup covered {len(abuse_prefetched)}/{len(set(pending_ips))} IPs")
+
+    deadline = time.time() + deadline_minutes * 60 if deadline_minutes else None
+
+    new_count = 0
+
+    for ioc, ioc_type, tweet_link in scheduler.drain(
+        deadline=deadline,
+        quota=lambda high_priority: quota_allows(vt.name, vt.daily_limit, high_priority),
+    ):
+        result = enrich_ioc(ioc, ioc_type, tweet_link, abuse_prefetched, policy)
+        if not result:
+            continue
+
+        publish_result(result, send_to_siem)
+        seen_results.add(ioc)
+
+        new_count += 1
+
+        logging.info("Enriched IOC=%s", ioc)
+
+    policy.log_summary()
+    if send_to_siem:
+        flush_siem()
+    logging.info(
+        f"[✓] FINISH - Cheking to Threat Intelligence Tools | new={new_count} | pending={len(scheduler)}"
+    )
+
+
+def quota_report() -> list:
+    """
+    Today's budget per provider with the projected time to drain the
+    IOCs not enriched yet (each pending IOC = one call per provider
+    supporting its type).
+    """
+    seen_results = load_existing_tip_results()
+    pending = [ioc_type for ioc, ioc_type, _ in load_ioc_index() if ioc not in seen_results]
+
+    report = []
+    for provider in PROVIDERS:
+        backlog = sum(1 for ioc_type in pending if provider.supports(ioc_type))
+        report.append(quota_plan(provider.name, provider.daily_limit, backlog=backlog))
+    return report
+
+
+def tip_refresh_main(send_to_siem: bool = False, batch_size: int = REFRESH_BATCH_SIZE):
+    """
+    Complete partial results (providers dropped by the IOC deadline),
+    then re-enrich IOCs whose last analysis is older than their per-type TTL.
+    Picks the stalest IOCs from the index, bounded by batch size and
+    this hour's normal-priority VT budget (the reserve is left for fresh
+    IOCs), and records the malicious score delta.
+    """
+    logging.info("[✓] START - Refreshing stale TIP results")
+
+    # ---- Partial results: only the missing providers, no VT call ----
+    completed = 0
+    for ioc, pending in select_incomplete_iocs(limit=batch_size):
+        result = complete_ioc(ioc, pending)
+        if not result:
+            set_pending_providers(ioc, "")
+            continue
+
+        save_tip_result(result)
+        set_pending_providers(ioc, result["pending_providers"])
+        if not result["pending_providers"]:
+            completed += 1
+        if send_to_siem:
+            _send_to_siem(result)
+
+    if completed:
+        logging.info(f"[+] Partial results completed | count={completed}")
+
+    vt = get_provider("virustotal")
+    hour_budget = quota_plan(vt.name, vt.daily_limit)["hour_budget"]
+    budget = batch_size if hour_budget is None else min(batch_size, hour_budget)
+    stale = select_stale_iocs(REFRESH_TTL_HOURS, limit=budget)
+
+    logging.info(f"[+] Stale IOCs selected | count={len(stale)} | budget={budget}")
+
+    refreshed = 0
+
+    for ioc, ioc_type, tweet_link in stale:
+        result = enrich_ioc(ioc, ioc_type, tweet_link)
+        if not result:
+            # ---- Still mark as checked, otherwise it is re-picked forever ----
+            touch_checked(ioc)
+            continue
+
+        publish_result(result, send_to_siem)
+        refreshed += 1
+
+    if send_to_siem:
+        flush_siem()
+    logging.info(f"[✓] FINISH - Refreshing stale TIP results | refreshed={refreshed}")
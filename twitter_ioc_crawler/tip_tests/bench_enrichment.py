@@ -0,0 +1,123 @@
+"""
+Offline benchmark of the enrichment stage against tip_tests/mock_tip_server.py.
+
+Start the mock server first, then:
+    python3 tip_tests/bench_enrichment.py --iocs 200 --vt-keys 4 --vt-interval 0.5
+
+Environment variables are pointed at the mock BEFORE the pipeline modules
+are imported, so .env values are not used. Results are not saved to
+tip_results.txt; only provider calls (and optionally SIEM sends) run.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import urllib.request
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+
+def point_env_at_mock(base: str, vt_keys: int):
+    os.environ.update({
+        "VT_BASE": f"{base}/vt/api/v3",
+        "VT_API_KEYS": ",".join(f"bench-vt-key-{i}" for i in range(vt_keys)),
+        "ABUSEIPDB_API_KEY": "bench",
+        "ABUSEIPDB_URL": f"{base}/abuseipdb/api/v2/check",
+        "ABUSEIPDB_BLOCK_URL": f"{base}/abuseipdb/api/v2/check-block",
+        "ALIENVAULT_OTX_KEY": "bench",
+        "ALIENVAULT_BASE_API": f"{base}/otx/api/v1/indicators",
+        "ALIENVAULT_BASE_UI": "https://otx.alienvault.com/indicator",
+        "MALWAREBAZAAR_API_KEY": "bench",
+        "MALWAREBAZAAR_URL": f"{base}/malwarebazaar/api/v1/",
+        "SIEM_API_URL": f"{base}/siem",
+        "SIEM_API_KEY": "bench",
+        # ---- Keep bench calls out of the real quota ledger ----
+        "QUOTA_DB": os.path.join(tempfile.mkdtemp(prefix="bench-quota-"), "quota.db"),
+    })
+
+
+def synthetic_iocs(n: int):
+    rng = random.Random(42)
+    out = []
+    for i in range(n):
+        kind = rng.choice(("hash", "ip", "url"))
+        if kind == "hash":
+            out.append(("%064x" % rng.getrandbits(256), "hash"))
+        elif kind == "ip":
+            out.append((f"45.{rng.randint(1, 3)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}", "ip"))
+        else:
+            out.append((f"https://bench-{i}.example.com/payload", "url"))
+    return out
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark enrichment against the mock TIP server")
+    parser.add_argument("--mock", default="http://127.0.0.1:8765")
+    parser.add_argument("--iocs", type=int, default=100)
+    parser.add_argument("--vt-keys", type=int, default=1)
+    parser.add_argument("--vt-interval", type=float, default=None,
+                        help="Override per-key VT pacing (seconds, default: VT_SLEEP)")
+    parser.add_argument("--siem", action="store_true", help="Also send the results to the mock SIEM (batched)")
+    args = parser.parse_args()
+
+    point_env_at_mock(args.mock, args.vt_keys)
+    sys.path.insert(0, str(BASE_DIR))
+
+    from tip import enrich_ioc
+    from _utils.logging_config import setup_logging
+    from _utils.sinks import HttpSink, SinkFanout
+    from _utils.tip_vt_keys import VT_KEY_POOL
+
+    setup_logging()
+
+    # ---- Mock SIEM only, spool in a temp dir ----
+    output = SinkFanout([HttpSink("siem", spool_dir=tempfile.mkdtemp(prefix="bench-spool-"))])
+
+    if args.vt_interval is not None:
+        VT_KEY_POOL.min_interval = args.vt_interval
+
+    urllib.request.urlopen(urllib.request.Request(f"{args.mock}/reset", method="POST"))
+
+    per_ioc = []
+    enriched = 0
+    started = time.monotonic()
+
+    for ioc, ioc_type in synthetic_iocs(args.iocs):
+        t0 = time.monotonic()
+        result = enrich_ioc(ioc, ioc_type, "https://x.com/bench/status/1")
+        if result:
+            enriched += 1
+            if args.siem:
+                output.publish(result)
+        per_ioc.append(time.monotonic() - t0)
+
+    if args.siem:
+        output.flush()
+
+    elapsed = time.monotonic() - started
+    stats = json.load(urllib.request.urlopen(f"{args.mock}/stats"))
+
+    print(json.dumps({
+        "iocs": args.iocs,
+        "enriched": enriched,
+        "elapsed_s": round(elapsed, 2),
+        "iocs_per_s": round(args.iocs / elapsed, 3),
+        "per_ioc_p50_s": round(pct(per_ioc, 50), 3),
+        "per_ioc_p95_s": round(pct(per_ioc, 95), 3),
+        "per_ioc_max_s": round(max(per_ioc or [0]), 3),
+        "siem": output.stats()["siem"] if args.siem else None,
+        "mock": stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
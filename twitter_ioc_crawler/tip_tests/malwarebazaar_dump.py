@@ -0,0 +1,75 @@
+"""
+Offline check of the MalwareBazaar dump loader on the fixtures in
+tip_tests/fixtures/ (no network, throw-away database):
+
+  - malwarebazaar_full.zip    full dump (ZIP): 3 valid rows + 1 broken
+  - malwarebazaar_recent.csv  "recent" feed merged incrementally: one row
+                              older than the checkpoint (skipped), one from
+                              the same second (kept), one newer
+
+    python3 tip_tests/malwarebazaar_dump.py     # exit code 1 on a failed check
+"""
+import sys
+import hashlib
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+sys.path.insert(0, str(BASE_DIR))
+
+from _utils import tip_malwarebazaar_dump as dump   # noqa: E402
+
+
+def sha256_of(file_name: str) -> str:
+    # ---- Fixture hashes are the SHA256 of the sample's file name ----
+    return hashlib.sha256(file_name.encode()).hexdigest()
+
+
+def main() -> int:
+    failures = []
+
+    def check(label: str, got, expected):
+        ok = got == expected
+        print(f"[{'OK' if ok else 'FAIL'}] {label} | got={got!r}" + ("" if ok else f" | expected={expected!r}"))
+        if not ok:
+            failures.append(label)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # ---- Never touch the real index ----
+        dump.MALWAREBAZAAR_DUMP_DB = Path(tmp) / "malwarebazaar.db"
+        dump._conn = None
+
+        check("full dump (ZIP) rows", dump.load_malwarebazaar_dump(FIXTURES / "malwarebazaar_full.zip"), 3)
+        check("n/a signature stored empty",
+              dump.malwarebazaar_local_lookup(sha256_of("full-2.exe"))["malwarebazaar_signature"], "")
+
+        check("recent feed rows (incremental)",
+              dump.load_malwarebazaar_dump(FIXTURES / "malwarebazaar_recent.csv", incremental=True), 2)
+        check("same-second row kept",
+              (dump.malwarebazaar_local_lookup(sha256_of("same-second.exe")) or {}).get("malwarebazaar_signature"),
+              "Lokibot")
+        check("row older than the checkpoint skipped",
+              dump.malwarebazaar_local_lookup(sha256_of("full-2.exe"))["malwarebazaar_signature"], "")
+        check("newer row", dump.malwarebazaar_local_lookup(sha256_of("recent-1.dll")), {
+            "malwarebazaar_first_seen": "2026-01-01 12:45:10",
+            "malwarebazaar_last_seen": "2026-01-01 12:45:10",
+            "malwarebazaar_signature": "Remcos",
+            "malwarebazaar_vendor_intel_count": "",
+        })
+
+        check("reloading the feed only re-reads the checkpoint second",
+              dump.load_malwarebazaar_dump(FIXTURES / "malwarebazaar_recent.csv", incremental=True), 1)
+        check("no duplicate samples", dump._db().execute("SELECT COUNT(*) FROM samples").fetchone()[0], 5)
+        check("miss", dump.malwarebazaar_local_lookup(sha256_of("unknown.exe")), None)
+
+        dump._conn.close()
+        dump._conn = None
+
+    print(f"\n{'FAILED: ' + ', '.join(failures) if failures else 'All checks passed'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+Local stand-in for every TIP / SIEM endpoint used by tip_main.
+
+Emulates VirusTotal, AbuseIPDB (check + check-block), AlienVault OTX
+(indicator + subscribed pulses), MalwareBazaar (get_info) and the SIEM
+HTTP collector with configurable latency, error rate, per-key rate
+limits (429 + Retry-After) and daily quotas.
+
+Run:
+    python3 tip_tests/mock_tip_server.py --port 8765 --latency lognormal:-2.5:0.6 --error-rate 0.02
+
+then export the printed *_URL / *_BASE variables (or put them in .env)
+and run the pipeline as usual. GET /stats returns per-provider counters
+and latency percentiles, POST /reset clears them.
+
+Per-provider overrides can be given as JSON (--config mock.json):
+    {"vt": {"rate_per_min": 4, "daily_quota": 500},
+     "siem": {"latency": "fixed:0.005", "error_rate": 0}}
+"""
+import gzip
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PROVIDERS = ("vt", "abuseipdb", "otx", "malwarebazaar", "siem")
+
+KEY_HEADERS = {
+    "vt": "x-apikey",
+    "abuseipdb": "Key",
+    "otx": "X-OTX-API-KEY",
+    "malwarebazaar": "Auth-Key",
+    "siem": "Authorization",
+}
+
+
+# ================= CONFIG =================
+
+def parse_latency(spec: str):
+    """
+    fixed:S | uniform:MIN:MAX | lognormal:MU:SIGMA (seconds)
+    """
+    kind, *args = spec.split(":")
+    args = [float(a) for a in args]
+
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(args[0], args[1])
+
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def build_settings(args) -> dict:
+    base = {
+        "latency": args.latency,
+        "error_rate": args.error_rate,
+        "rate_per_min": args.rate_per_min,
+        "daily_quota": args.daily_quota,
+        "retry_after": args.retry_after,
+        "not_found_rate": args.not_found_rate,
+    }
+
+    overrides = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+
+    settings = {}
+    for name in PROVIDERS:
+        s = dict(base)
+        s.update(overrides.get(name, {}))
+        s["latency_fn"] = parse_latency(s["latency"])
+        settings[name] = s
+
+    return settings
+
+
+# ================= STATE =================
+
+class MockState:
+    def __init__(self, settings: dict):
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = defaultdict(lambda: defaultdict(int))
+            self.latencies = defaultdict(list)
+            self.key_minute = defaultdict(list)   # (provider, key) → call times
+            self.key_day = defaultdict(int)       # (provider, key) → calls today
+            self.siem_events = 0
+            self.started = time.time()
+
+    def admit(self, provider: str, key: str):
+        """
+        Apply quota / rate limit / error injection.
+        Returns (status, retry_after) or (None, None) to serve normally.
+        """
+        s = self.settings[provider]
+        now = time.time()
+
+        with self.lock:
+            self.counters[provider]["requests"] += 1
+
+            if s["daily_quota"] and self.key_day[(provider, key)] >= s["daily_quota"]:
+                return 429, "3600"
+
+            if s["rate_per_min"]:
+                window = [t for t in self.key_minute[(provider, key)] if now - t < 60]
+                self.key_minute[(provider, key)] = window
+                if len(window) >= s["rate_per_min"]:
+                    oldest = min(window)
+                    return 429, str(s["retry_after"] or max(1, int(60 - (now - oldest)) + 1))
+                window.append(now)
+
+            self.key_day[(provider, key)] += 1
+
+        if random.random() < s["error_rate"]:
+            return 503, None
+
+        return None, None
+
+    def record(self, provider: str, status: int, latency: float):
+        with self.lock:
+            self.counters[provider][str(status)] += 1
+            self.latencies[provider].append(latency)
+
+    def snapshot(self) -> dict:
+        def pct(values, p):
+            if not values:
+                return None
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 4)
+
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            out = {"elapsed_s": round(elapsed, 2), "siem_events": self.siem_events, "providers": {}}
+
+            for name in PROVIDERS:
+                lat = self.latencies[name]
+                out["providers"][name] = {
+                    "counters": dict(self.counters[name]),
+                    "rps": round(len(lat) / elapsed, 3),
+                    "latency_p50": pct(lat, 50),
+                    "latency_p95": pct(lat, 95),
+                    "latency_p99": pct(lat, 99),
+                    "max_calls_per_key_today": max(
+                        [v for (p, _), v in self.key_day.items() if p == name] or [0]
+                    ),
+                }
+            return out
+
+
+# ================= FAKE DATA =================
+
+def _seed(value: str) -> int:
+    return int(hashlib.sha256(value.encode()).hexdigest()[:8], 16)
+
+
+def _found(value: str, not_found_rate: float) -> bool:
+    return (_seed(value) % 1000) / 1000 >= not_found_rate
+
+
+def vt_body(value: str) -> dict:
+    seed = _seed(value)
+    return {
+        "data": {
+            "attributes": {
+                "last_analysis_date": int(time.time()) - seed % 86400,
+                "last_analysis_stats": {"malicious": seed % 70, "harmless": 70 - seed % 70},
+            }
+        }
+    }
+
+
+def abuseipdb_body(ip: str) -> dict:
+    seed = _seed(ip)
+    return {
+        "data": {
+            "ipAddress": ip,
+            "abuseConfidenceScore": seed % 101,
+            "totalReports": seed % 500,
+            "lastReportedAt": "2026-01-01T00:00:00+00:00",
+            "domain": "example.net",
+        }
+    }
+
+
+def abuseipdb_block_body(network: str) -> dict:
+    prefix = network.split("/")[0].rsplit(".", 1)[0]
+    reported = [
+        {
+            "ipAddress": f"{prefix}.{i}",
+            "numReports": _seed(f"{prefix}.{i}") % 50,
+            "mostRecentReport": "2026-01-01T00:00:00+00:00",
+            "abuseConfidenceScore": _seed(f"{prefix}.{i}") % 101,
+        }
+        for i in range(256)
+        if _seed(f"{prefix}.{i}") % 4 == 0
+    ]
+    return {"data": {"networkAddress": network, "reportedAddress": reported}}
+
+
+def otx_body(value: str) -> dict:
+    return {"pulse_info": {"count": _seed(value) % 12}}
+
+
+def malwarebazaar_body(file_hash: str) -> dict:
+    seed = _seed(file_hash)
+    return {
+        "query_status": "ok",
+        "data": [{
+            "first_seen": "2026-01-01 00:00:00",
+            "last_seen": "2026-01-02 00:00:00",
+            "signature": ["AgentTesla", "Formbook", "RedLine", "Lumma"][seed % 4],
+            "vendor_intel": {f"vendor{i}": {} for i in range(seed % 8)},
+        }],
+    }
+
+
+# ================= HTTP =================
+
+class MockHandler(BaseHTTPRequestHandler):
+    state: MockState = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass  # keep benchmark output clean
+
+    def _send(self, status: int, body=None, headers=None):
+        payload = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _route(self, method: str):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/stats":
+            return None, lambda: (200, self.state.snapshot())
+        if url.path == "/reset":
+            self.state.reset()
+            return None, lambda: (200, {"reset": True})
+
+        provider = parts[0] if parts else ""
+        if provider not in PROVIDERS:
+            return None, lambda: (404, {"error": "unknown endpoint"})
+
+        return provider, lambda: self._serve(provider, method, parts[1:], query)
+
+    def _serve(self, provider: str, method: str, parts: list, query: dict):
+        not_found_rate = self.state.settings[provider]["not_found_rate"]
+
+        if provider == "vt":
+            # /vt/api/v3/{files|ip_addresses|urls}/{id}
+            value = parts[-1] if parts else ""
+            if not _found(value, not_found_rate):
+                return 404, {"error": {"code": "NotFoundError"}}
+            return 200, vt_body(value)
+
+        if provider == "abuseipdb":
+            if parts and parts[-1] == "check-block":
+                return 200, abuseipdb_block_body(query.get("network", "0.0.0.0/24"))
+            return 200, abuseipdb_body(query.get("ipAddress", ""))
+
+        if provider == "otx":
+            # /otx/api/v1/pulses/subscribed | /otx/api/v1/indicators/{type}/{value}/general
+            if "pulses" in parts:
+                return 200, {"results": [], "next": None}
+            value = parts[-2] if len(parts) >= 2 else ""
+            return 200, otx_body(value)
+
+        if provider == "malwarebazaar":
+            form = parse_qs(self._body.decode())
+            file_hash = (form.get("hash") or [""])[0]
+            if not _found(file_hash, not_found_rate):
+                return 200, {"query_status": "hash_not_found"}
+            return 200, malwarebazaar_body(file_hash)
+
+        if provider == "siem":
+            body = self._body
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            text = body.decode() if body else ""
+            if text.lstrip().startswith("["):
+                events = len(json.loads(text))
+            else:
+                events = len([l for l in text.splitlines() if l.strip()])
+            with self.state.lock:
+                self.state.siem_events += events
+            return 202, {"accepted": events}
+
+        return 404, {"error": "unknown endpoint"}
+
+    def _handle(self, method: str):
+        started = time.monotonic()
+        self._body = self._read_body() if method == "POST" else b""
+        provider, serve = self._route(method)
+
+        if provider is None:
+            status, body = serve()
+            return self._send(status, body)
+
+        key = self.headers.get(KEY_HEADERS[provider], "")
+        status, retry_after = self.state.admit(provider, key)
+
+        # ---- Injected latency applies to every provider response ----
+        time.sleep(max(0.0, self.state.settings[provider]["latency_fn"]()))
+
+        headers = {}
+        if status == 429:
+            body = {"error": "rate limited"}
+            headers["Retry-After"] = retry_after
+        elif status:
+            body = {"error": "injected failure"}
+        else:
+            status, body = serve()
+
+        self.state.record(provider, status, time.monotonic() - started)
+        self._send(status, body, headers)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock TIP / SIEM provider server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.05",
+                        help="fixed:S | uniform:MIN:MAX | lognormal:MU:SIGMA (default: fixed:0.05)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 503 responses")
+    parser.add_argument("--not-found-rate", type=float, default=0.2, help="Fraction of unknown IOCs")
+    parser.add_argument("--rate-per-min", type=int, default=0, help="Calls per key per minute (0 = unlimited)")
+    parser.add_argument("--daily-quota", type=int, default=0, help="Calls per key per day (0 = unlimited)")
+    parser.add_argument("--retry-after", type=int, default=0, help="Fixed Retry-After seconds on 429")
+    parser.add_argument("--config", help="JSON file with per-provider overrides")
+    args = parser.parse_args()
+
+    MockHandler.state = MockState(build_settings(args))
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    base = f"http://{args.host}:{args.port}"
+
+    print("[+] Mock TIP server running. Point the pipeline at it with:")
+    print(f'VT_BASE="{base}/vt/api/v3"')
+    print(f'ABUSEIPDB_URL="{base}/abuseipdb/api/v2/check"')
+    print(f'ABUSEIPDB_BLOCK_URL="{base}/abuseipdb/api/v2/check-block"')
+    print(f'ALIENVAULT_BASE_API="{base}/otx/api/v1/indicators"')
+    print(f'ALIENVAULT_PULSES_API="{base}/otx/api/v1/pulses/subscribed"')
+    print(f'MALWAREBAZAAR_URL="{base}/malwarebazaar/api/v1/"')
+    print(f'SIEM_API_URL="{base}/siem"')
+    print(f"[+] Stats: {base}/stats")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
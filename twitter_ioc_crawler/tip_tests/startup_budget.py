@@ -0,0 +1,148 @@
+"""
+Startup-time budget of each main.py subcommand.
+
+For every command, runs the real entry point (main.main(argv)) in a
+fresh interpreter, like a real run, and stops it where the command's
+work starts: its first stage() (see main.py), or argparse's exit for
+--help. Everything the dispatch imports on the way is measured, then:
+  - the median wall time stays under the command's budget
+  - modules the command must not pay for (Selenium outside `crawl`,
+    the enrichment stack in a plain crawl) are not imported
+  - the command did stop at a stage (no real work was run)
+
+    python3 tip_tests/startup_budget.py            # exit code 1 if over budget
+    python3 tip_tests/startup_budget.py --runs 5 --scale 2   # slower CI box
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+# ---- name → main.py argv ----
+COMMANDS = {
+    "help": ["--help"],
+    "crawl": ["crawl"],
+    "crawl --stream": ["crawl", "--stream"],
+    "enrich": ["enrich"],
+    "enrich --backfill": ["enrich", "--backfill", "iocs.txt"],
+    "send": ["send"],
+    "stats": ["stats"],
+    "traces": ["traces"],
+}
+
+# ---- seconds (median of --runs), interpreter start included ----
+BUDGET_SECONDS = {
+    "help": 0.3,
+    "crawl": 1.0,
+    "crawl --stream": 1.2,
+    "enrich": 0.8,
+    "enrich --backfill": 0.8,
+    "send": 0.8,
+    "stats": 0.8,
+    "traces": 0.5,
+}
+
+FORBIDDEN_MODULES = {
+    "help": ["selenium", "requests", "tip", "crawler"],
+    "crawl": ["tip", "pipeline"],
+    "enrich": ["selenium"],
+    "enrich --backfill": ["selenium"],
+    "send": ["selenium"],
+    "stats": ["selenium"],
+    "traces": ["selenium", "requests", "tip"],
+}
+
+_PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+
+import main
+
+class _Reached(BaseException):
+    pass
+
+def _stop(name):
+    raise _Reached(name)
+
+# ---- The command's work starts at its first stage: stop there ----
+main.stage = _stop
+
+stopped_at = None
+try:
+    main.main({argv!r})
+except _Reached as e:
+    stopped_at = str(e)
+except SystemExit:
+    stopped_at = "exit"
+
+elapsed = time.perf_counter() - t0
+print(json.dumps({{
+    "startup_s": elapsed,
+    "stopped_at": stopped_at,
+    "loaded": sorted({{m.split('.')[0] for m in sys.modules}}),
+}}))
+"""
+
+
+def measure(command: str, runs: int) -> dict:
+    walls, startups, loaded, stopped = [], [], set(), set()
+    probe = _PROBE.format(argv=COMMANDS[command])
+
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        walls.append(time.perf_counter() - t0)
+
+        out = json.loads(proc.stdout.strip().splitlines()[-1])
+        startups.append(out["startup_s"])
+        loaded.update(out["loaded"])
+        stopped.add(out["stopped_at"])
+
+    return {
+        "wall_s": round(statistics.median(walls), 3),
+        "startup_s": round(statistics.median(startups), 3),
+        "stopped_at": sorted(s or "-" for s in stopped),
+        "ran_work": None in stopped,
+        "loaded": loaded,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check main.py startup time per subcommand")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow machines)")
+    args = parser.parse_args()
+
+    failed = False
+    report = {}
+
+    for command in COMMANDS:
+        result = measure(command, args.runs)
+        budget = BUDGET_SECONDS[command] * args.scale
+        leaked = sorted(set(FORBIDDEN_MODULES.get(command, [])) & result["loaded"])
+        ok = result["wall_s"] <= budget and not leaked and not result["ran_work"]
+        failed |= not ok
+
+        report[command] = {
+            "wall_s": result["wall_s"],
+            "startup_s": result["startup_s"],
+            "budget_s": budget,
+            "stopped_at": result["stopped_at"],
+            "forbidden_loaded": leaked,
+            "ok": ok,
+        }
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()